@@ -0,0 +1,215 @@
+"""
+Micro-benchmark komponen pipeline (tanpa jaringan):
+- fusion skor `rerank_combined_scores` (weighted / max / rrf) per jumlah kandidat
+- `search_multimodal` di atas index lokal
+- decode + resize gambar (`normalize_image`)
+- pertumbuhan memori `EmbeddingCache`
+
+Contoh:
+    python -m benchmarks.bench_micro --output benchmarks/results/micro.json
+"""
+import argparse
+import time
+import tracemalloc
+from io import BytesIO
+
+import numpy as np
+
+from benchmarks.common import (
+    add_common_args, configure_environment, synthetic_products, seed_catalog,
+    summarize, write_results
+)
+
+
+def measure(fn, repeat: int, warmup: int = 3) -> dict:
+    """Latensi per panggilan `fn()` (p50/p95/p99)."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+# =========================
+# Fusion skor
+# =========================
+def bench_fusion(args) -> list:
+    from fastapi_app.services.search import new_combined_scores, rerank_combined_scores
+
+    rng = np.random.default_rng(args.seed)
+    query_vector = [0.0] * args.dimension
+    results = []
+    for candidates in args.fusion_candidates:
+        combined_scores = new_combined_scores()
+        for i in range(candidates):
+            data = combined_scores[f"p{i}"]
+            # Sebagian kandidat hanya punya skor salah satu modalitas
+            if rng.random() < 0.8:
+                data["text_score"] = float(rng.random())
+            if rng.random() < 0.6:
+                data["image_score"] = float(rng.random())
+            if rng.random() < 0.3:
+                data["lexical_score"] = float(rng.random())
+            data["metadata"] = {"name": f"produk {i}"}
+
+        for fusion in ("weighted", "max", "rrf"):
+            results.append({
+                "candidates": candidates,
+                "fusion": fusion,
+                "latency": measure(
+                    lambda: rerank_combined_scores(
+                        combined_scores, query_vector, query_vector,
+                        text_weight=1.0, image_weight=1.0, min_score=0.5,
+                        top_k=10, fusion=fusion
+                    ),
+                    repeat=args.repeat,
+                ),
+            })
+    return results
+
+
+# =========================
+# search_multimodal (index lokal)
+# =========================
+def bench_search(args) -> dict:
+    from fastapi_app.services.providers import create_embeddings
+    from fastapi_app.services.search import search_multimodal
+
+    embeddings = create_embeddings(dimension=args.dimension)
+    seed_catalog(embeddings, synthetic_products(args.products, args.seed))
+    embeddings.latency = 0.0
+    image_vec, text_vec = embeddings.embed_image_and_text(
+        "gs://benchmark-catalog/query.jpg", "kursi kayu jati coklat untuk ruang tamu"
+    )
+
+    results = {}
+    for name, kwargs in (
+        ("text", {"query_vector_text": text_vec, "query_vector_image": None}),
+        ("text_image", {"query_vector_text": text_vec, "query_vector_image": image_vec}),
+        ("text_image_lexical", {
+            "query_vector_text": text_vec, "query_vector_image": image_vec,
+            "query_text": "kursi kayu jati coklat untuk ruang tamu",
+        }),
+        ("text_filtered", {
+            "query_vector_text": text_vec, "query_vector_image": None,
+            "filters": {"max_price": 1000000, "category": "kursi"},
+        }),
+    ):
+        results[name] = measure(lambda: search_multimodal(**kwargs), repeat=args.repeat)
+    return {"products": args.products, "queries": results}
+
+
+# =========================
+# Decode + resize gambar
+# =========================
+def synthetic_image(width: int, height: int, image_format: str, seed: int) -> bytes:
+    from PIL import Image as PILImage
+
+    rng = np.random.default_rng(seed)
+    # Gradien + noise: lebih mirip foto dibanding noise murni (kompresi realistis)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    base = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=-1)
+    pixels = np.clip(base + rng.normal(0, 12, base.shape), 0, 255).astype(np.uint8)
+    buffer = BytesIO()
+    PILImage.fromarray(pixels, "RGB").save(buffer, format=image_format, quality=90)
+    return buffer.getvalue()
+
+
+def bench_images(args) -> list:
+    from fastapi_app.services.image_processing import normalize_image
+
+    results = []
+    for width, height in args.image_sizes:
+        for input_format in ("JPEG", "PNG"):
+            data = synthetic_image(width, height, input_format, args.seed)
+            for output_format in ("JPEG", "WEBP"):
+                results.append({
+                    "size": f"{width}x{height}",
+                    "input_format": input_format,
+                    "input_bytes": len(data),
+                    "output_format": output_format,
+                    "latency": measure(
+                        lambda: normalize_image(data, max_edge=1024, output_format=output_format),
+                        repeat=args.image_repeat, warmup=1,
+                    ),
+                })
+    return results
+
+
+# =========================
+# Memori EmbeddingCache
+# =========================
+def bench_embedding_cache(args) -> list:
+    from fastapi_app.services.embedding_cache import EmbeddingCache
+
+    rng = np.random.default_rng(args.seed)
+    cache = EmbeddingCache(max_bytes=args.cache_max_bytes)
+    results = []
+    inserted = 0
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        for checkpoint in sorted(args.cache_entries):
+            started = time.perf_counter()
+            while inserted < checkpoint:
+                key = cache.make_key(None, f"query {inserted}", "local-hashing", args.dimension)
+                vectors = rng.standard_normal((2, args.dimension)).astype(np.float32)
+                cache.set(key, (vectors[0].tolist(), vectors[1].tolist()))
+                inserted += 1
+            elapsed = time.perf_counter() - started
+            current, peak = tracemalloc.get_traced_memory()
+            stats = cache.stats()
+            results.append({
+                "inserted": inserted,
+                "entries": stats["entries"],
+                "evictions": stats["evictions"],
+                "cache_memory_bytes": stats["memory_bytes"],
+                "traced_memory_bytes": current - baseline,
+                "traced_peak_bytes": peak - baseline,
+                "insert_seconds": round(elapsed, 4),
+            })
+    finally:
+        tracemalloc.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark komponen pipeline")
+    add_common_args(parser)
+    parser.add_argument("--repeat", type=int, default=200, help="Pengulangan per micro-benchmark")
+    parser.add_argument("--fusion-candidates", type=lambda value: [int(v) for v in value.split(",")],
+                        default=[40, 400, 4000], help="Jumlah kandidat fusion, mis. 40,400")
+    parser.add_argument("--image-sizes",
+                        type=lambda value: [tuple(int(n) for n in v.split("x")) for v in value.split(",")],
+                        default=[(640, 480), (1920, 1080), (4000, 3000)],
+                        help="Ukuran gambar uji, mis. 640x480,4000x3000")
+    parser.add_argument("--image-repeat", type=int, default=10, help="Pengulangan per ukuran gambar")
+    parser.add_argument("--cache-entries", type=lambda value: [int(v) for v in value.split(",")],
+                        default=[1000, 10000, 50000], help="Checkpoint jumlah entri cache embedding")
+    parser.add_argument("--cache-max-bytes", type=int, default=32 * 1024 * 1024,
+                        help="Batas memori EmbeddingCache")
+    parser.add_argument("--only", choices=["fusion", "search", "images", "embedding_cache"],
+                        action="append", help="Jalankan sebagian benchmark saja")
+    args = parser.parse_args()
+
+    configure_environment(args, EMBEDDING_CACHE_MAX_BYTES=args.cache_max_bytes)
+    benchmarks = {
+        "fusion": bench_fusion,
+        "search": bench_search,
+        "images": bench_images,
+        "embedding_cache": bench_embedding_cache,
+    }
+    results = {
+        name: fn(args)
+        for name, fn in benchmarks.items()
+        if not args.only or name in args.only
+    }
+    write_results("micro", args, results)
+
+
+if __name__ == "__main__":
+    main()
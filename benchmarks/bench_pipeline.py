@@ -0,0 +1,200 @@
+"""
+Benchmark pipeline /search secara in-process (tanpa jaringan).
+
+Mengukur:
+- latensi per tahap (analysis, embedding, search, recommendation) + end-to-end
+- throughput pada konkurensi yang meningkat
+- efek cache (cold, hit cache respons, hit cache embedding saja)
+
+Contoh:
+    python -m benchmarks.bench_pipeline --output benchmarks/results/pipeline.json
+    python -m benchmarks.bench_pipeline --llm-latency-ms 0 --embedding-latency-ms 0
+"""
+import argparse
+import asyncio
+import functools
+import time
+from collections import defaultdict
+
+from benchmarks.common import (
+    add_common_args, configure_environment, synthetic_products, synthetic_queries,
+    seed_catalog, summarize, write_results
+)
+
+# Tahap pipeline -> nama fungsi di fastapi_app.main yang diukur
+STAGES = {
+    "analysis": "aanalyze_image_and_text",
+    "embedding": "acached_image_and_text_embedding",
+    "search": "asearch_multimodal",
+    "recommendation": "arecommend",
+}
+
+
+class StageTimer:
+    """Membungkus fungsi async tahap pipeline di `fastapi_app.main` untuk mencatat durasinya."""
+
+    def __init__(self, module):
+        self.module = module
+        self.samples = defaultdict(list)
+        self._originals = {}
+
+    def install(self) -> None:
+        for stage, attr in STAGES.items():
+            original = getattr(self.module, attr)
+            self._originals[attr] = original
+            setattr(self.module, attr, self._wrap(stage, original))
+
+    def uninstall(self) -> None:
+        for attr, original in self._originals.items():
+            setattr(self.module, attr, original)
+
+    def _wrap(self, stage, fn):
+        @functools.wraps(fn)
+        async def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                self.samples[stage].append(time.perf_counter() - started)
+        return timed
+
+    def reset(self) -> None:
+        self.samples.clear()
+
+    def summary(self) -> dict:
+        return {stage: summarize(self.samples[stage]) for stage in STAGES}
+
+
+async def timed_post(client, payload: dict):
+    started = time.perf_counter()
+    response = await client.post("/search", json=payload)
+    return time.perf_counter() - started, response.status_code
+
+
+async def run_sequential(client, queries):
+    latencies, errors = [], 0
+    for query in queries:
+        elapsed, status = await timed_post(client, {"query_text": query})
+        latencies.append(elapsed)
+        errors += status != 200
+    return latencies, errors
+
+
+async def run_concurrent(client, queries, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(query):
+        async with semaphore:
+            return await timed_post(client, {"query_text": query})
+
+    started = time.perf_counter()
+    outcomes = await asyncio.gather(*(one(query) for query in queries))
+    wall = time.perf_counter() - started
+    latencies = [elapsed for elapsed, _ in outcomes]
+    errors = sum(status != 200 for _, status in outcomes)
+    return wall, latencies, errors
+
+
+# Counter cache yang dilaporkan sebagai selisih per fase
+CACHE_COUNTERS = ("exact_hits", "semantic_hits", "hits", "disk_hits", "misses", "evictions")
+
+
+def cache_counters(main) -> dict:
+    return {
+        "response_cache": main.response_cache.stats(),
+        "embedding_cache": main.embedding_cache.stats(),
+    }
+
+
+def counter_delta(before: dict, after: dict) -> dict:
+    return {
+        cache: {
+            key: after[cache][key] - before[cache][key]
+            for key in CACHE_COUNTERS if key in after[cache]
+        }
+        for cache in after
+    }
+
+
+async def benchmark(args) -> dict:
+    import httpx
+    import fastapi_app.main as main
+
+    started = time.perf_counter()
+    vectors = seed_catalog(main.embeddings, synthetic_products(args.products, args.seed))
+    seed_seconds = time.perf_counter() - started
+    main.services.warmup()
+
+    timer = StageTimer(main)
+    timer.install()
+    transport = httpx.ASGITransport(app=main.app)
+    results = {
+        "catalog": {"products": args.products, "vectors": vectors, "seed_seconds": round(seed_seconds, 3)},
+        "warmup": main.services.status()["steps"],
+    }
+
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            # 1. Latensi per tahap (sekuensial, query unik -> semua cache miss)
+            latencies, errors = await run_sequential(client, synthetic_queries(args.requests, seed=1))
+            results["stages"] = {
+                **timer.summary(),
+                "end_to_end": summarize(latencies),
+                "errors": errors,
+            }
+
+            # 2. Throughput pada konkurensi yang meningkat
+            throughput = []
+            for level, concurrency in enumerate(args.concurrency):
+                timer.reset()
+                queries = synthetic_queries(args.requests, seed=100 + level)
+                wall, latencies, errors = await run_concurrent(client, queries, concurrency)
+                throughput.append({
+                    "concurrency": concurrency,
+                    "requests": len(queries),
+                    "wall_seconds": round(wall, 4),
+                    "requests_per_second": round(len(queries) / wall, 3),
+                    "latency": summarize(latencies),
+                    "errors": errors,
+                })
+            results["throughput"] = throughput
+
+            # 3. Efek cache: cold -> hit cache respons -> hit cache embedding saja
+            queries = synthetic_queries(args.cache_queries, seed=999)
+            cache_effects = {}
+            for phase in ("cold", "response_cache_hit", "embedding_cache_hit"):
+                if phase == "embedding_cache_hit":
+                    # Cache respons dikosongkan; embedding tetap tersimpan
+                    main.response_cache.invalidate()
+                timer.reset()
+                before = cache_counters(main)
+                latencies, errors = await run_sequential(client, queries)
+                cache_effects[phase] = {
+                    "end_to_end": summarize(latencies),
+                    "stages": timer.summary(),
+                    "errors": errors,
+                    "cache_counters": counter_delta(before, cache_counters(main)),
+                }
+            results["cache_effects"] = cache_effects
+    finally:
+        timer.uninstall()
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipeline /search (in-process)")
+    add_common_args(parser)
+    parser.add_argument("--requests", type=int, default=100, help="Jumlah request per skenario")
+    parser.add_argument("--concurrency", type=lambda value: [int(v) for v in value.split(",")],
+                        default=[1, 2, 4, 8, 16, 32], help="Level konkurensi, mis. 1,4,16")
+    parser.add_argument("--cache-queries", type=int, default=50, help="Jumlah query skenario cache")
+    args = parser.parse_args()
+
+    configure_environment(args)
+    results = asyncio.run(benchmark(args))
+    write_results("pipeline", args, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Utilitas bersama benchmark: konfigurasi provider lokal, katalog sintetis,
+ringkasan statistik latensi, dan penulisan hasil JSON.
+
+Semua benchmark berjalan in-process tanpa jaringan: embedding, LLM, dan
+vector store memakai stand-in lokal (lihat `services/local_providers.py`)
+dengan latensi yang dapat diatur lewat argumen CLI.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PRODUCT_TYPES = ["kursi", "meja", "sofa", "lemari", "rak", "ranjang", "lampu", "kabinet"]
+MATERIALS = ["kayu jati", "rotan", "besi", "kulit", "kain", "marmer", "kaca"]
+COLORS = ["hitam", "putih", "coklat", "abu-abu", "krem"]
+ROOMS = ["ruang tamu", "kamar tidur", "ruang makan", "kantor", "teras"]
+
+
+def add_common_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--output", default=None, help="Path file hasil JSON (default: stdout saja)")
+    parser.add_argument("--products", type=int, default=2000, help="Jumlah produk katalog sintetis")
+    parser.add_argument("--seed", type=int, default=42, help="Seed data sintetis")
+    parser.add_argument("--dimension", type=int, default=128, help="Dimensi embedding")
+    parser.add_argument("--embedding-latency-ms", type=float, default=50.0,
+                        help="Latensi tersimulasi per panggilan embedding")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0,
+                        help="Latensi tersimulasi LLM sebelum token pertama")
+    parser.add_argument("--llm-chunk-latency-ms", type=float, default=5.0,
+                        help="Latensi tersimulasi antar chunk streaming LLM")
+
+
+def configure_environment(args: argparse.Namespace, **overrides) -> None:
+    """
+    Mengatur environment provider lokal. Harus dipanggil SEBELUM modul
+    `fastapi_app` diimport karena konfigurasi dibaca saat import.
+    """
+    if ROOT_DIR not in sys.path:
+        sys.path.insert(0, ROOT_DIR)
+
+    env = {
+        "EMBEDDING_PROVIDER": "local",
+        "LLM_PROVIDER": "local",
+        "SEARCH_BACKEND": "local",
+        # Index selalu dibangun dari katalog sintetis (bukan snapshot di disk)
+        "LOCAL_INDEX_PATH": os.path.join(ROOT_DIR, "benchmarks", ".no-snapshot.npz"),
+        "INDEX_MANIFEST_PATH": os.path.join(ROOT_DIR, "benchmarks", ".no-manifest.json"),
+        "EMBEDDING_DIMENSION": str(args.dimension),
+        "EMBEDDING_CACHE_DB": "",
+        "PROMPT_CACHE_ENABLED": "false",
+        "WARMUP_ENABLED": "false",
+        "LOCAL_EMBEDDING_LATENCY_MS": str(args.embedding_latency_ms),
+        "LOCAL_LLM_LATENCY_MS": str(args.llm_latency_ms),
+        "LOCAL_LLM_CHUNK_LATENCY_MS": str(args.llm_chunk_latency_ms),
+    }
+    env.update({key: str(value) for key, value in overrides.items()})
+    os.environ.update(env)
+
+
+# =========================
+# Data sintetis
+# =========================
+def synthetic_products(count: int, seed: int = 42) -> List[Dict]:
+    """Katalog produk sintetis yang deterministik."""
+    rng = np.random.default_rng(seed)
+    products = []
+    for i in range(count):
+        product_type = PRODUCT_TYPES[i % len(PRODUCT_TYPES)]
+        material = MATERIALS[rng.integers(len(MATERIALS))]
+        color = COLORS[rng.integers(len(COLORS))]
+        room = ROOMS[rng.integers(len(ROOMS))]
+        products.append({
+            "id": f"bench-{i:06d}",
+            "name": f"{product_type.title()} {material.title()} {color.title()} {i}",
+            "price": float(rng.integers(5, 500) * 10000),
+            "category": product_type,
+            "material": material,
+            "description": (
+                f"{product_type} {material} warna {color}, cocok untuk {room}. "
+                f"Desain minimalis dan kokoh untuk pemakaian sehari-hari."
+            ),
+            "image_path": f"gs://benchmark-catalog/{i:06d}.jpg",
+        })
+    return products
+
+
+def synthetic_queries(count: int, seed: int = 0) -> List[str]:
+    """Query teks unik (setiap query memakai nomor urut agar cache tidak hit)."""
+    rng = np.random.default_rng(seed)
+    return [
+        f"{PRODUCT_TYPES[rng.integers(len(PRODUCT_TYPES))]} "
+        f"{MATERIALS[rng.integers(len(MATERIALS))]} "
+        f"{COLORS[rng.integers(len(COLORS))]} untuk "
+        f"{ROOMS[rng.integers(len(ROOMS))]} #{seed}-{i}"
+        for i in range(count)
+    ]
+
+
+def seed_catalog(embeddings, products: Sequence[Dict]) -> int:
+    """
+    Mengisi vector index lokal dengan vektor katalog sintetis
+    (latensi embedding tersimulasi dimatikan selama seeding).
+
+    Returns:
+        int: jumlah vektor yang di-upsert.
+    """
+    from fastapi_app.config import get_vector_index
+    from fastapi_app.indexer import create_product_vectors
+
+    latency, embeddings.latency = embeddings.latency, 0.0
+    try:
+        vectors = [
+            vector
+            for product in products
+            for vector in create_product_vectors(product, embeddings, max_retries=1)
+        ]
+    finally:
+        embeddings.latency = latency
+    get_vector_index().upsert(vectors=vectors)
+    return len(vectors)
+
+
+# =========================
+# Statistik & output
+# =========================
+def summarize(samples_seconds: Sequence[float]) -> dict:
+    """Ringkasan latensi dalam milidetik (p50/p95/p99)."""
+    if not samples_seconds:
+        return {"count": 0}
+    samples = np.asarray(samples_seconds, dtype=np.float64) * 1000
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {
+        "count": int(samples.size),
+        "mean_ms": round(float(samples.mean()), 4),
+        "p50_ms": round(float(p50), 4),
+        "p95_ms": round(float(p95), 4),
+        "p99_ms": round(float(p99), 4),
+        "max_ms": round(float(samples.max()), 4),
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, text=True,
+            stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def write_results(name: str, args: argparse.Namespace, results: dict) -> dict:
+    """Menulis hasil benchmark (beserta konfigurasi & versi kode) sebagai JSON."""
+    report = {
+        "benchmark": name,
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": vars(args),
+        "results": results,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"Hasil benchmark disimpan ke {args.output}")
+    else:
+        print(text)
+    return report
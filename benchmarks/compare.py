@@ -0,0 +1,77 @@
+"""
+Membandingkan dua file hasil benchmark JSON (baseline vs kandidat).
+
+Setiap metrik `*_ms` yang naik melebihi ambang (default 10%) ditandai
+sebagai regresi; exit code 1 jika ada regresi (berguna untuk CI).
+
+Contoh:
+    python -m benchmarks.compare baseline.json candidate.json --threshold 0.15
+"""
+import argparse
+import json
+import sys
+from typing import Dict, Iterator, Tuple
+
+
+def flatten(node, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    """Semua metrik `*_ms` sebagai pasangan (path, nilai)."""
+    if isinstance(node, dict):
+        for key, value in node.items():
+            yield from flatten(value, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(node, list):
+        # Elemen list diberi label dari field identitasnya (mis. concurrency=8)
+        for index, item in enumerate(node):
+            label = str(index)
+            if isinstance(item, dict):
+                identity = [
+                    f"{key}={item[key]}" for key in (
+                        "concurrency", "candidates", "fusion", "size",
+                        "input_format", "output_format", "inserted"
+                    ) if key in item
+                ]
+                label = ",".join(identity) or label
+            yield from flatten(item, f"{prefix}[{label}]")
+    elif isinstance(node, (int, float)) and prefix.endswith("_ms"):
+        yield prefix, float(node)
+
+
+def load_metrics(path: str) -> Dict[str, float]:
+    with open(path, "r", encoding="utf-8") as f:
+        return dict(flatten(json.load(f)["results"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bandingkan dua hasil benchmark JSON")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Kenaikan relatif yang dianggap regresi (0.10 = 10%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05,
+                        help="Selisih absolut minimum agar noise kecil diabaikan")
+    parser.add_argument("--metric", action="append",
+                        help="Hanya bandingkan metrik dengan akhiran ini (mis. p95_ms)")
+    args = parser.parse_args()
+
+    baseline = load_metrics(args.baseline)
+    candidate = load_metrics(args.candidate)
+    regressions = 0
+    for path in sorted(baseline.keys() & candidate.keys()):
+        if args.metric and not path.endswith(tuple(args.metric)):
+            continue
+        before, after = baseline[path], candidate[path]
+        delta = after - before
+        ratio = delta / before if before else 0.0
+        regressed = delta > args.min_delta_ms and ratio > args.threshold
+        regressions += regressed
+        mark = "REGRESI" if regressed else ""
+        print(f"{path:<70} {before:>12.3f} {after:>12.3f} {ratio:>+8.1%} {mark}")
+
+    missing = baseline.keys() ^ candidate.keys()
+    if missing:
+        print(f"\n{len(missing)} metrik hanya ada di salah satu file (diabaikan)")
+    print(f"\n{regressions} regresi (ambang {args.threshold:.0%})")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,12 @@
+import io
 import os
+import json
+import time
 import base64
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import AsyncIterator, Optional
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
@@ -8,7 +15,10 @@ from pydantic import BaseModel, Field
 from google import genai
 from google.genai.errors import APIError
 
-from google.genai.types import Part, Content, GenerateContentConfig # PENTING: Import eksplisit Part dan Content
+from google.genai.types import Part, Content, GenerateContentConfig, UploadFileConfig # PENTING: Import eksplisit Part dan Content
+
+from prompt_cache import PromptCache, is_cache_error
+from sessions import ChatSession, SessionStore, trim_history
 load_dotenv()
 
 # --- Konfigurasi API ---
@@ -17,9 +27,53 @@ load_dotenv()
 # Jika tidak bisa menggunakan Environment Variable, ganti 'os.getenv("GEMINI_API_KEY")'
 # dengan API Key Anda sebagai string. Contoh: client = genai.Client(api_key="AIza...")
 API_KEY = os.getenv("GEMINI_API_KEY", "AIz-----") 
+# Satu client untuk seluruh request: connection pool HTTP (sync & aio) dipakai ulang
 client = genai.Client(api_key=API_KEY)
 model='gemini-2.5-flash-lite'
 
+# --- Konfigurasi Sesi & Riwayat Chat ---
+# Batas perkiraan token riwayat yang dikirim ke Gemini per giliran (0 = tanpa batas).
+# Giliran paling lama dibuang lebih dulu agar biaya per giliran tetap datar.
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "8000"))
+# Sesi yang tidak aktif lebih lama dari SESSION_TTL (detik) dihapus
+SESSION_TTL = float(os.getenv("SESSION_TTL", "3600"))
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "1000"))
+# Batas waktu (detik) menunggu giliran sebelumnya pada sesi yang sama selesai
+# sebelum request ditolak dengan 429
+SESSION_LOCK_TIMEOUT = float(os.getenv("SESSION_LOCK_TIMEOUT", "60"))
+# Gambar diunggah sekali ke Gemini Files API lalu dirujuk lewat URI-nya,
+# sehingga tidak dikirim ulang sebagai base64 di setiap giliran
+UPLOAD_IMAGES = os.getenv("UPLOAD_IMAGES", "true").lower() == "true"
+MAX_UPLOADED_FILES = int(os.getenv("MAX_UPLOADED_FILES", "1024"))
+
+# System prompt AI-NOID (statis, didaftarkan sebagai cached content Gemini)
+SYSTEM_PROMPT = '''Anda adalah AI Asisten bernama AI-NOID, Anda harus menjawab pertanyaan user dengan ramah dan emot,
+        Jika pertanyaan tidak memiliki jawaban, Anda harus menjawab dengan "Maaf, saya tidak bisa menjawab pertanyaan tersebut,
+        Jika bertanya apa itu MARS, jawab: MARS (Multimodal AI-Powered Furniture Recommender System) adalah aplikasi cerdas yang dapat merekomendasikan produk furniture berdasarkan pertanyaan pengguna dengan tepat dan akurat.
+        Pengguna dapat memberikan input teks ataupun gambar untuk mencari produk yang sesuai.
+        MARS dapat mengenali produk berdasarkan jenis produk, warna, material dan memberikan rekomendasi berdasarkan input ruangan yang anda berikan.
+        Selain berkaitan dengan furniture, jangan jawab pertanyaan pengguna.
+        
+        '''
+
+# --- Konfigurasi Context Caching ---
+# System prompt didaftarkan sekali sebagai cached content (TTL, diperbarui
+# otomatis) lalu dirujuk lewat namanya; fallback ke prompt inline jika gagal.
+# Default nonaktif: SYSTEM_PROMPT jauh di bawah minimum token cached content
+# Gemini (PROMPT_CACHE_MIN_TOKENS) sehingga pembuatan cache pasti ditolak.
+PROMPT_CACHE_ENABLED = os.getenv("PROMPT_CACHE_ENABLED", "false").lower() == "true"
+PROMPT_CACHE_TTL = int(os.getenv("PROMPT_CACHE_TTL", "3600"))
+PROMPT_CACHE_MIN_TOKENS = int(os.getenv("PROMPT_CACHE_MIN_TOKENS", "1024"))
+
+prompt_cache = PromptCache(
+    lambda: client, model, SYSTEM_PROMPT,
+    ttl=PROMPT_CACHE_TTL, min_tokens=PROMPT_CACHE_MIN_TOKENS,
+    enabled=PROMPT_CACHE_ENABLED,
+)
+sessions = SessionStore(max_sessions=MAX_SESSIONS, ttl=SESSION_TTL)
+# sha256 gambar -> Task upload ke Files API (dipakai bersama antar sesi)
+uploaded_files = OrderedDict()
+
 app = FastAPI(title="Gemini Proxy API")
 
 # Izinkan CORS (Penting untuk akses dari frontend/web yang berbeda domain)
@@ -37,90 +91,277 @@ class Message(BaseModel):
     parts: list[dict]
 
 class GeminiRequest(BaseModel):
-    # 'contents' menampung seluruh riwayat chat (history)
+    # Dengan session_id: 'contents' hanya berisi giliran baru, riwayat disimpan di proxy.
+    # Tanpa session_id: 'contents' menampung seluruh riwayat chat (history)
     contents: list[Message]
+    session_id: Optional[str] = None
+    # True: jawaban di-stream sebagai SSE, False: respons JSON {"text": "..."}
+    stream: bool = True
 
 # Tambahkan endpoint GET untuk root, agar tidak 404
 @app.get("/")
 def read_root():
     return {"message": "Gemini Proxy API berjalan! Gunakan endpoint /generate untuk streaming."}
 
+def file_expired(file) -> bool:
+    # File di Files API kedaluwarsa (48 jam); beri jeda 5 menit
+    if file.expiration_time is None:
+        return False
+    return file.expiration_time.timestamp() - 300 < time.time()
+
+
+async def image_part(data: bytes, mime_type: str) -> Part:
+    """
+    Membuat Part gambar. Gambar yang sama (berdasarkan sha256) hanya diunggah
+    sekali ke Files API dan selanjutnya dirujuk lewat URI. Jika upload gagal,
+    gambar dikirim inline seperti biasa.
+    """
+    if not UPLOAD_IMAGES:
+        return Part.from_bytes(data=data, mime_type=mime_type)
+
+    digest = hashlib.sha256(data).hexdigest()
+    task = uploaded_files.get(digest)
+    if task is not None and task.done() and (
+        task.cancelled() or task.exception() is not None or file_expired(task.result())
+    ):
+        task = None
+    if task is None:
+        task = asyncio.create_task(client.aio.files.upload(
+            file=io.BytesIO(data),
+            config=UploadFileConfig(mime_type=mime_type),
+        ))
+        uploaded_files[digest] = task
+        while len(uploaded_files) > MAX_UPLOADED_FILES:
+            uploaded_files.popitem(last=False)
+    uploaded_files.move_to_end(digest)
+
+    try:
+        # shield: upload tetap berjalan untuk request lain walau request ini dibatalkan
+        file = await asyncio.shield(task)
+    except Exception as e:
+        print(f"Upload gambar ke Files API gagal, dikirim inline: {e}")
+        return Part.from_bytes(data=data, mime_type=mime_type)
+    return Part.from_uri(file_uri=file.uri, mime_type=file.mime_type)
+
+
+async def build_contents(request: GeminiRequest) -> list[Content]:
+    """
+    Mengubah pesan dari frontend menjadi list Content untuk SDK Gemini.
+
+    Raises:
+        HTTPException: 400 jika data gambar (base64) tidak valid.
+    """
+    contents_for_sdk = []
+    for msg in request.contents:
+        sdk_parts = []
+
+        for part in msg.parts:
+            if 'text' in part and part['text']:
+                # Kasus Teks
+                sdk_parts.append(Part(text=part['text']))
+
+            elif 'inline_data' in part:
+                # Kasus Gambar (Inline Data Base64)
+                inline_data = part.get('inline_data')
+                if inline_data:
+                    try:
+                        # Ekstrak data base64 dan mime_type
+                        base64_data = inline_data.get('data')
+                        # Ambil MIME Type dari payload, jika tidak ada, gunakan default JPEG (lebih umum)
+                        mime_type = inline_data.get('mime_type', 'image/jpeg')
+                        if base64_data is None:
+                            raise ValueError("Missing 'data' field in inline_data.")
+                        # Decode base64 ke bytes
+                        base64_bytes = base64.b64decode(base64_data)
+                    except Exception as e:
+                        print(f"Base64 Decode Error: {e} for MIME: {mime_type}")
+                        raise HTTPException(
+                            status_code=400,
+                            detail="Invalid inline image data."
+                        )
+                    # Membuat objek Part (URI Files API atau data biner)
+                    sdk_parts.append(await image_part(base64_bytes, mime_type))
+
+        contents_for_sdk.append(
+            Content(
+                role=msg.role,
+                parts=sdk_parts
+            )
+        )
+    return contents_for_sdk
+
+
+def build_config(cache_name: Optional[str] = None) -> GenerateContentConfig:
+    """System prompt dirujuk lewat cached content jika tersedia, selain itu dikirim inline."""
+    if cache_name is not None:
+        return GenerateContentConfig(cached_content=cache_name)
+    return GenerateContentConfig(system_instruction=SYSTEM_PROMPT)
+
+
+async def call_with_prompt_cache(call):
+    """
+    Menjalankan call(config) memakai cached content system prompt.
+    Jika cache ditolak Gemini (mis. sudah dihapus), diulang dengan prompt inline.
+    """
+    cache_name = prompt_cache.name()
+    if cache_name is not None:
+        try:
+            return await call(build_config(cache_name))
+        except APIError as e:
+            if not is_cache_error(e):
+                raise
+            print(f"Cached content {cache_name} ditolak, fallback inline: {e}")
+            prompt_cache.invalidate(cache_name)
+    return await call(build_config())
+
+
+def sse_event(event: str, data: dict) -> str:
+    """Format satu event Server-Sent Events."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class SessionStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse yang selalu memanggil on_close setelah respons selesai,
+    termasuk jika klien terputus sebelum body mulai di-iterasi (finally milik
+    generator body tidak pernah berjalan pada kasus itu).
+    """
+
+    def __init__(self, content, on_close, **kwargs):
+        super().__init__(content, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.on_close()
+
+
+async def acquire_session(session: ChatSession) -> None:
+    """Menunggu giliran pada sesi; 429 jika giliran sebelumnya belum selesai."""
+    try:
+        await asyncio.wait_for(session.lock.acquire(), timeout=SESSION_LOCK_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=429,
+            detail="Giliran sebelumnya pada sesi ini masih diproses, coba lagi nanti",
+        )
+
+
+def end_turn(session: Optional[ChatSession], contents: list[Content], reply: Optional[str]) -> None:
+    """
+    Menyimpan giliran user + jawaban model ke riwayat sesi. Dipanggil saat
+    lock sesi masih dipegang; jawaban kosong/gagal (None) tidak disimpan.
+    """
+    if session is None or not reply:
+        return
+    session.history = trim_history(
+        session.history + contents + [Content(role="model", parts=[Part(text=reply)])],
+        HISTORY_TOKEN_BUDGET,
+    )
+
+
+async def stream_chunks(first_chunk, stream, on_complete) -> AsyncIterator[str]:
+    """
+    Meneruskan potongan teks dari Gemini ke browser sebagai SSE.
+    Setelah stream berakhir, on_complete(teks jawaban) dipanggil; jika stream
+    gagal atau terputus di tengah jalan, on_complete(None) agar jawaban
+    parsial tidak tersimpan di riwayat.
+
+    Event:
+        chunk: {"text": "..."} potongan teks jawaban
+        error: {"detail": "..."} jika stream gagal di tengah jalan
+        done:  {} stream selesai
+    """
+    reply = []
+    completed = False
+    try:
+        chunk = first_chunk
+        while chunk is not None:
+            if chunk.text:
+                reply.append(chunk.text)
+                yield sse_event("chunk", {"text": chunk.text})
+            chunk = await anext(stream, None)
+        completed = True
+    except APIError as e:
+        print(f"Gemini API Error: {e}")
+        yield sse_event("error", {"detail": f"Gemini API Error (Coba lagi nanti): {str(e)}"})
+    except Exception as e:
+        print(f"Internal Server Error: {e}")
+        yield sse_event("error", {"detail": f"Internal server error: {str(e)}"})
+    finally:
+        on_complete("".join(reply) if completed else None)
+    yield sse_event("done", {})
+
+
 @app.post("/generate")
 async def generate_content(request: GeminiRequest):
     """
-    Endpoint Non-Streaming untuk meneruskan permintaan chat ke Gemini API
+    Endpoint untuk meneruskan permintaan chat ke Gemini API.
+
+    Menggunakan client async (client.aio) sehingga event loop tidak terblokir
+    selama panggilan LLM. Secara default jawaban di-stream sebagai SSE
+    (text/event-stream); kirim "stream": false untuk respons JSON {"text": "..."}.
+
+    Jika session_id dikirim, klien cukup mengirim giliran baru: riwayat disimpan
+    di proxy dan dipangkas sesuai HISTORY_TOKEN_BUDGET. Giliran pada sesi yang
+    sama diproses berurutan (lock sesi dipegang sampai jawaban selesai); jika
+    giliran sebelumnya belum selesai dalam SESSION_LOCK_TIMEOUT detik, 429.
     """
+    session = sessions.get(request.session_id) if request.session_id else None
+    if session is not None:
+        await acquire_session(session)
+    # True jika pelepasan lock diserahkan ke respons SSE
+    lock_handed_off = False
     try:
-        contents_for_sdk = []
-        for msg in request.contents:
-            sdk_parts = []
-            
-            for part in msg.parts:
-                if 'text' in part and part['text']:
-                    # Kasus Teks
-                    sdk_parts.append(Part(text=part['text']))
-                    
-                elif 'inline_data' in part:
-                    # Kasus Gambar (Inline Data Base64)
-                    inline_data = part.get('inline_data')
-                    if inline_data:
-                        try:
-                            # Ekstrak data base64 dan mime_type
-                            base64_data = inline_data.get('data')
-                            # print(base64_data)
-                            # Ambil MIME Type dari payload, jika tidak ada, gunakan default JPEG (lebih umum)
-                            mime_type = inline_data.get('mime_type', 'image/jpeg')
-                            if base64_data is None:
-                                raise ValueError("Missing 'data' field in inline_data.")
-                            # # Decode base64 ke bytes
-                            base64_bytes = base64.b64decode(base64_data)
-                            # Membuat objek Part menggunakan data biner
-                            sdk_parts.append(
-                                Part.from_bytes(
-                                    data=base64_bytes,
-                                    mime_type=mime_type
-                                )
-                            )
-                        except Exception as e:
-                            print(f"Base64 Decode Error: {e} for MIME: {mime_type}")
-                            raise HTTPException(
-                                status_code=400, 
-                                detail="Invalid inline image data."
-                            )
-                            
-                
-            contents_for_sdk.append(
-                Content(
-                    role=msg.role, 
-                    parts=sdk_parts
+        new_contents = await build_contents(request)
+        history = session.history if session is not None else []
+        contents_for_sdk = trim_history(history + new_contents, HISTORY_TOKEN_BUDGET)
+
+        if not request.stream:
+            response = await call_with_prompt_cache(
+                lambda config: client.aio.models.generate_content(
+                    model=model,
+                    contents=contents_for_sdk,
+                    config=config,
                 )
             )
+            # cetak total token yang digunakan
+            # print(f"Total prompt: {response.usage_metadata.prompt_token_count}")
+            # print(f'Candidate token:{response.usage_metadata.candidates_token_count}')
+            # print(f'Total token:{response.usage_metadata.total_token_count}')
+            end_turn(session, new_contents, response.text)
+            return {
+                "text": response.text,
+            }
 
-        # Panggilan ke Gemini API menggunakan fungsi NON-STREAMING
-        system_prompt = f'''Anda adalah AI Asisten bernama AI-NOID, Anda harus menjawab pertanyaan user dengan ramah dan emot,
-        Jika pertanyaan tidak memiliki jawaban, Anda harus menjawab dengan "Maaf, saya tidak bisa menjawab pertanyaan tersebut,
-        Jika bertanya apa itu MARS, jawab: MARS (Multimodal AI-Powered Furniture Recommender System) adalah aplikasi cerdas yang dapat merekomendasikan produk furniture berdasarkan pertanyaan pengguna dengan tepat dan akurat.
-        Pengguna dapat memberikan input teks ataupun gambar untuk mencari produk yang sesuai.
-        MARS dapat mengenali produk berdasarkan jenis produk, warna, material dan memberikan rekomendasi berdasarkan input ruangan yang anda berikan.
-        Selain berkaitan dengan furniture, jangan jawab pertanyaan pengguna.
-        
-        '''
-        
-        response = client.models.generate_content(
-            model=model,
-            contents=contents_for_sdk,
-            config=GenerateContentConfig(
-                    system_instruction=system_prompt),
+        async def start_stream(config):
+            stream = await client.aio.models.generate_content_stream(
+                model=model,
+                contents=contents_for_sdk,
+                config=config,
+            )
+            # Ambil chunk pertama sebelum mengirim header, agar error dari Gemini
+            # (kuota, API key, cache, dll) tetap dikembalikan sebagai status HTTP
+            return await anext(stream, None), stream
+
+        first_chunk, stream = await call_with_prompt_cache(start_stream)
+
+        def release_session() -> None:
+            if session is not None:
+                session.lock.release()
+
+        lock_handed_off = True
+        return SessionStreamingResponse(
+            stream_chunks(first_chunk, stream, lambda reply: end_turn(session, new_contents, reply)),
+            on_close=release_session,
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
         )
-        # cetak total token yang digunakan
-        # print(f"Total prompt: {response.usage_metadata.prompt_token_count}")
-        # print(f'Candidate token:{response.usage_metadata.candidates_token_count}')
-        # print(f'Total token:{response.usage_metadata.total_token_count}')
-        # Mengembalikan respons JSON yang bersih
-        return {
-            "text": response.text,
-        }
-        
+
+    except HTTPException:
+        raise
     except APIError as e:
         print(f"Gemini API Error: {e}")
         raise HTTPException(
@@ -132,6 +373,22 @@ async def generate_content(request: GeminiRequest):
         print(f"Internal Server Error: {e}") 
         # Tambahkan error message ke HTTPException detail untuk debugging frontend
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    finally:
+        if session is not None and not lock_handed_off:
+            session.lock.release()
+
+
+@app.delete("/session/{session_id}")
+def delete_session(session_id: str):
+    """Menghapus riwayat sesi (dipanggil saat pengguna mereset chat)."""
+    return {"deleted": sessions.pop(session_id) is not None}
+
+
+@app.on_event("shutdown")
+async def close_client():
+    # Tutup connection pool milik client Gemini
+    await client.aio.aclose()
+    client.close()
 
 # --- Jalankan Server ---
 # Jalankan dengan command: uvicorn app:app --reload
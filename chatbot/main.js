@@ -2,8 +2,10 @@
 // KONFIGURASI DAN INICIALISASI
 // =================================================================
 
-// Ganti dengan endpoint FastAPI Non-Streaming Anda
-const FASTAPI_NON_STREAMING_ENDPOINT = "http://127.0.0.1:8001/generate"; 
+// Ganti dengan endpoint FastAPI Anda (jawaban di-stream sebagai SSE)
+const FASTAPI_STREAMING_ENDPOINT = "http://127.0.0.1:8001/generate"; 
+// Endpoint untuk menghapus riwayat sesi di proxy
+const FASTAPI_SESSION_ENDPOINT = "http://127.0.0.1:8001/session";
 
 // DOM Elements
 const floatingContainer = document.querySelector(".floating-chat-container");
@@ -17,7 +19,8 @@ const chatHint = document.getElementById("chatHint");
 
 // STATE MANAGEMENT
 let selectedImage = null; // Menyimpan objek File
-let chatHistory = []; // Menyimpan riwayat percakapan untuk konteks
+// Riwayat percakapan disimpan di proxy; browser cukup mengirim session ID + pesan baru
+let sessionId = crypto.randomUUID();
 
 // =================================================================
 // FUNGSI UTILITY (Tampilan dan State)
@@ -48,7 +51,9 @@ function toggleChat() {
 
 // Fungsi untuk mereset seluruh sesi chat (Dipanggil dari tombol 🔄)
 function resetChat() {
-    chatHistory = []; // Reset History
+    // Hapus riwayat di proxy lalu mulai sesi baru
+    fetch(`${FASTAPI_SESSION_ENDPOINT}/${sessionId}`, { method: "DELETE" }).catch(() => {});
+    sessionId = crypto.randomUUID();
     messagesBox.innerHTML = ""; // Bersihkan tampilan
     textInput.value = "";
     clearImagePreview();
@@ -147,8 +152,37 @@ function addMessage(text, sender = "bot", imgURL = null, messageId = null, is_lo
 }
 
 
+// Membaca stream SSE dari FastAPI Proxy, memanggil onEvent(event, data) per event
+async function readSSE(resp, onEvent) {
+    const reader = resp.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // Event SSE dipisahkan oleh baris kosong
+        let boundary;
+        while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let event = "message";
+            let data = "";
+            for (const line of rawEvent.split("\n")) {
+                if (line.startsWith("event:")) event = line.slice(6).trim();
+                else if (line.startsWith("data:")) data += line.slice(5).trim();
+            }
+            onEvent(event, data ? JSON.parse(data) : {});
+        }
+    }
+}
+
+
 // =================================================================
-// FUNGSI UTAMA (Interaksi API - NON-STREAMING ke FastAPI Proxy)
+// FUNGSI UTAMA (Interaksi API - STREAMING ke FastAPI Proxy)
 // =================================================================
 
 async function sendMsg() {
@@ -194,16 +228,16 @@ async function sendMsg() {
         }
     }
     
-    // 2. Tambahkan pesan user saat ini ke history
-    chatHistory.push({ role: "user", parts: userParts });
-
-    // 3. Persiapkan body request: Kirim seluruh history sebagai konteks
-    const requestBody = { contents: chatHistory };
+    // 2. Persiapkan body request: hanya pesan baru, konteks diambil proxy dari sesi
+    const requestBody = {
+        session_id: sessionId,
+        contents: [{ role: "user", parts: userParts }]
+    };
     
-    // 4. Panggilan API (fetch) ke FastAPI Proxy
+    // 3. Panggilan API (fetch) ke FastAPI Proxy
     try {
         const resp = await fetch(
-            FASTAPI_NON_STREAMING_ENDPOINT, // TARGET FASTAPI NON-STREAMING
+            FASTAPI_STREAMING_ENDPOINT, // TARGET FASTAPI STREAMING (SSE)
             {
                 method: "POST",
                 headers: { "Content-Type": "application/json" },
@@ -221,28 +255,39 @@ async function sendMsg() {
             throw new Error(errorDetail);
         }
 
-        // Baca respons JSON dari FastAPI (Mengharapkan {"text": "..."})
-        const data = await resp.json();
-        const botReply = data.text || "⚠️ Tidak ada respon teks dari proxy.";
-        
-        loadingElement.remove(); // Hapus pesan loading
-        
-        // Tampilkan balasan bot
-        addMessage(botReply, "bot");
-        
-        // 5. Simpan balasan Bot ke history 
-        chatHistory.push({ 
-            role: "model", 
-            parts: [{ text: botReply }] 
+        // Balasan bot dirender bertahap setiap potongan teks diterima
+        let botReply = "";
+        let botElement = null;
+        let streamError = null;
+
+        await readSSE(resp, (event, data) => {
+            if (event === "chunk") {
+                botReply += data.text || "";
+                if (!botElement) {
+                    loadingElement.remove(); // Hapus pesan loading saat token pertama tiba
+                    botElement = addMessage("", "bot");
+                }
+                botElement.querySelector(".message-text").innerHTML = marked.parse(botReply);
+                messagesBox.scrollTop = messagesBox.scrollHeight;
+            } else if (event === "error") {
+                streamError = data.detail || "Stream terputus.";
+            }
         });
+
+        if (streamError && !botReply) throw new Error(streamError);
+
+        if (!botElement) {
+            loadingElement.remove();
+            botReply = "⚠️ Tidak ada respon teks dari proxy.";
+            addMessage(botReply, "bot");
+        } else if (streamError) {
+            addMessage(`⚠️ Jawaban terpotong: ${streamError}`, "bot");
+        }
         
     } catch (err) {
         loadingElement.remove(); 
         addMessage(`⚠️ Terjadi error: ${err.message || 'API gagal merespons.'}`, "bot");
         console.error("Fetch Error:", err);
-        
-        // Jika API gagal, hapus pesan user terakhir dari history 
-        chatHistory.pop(); 
     } finally {
         textInput.disabled = false;
         textInput.focus();
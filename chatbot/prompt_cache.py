@@ -0,0 +1,153 @@
+"""
+Salinan fastapi_app/services/prompt_cache.py.
+
+Chatbot di-deploy terpisah dari folder ini (requirements.txt sendiri,
+`uvicorn app:app`) sehingga tidak bisa mengimpor paket fastapi_app.
+Perubahan harus diterapkan di kedua file agar tetap identik.
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+# Gemini menolak cached content yang sudah dihapus/kedaluwarsa dengan
+# 404 NOT_FOUND atau 403 PERMISSION_DENIED ("CachedContent not found")
+CACHE_ERROR_CODES = {403, 404}
+CACHE_ERROR_STATUSES = {"NOT_FOUND", "PERMISSION_DENIED"}
+
+
+def is_cache_error(error: BaseException) -> bool:
+    """
+    True jika error berasal dari cached content yang tidak valid/sudah dihapus.
+
+    Dicek dari kode & status `google.genai.errors.APIError`, termasuk yang
+    dibungkus library lain (mis. LangChain) sebagai `__cause__`.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if (
+            getattr(error, "code", None) in CACHE_ERROR_CODES
+            and getattr(error, "status", None) in CACHE_ERROR_STATUSES
+        ):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class PromptCache:
+    """
+    Context caching Gemini untuk satu system prompt statis.
+
+    System prompt didaftarkan sekali sebagai cached content dengan TTL lalu
+    dirujuk lewat namanya (`cached_content`) di setiap request. Pembuatan dan
+    pembaruan cache berjalan di thread latar belakang, sehingga request tidak
+    pernah menunggu; selama cache belum tersedia (atau gagal dibuat)
+    `name()` mengembalikan None dan pemanggil mengirim prompt secara inline.
+
+    Prompt di bawah batas minimum token context caching Gemini (`min_tokens`,
+    dicek sekali lewat `count_tokens`) tidak pernah dicoba di-cache, karena
+    `caches.create` pasti ditolak.
+
+    Client Gemini diambil lewat `client_fn` saat cache pertama kali dibuat,
+    sehingga membuat PromptCache tidak memicu pembuatan client.
+    """
+
+    def __init__(
+        self,
+        client_fn: Callable[[], Any],
+        model: str,
+        system_instruction: str,
+        ttl: int = 3600,
+        refresh_margin: float = 120.0,
+        retry_after: float = 600.0,
+        min_tokens: int = 1024,
+        enabled: bool = True,
+    ):
+        self.client_fn = client_fn
+        self.model = model
+        self.system_instruction = system_instruction
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.retry_after = retry_after
+        self.min_tokens = min_tokens
+        self.enabled = enabled
+
+        self._name = None
+        self._expires_at = 0.0
+        self._retry_at = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def _too_small(self, client) -> bool:
+        """True jika prompt di bawah `min_tokens` (cache dinonaktifkan permanen)."""
+        try:
+            tokens = client.models.count_tokens(
+                model=self.model, contents=self.system_instruction
+            ).total_tokens
+        except Exception as e:
+            # Jumlah token tidak diketahui -> tetap coba buat cache
+            logger.warning("Gagal menghitung token system prompt: %s", e)
+            return False
+        if tokens is not None and tokens < self.min_tokens:
+            logger.info(
+                "System prompt %d token (< minimum %d), context caching dilewati",
+                tokens, self.min_tokens
+            )
+            with self._lock:
+                self.enabled = False
+            return True
+        return False
+
+    def _refresh(self) -> None:
+        try:
+            from google.genai.types import CreateCachedContentConfig
+            client = self.client_fn()
+            if self._name is None and self._too_small(client):
+                return
+            cache = client.caches.create(
+                model=self.model,
+                config=CreateCachedContentConfig(
+                    system_instruction=self.system_instruction,
+                    ttl=f"{self.ttl}s",
+                ),
+            )
+            with self._lock:
+                self._name = cache.name
+                self._expires_at = time.monotonic() + self.ttl
+        except Exception as e:
+            logger.warning("Gagal membuat cached content, prompt dikirim inline: %s", e)
+            with self._lock:
+                self._retry_at = time.monotonic() + self.retry_after
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def name(self) -> Optional[str]:
+        """
+        Nama cached content yang masih berlaku, atau None (pakai prompt inline).
+
+        Jika cache belum ada atau mendekati kedaluwarsa, pembaruan dijadwalkan
+        di latar belakang.
+        """
+        if not self.enabled:
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            name = self._name if now < self._expires_at else None
+            needs_refresh = now >= self._expires_at - self.refresh_margin
+            if needs_refresh and not self._refreshing and now >= self._retry_at:
+                self._refreshing = True
+                threading.Thread(target=self._refresh, daemon=True).start()
+        return name
+
+    def invalidate(self, name: str) -> None:
+        """Membuang cache yang ditolak server (mis. sudah dihapus) agar dibuat ulang."""
+        with self._lock:
+            if self._name == name:
+                self._name = None
+                self._expires_at = 0.0
@@ -0,0 +1,125 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+
+from google.genai.types import Content
+
+
+# Perkiraan token per gambar (Gemini menghitung gambar kecil sebagai 258 token)
+IMAGE_TOKEN_ESTIMATE = 258
+# Perkiraan kasar jumlah karakter per token untuk teks
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(content: Content) -> int:
+    """Perkiraan jumlah token satu Content (teks + gambar/file)."""
+    tokens = 0
+    for part in content.parts or []:
+        if part.text:
+            tokens += len(part.text) // CHARS_PER_TOKEN + 1
+        elif part.file_data is not None or part.inline_data is not None:
+            tokens += IMAGE_TOKEN_ESTIMATE
+    return tokens
+
+
+def trim_history(history: list[Content], token_budget: int) -> list[Content]:
+    """
+    Memangkas riwayat chat agar muat dalam token_budget.
+
+    Giliran paling lama dibuang lebih dulu. Riwayat selalu dimulai dari giliran
+    "user" (syarat Gemini) dan giliran terakhir tidak pernah dibuang.
+
+    Args:
+        history (list[Content]):
+            Riwayat chat, dari yang paling lama.
+        token_budget (int):
+            Batas perkiraan token; <= 0 berarti tanpa batas.
+
+    Returns:
+        list[Content]: riwayat yang sudah dipangkas.
+    """
+    if token_budget <= 0 or not history:
+        return history
+
+    counts = [estimate_tokens(content) for content in history]
+    total = sum(counts)
+    start = 0
+    while total > token_budget and start < len(history) - 1:
+        total -= counts[start]
+        start += 1
+    # Jangan mulai dari giliran "model"
+    while start < len(history) - 1 and history[start].role != "user":
+        start += 1
+    return history[start:]
+
+
+@dataclass
+class ChatSession:
+    """
+    Riwayat percakapan satu pengguna yang disimpan di sisi proxy.
+
+    `lock` dipegang selama satu giliran (baca riwayat -> jawaban Gemini ->
+    simpan giliran), sehingga request yang bersamaan pada sesi yang sama
+    diproses berurutan dan tidak ada giliran yang hilang.
+    """
+    history: list[Content] = field(default_factory=list)
+    last_used: float = field(default_factory=time.monotonic)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class SessionStore:
+    """
+    Penyimpanan sesi chat in-memory (TTL + batas jumlah sesi, LRU).
+
+    Klien cukup mengirim giliran baru beserta session_id; riwayat lengkap
+    disimpan di sini sehingga ukuran request tidak bertambah setiap giliran.
+    """
+
+    def __init__(self, max_sessions: int = 1000, ttl: float = 3600.0):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions = OrderedDict()  # session_id -> ChatSession
+
+    def _evict(self, now: float, session_id: str) -> None:
+        """
+        Menghapus sesi kedaluwarsa dan sesi paling lama jika melebihi
+        max_sessions (menyisakan tempat untuk session_id). Sesi yang lock-nya
+        sedang dipegang tidak pernah dihapus: request berikutnya dengan
+        session_id yang sama harus tetap memakai objek (dan lock) yang sama
+        agar giliran tetap berurutan.
+        """
+        excess = len(self._sessions) - self.max_sessions
+        if session_id not in self._sessions:
+            excess += 1
+        evicted = []
+        for key, session in self._sessions.items():
+            expired = now - session.last_used > self.ttl
+            if excess <= 0 and not expired:
+                break
+            if session.lock.locked() or (key == session_id and not expired):
+                continue
+            evicted.append(key)
+            excess -= 1
+        for key in evicted:
+            del self._sessions[key]
+
+    def get(self, session_id: str) -> ChatSession:
+        """Mengambil sesi (atau membuat sesi baru jika belum ada/kedaluwarsa)."""
+        now = time.monotonic()
+        self._evict(now, session_id)
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = ChatSession()
+            self._sessions[session_id] = session
+        else:
+            self._sessions.move_to_end(session_id)
+        session.last_used = now
+        return session
+
+    def pop(self, session_id: str) -> Optional[ChatSession]:
+        return self._sessions.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
@@ -1,7 +1,7 @@
 import os
 from dotenv import load_dotenv
-import vertexai
-from pinecone import Pinecone
+
+from fastapi_app.services.container import services
 
 load_dotenv()
 
@@ -13,7 +13,172 @@ PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_ENV = os.getenv("PINECONE_ENV")
 INDEX_NAME = os.getenv("INDEX_NAME")
 
-vertexai.init(project=PROJECT_ID, location=LOCATION)
+# Model embedding multimodal (dimensi harus sama dengan dimensi index)
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "multimodalembedding@001")
+EMBEDDING_DIMENSION = int(os.getenv("EMBEDDING_DIMENSION", "128"))
+
+# Provider model: "vertex"/"gemini" (Google Cloud) atau "local" (stand-in
+# deterministik tanpa jaringan untuk load test & benchmark). Latensi stand-in
+# lokal (milidetik) dapat diatur untuk mensimulasikan model sungguhan.
+EMBEDDING_PROVIDER = os.getenv("EMBEDDING_PROVIDER", "vertex").lower()
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini").lower()
+LOCAL_EMBEDDING_LATENCY_MS = float(os.getenv("LOCAL_EMBEDDING_LATENCY_MS", "0"))
+LOCAL_LLM_LATENCY_MS = float(os.getenv("LOCAL_LLM_LATENCY_MS", "0"))
+LOCAL_LLM_CHUNK_LATENCY_MS = float(os.getenv("LOCAL_LLM_CHUNK_LATENCY_MS", "0"))
+
+# Backend pencarian vektor: "pinecone" (default) atau "local"
+# (index NumPy in-memory yang dimuat dari file snapshot LOCAL_INDEX_PATH)
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "pinecone").lower()
+LOCAL_INDEX_PATH = os.getenv("LOCAL_INDEX_PATH", "data/vector_index.npz")
+
+# Manifest hash konten produk untuk indexing inkremental
+INDEX_MANIFEST_PATH = os.getenv("INDEX_MANIFEST_PATH", "data/index_manifest.json")
+
+# Query text & image dijalankan paralel; timeout berlaku per modalitas (detik)
+SEARCH_TIMEOUT_SECONDS = float(os.getenv("SEARCH_TIMEOUT_SECONDS", "3.0"))
+SEARCH_MAX_WORKERS = int(os.getenv("SEARCH_MAX_WORKERS", "16"))
+
+# Reranking: kandidat per modalitas = top_k * SEARCH_OVERFETCH_FACTOR,
+# fusion skor "weighted" | "rrf" | "max", dan skor modalitas yang hilang
+# dilengkapi lewat fetch vektor. SEARCH_FILL_TOP_K (default nonaktif) mengisi
+# top_k dengan kandidat di bawah skor minimum default; min_score eksplisit
+# selalu dipatuhi
+SEARCH_OVERFETCH_FACTOR = int(os.getenv("SEARCH_OVERFETCH_FACTOR", "4"))
+SEARCH_FUSION = os.getenv("SEARCH_FUSION", "weighted").lower()
+SEARCH_RRF_K = int(os.getenv("SEARCH_RRF_K", "60"))
+SEARCH_FILL_MISSING = os.getenv("SEARCH_FILL_MISSING", "true").lower() == "true"
+SEARCH_FILL_TOP_K = os.getenv("SEARCH_FILL_TOP_K", "false").lower() == "true"
+
+# Pencarian leksikal BM25 (nama, kategori, material, deskripsi) yang
+# digabung dengan skor vektor. Sumber dokumen: LEXICAL_CATALOG_PATH
+# (JSONL/CSV katalog) atau metadata vector index jika kosong. Default aktif
+# untuk index lokal / katalog; pada Pinecone tanpa katalog index BM25 harus
+# dibangun dari scan list/fetch seluruh index, jadi default nonaktif.
+# Build yang gagal dicoba lagi dengan backoff mulai LEXICAL_RETRY_SECONDS.
+LEXICAL_CATALOG_PATH = os.getenv("LEXICAL_CATALOG_PATH", "")
+LEXICAL_SEARCH = os.getenv(
+    "LEXICAL_SEARCH",
+    "true" if SEARCH_BACKEND == "local" or LEXICAL_CATALOG_PATH else "false"
+).lower() == "true"
+LEXICAL_WEIGHT = float(os.getenv("LEXICAL_WEIGHT", "0.3"))
+LEXICAL_RETRY_SECONDS = float(os.getenv("LEXICAL_RETRY_SECONDS", "30"))
+
+# Cache embedding: batas ukuran tier memori (byte) dan path SQLite opsional
+# yang dipakai bersama oleh semua worker (kosong = tier disk nonaktif)
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+EMBEDDING_CACHE_DB = os.getenv("EMBEDDING_CACHE_DB", "")
+
+# Mode spekulatif: embedding + pencarian dimulai bersamaan dengan analisis
+# furniture dan dibuang jika input ternyata bukan furniture
+SPECULATIVE_SEARCH = os.getenv("SPECULATIVE_SEARCH", "false").lower() == "true"
+
+# Endpoint /search/batch: jumlah query maksimum dan konkurensi per batch
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "1000"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+# Batas token output LLM, disesuaikan dengan ukuran schema respons
+# (analisis: description <1000 karakter, rekomendasi: maksimal 3 produk)
+ANALYSIS_MAX_OUTPUT_TOKENS = int(os.getenv("ANALYSIS_MAX_OUTPUT_TOKENS", "512"))
+RECOMMENDATION_MAX_OUTPUT_TOKENS = int(os.getenv("RECOMMENDATION_MAX_OUTPUT_TOKENS", "1024"))
+
+# Konteks rekomendasi: "full" (list produk lengkap, LLM menulis ulang
+# produk) atau "compact" (tabel bernomor, LLM hanya mengembalikan nomor
+# produk + alasan singkat lalu produk dilengkapi dari metadata pencarian)
+RECOMMENDATION_CONTEXT_MODE = os.getenv("RECOMMENDATION_CONTEXT_MODE", "full").lower()
+RECOMMENDATION_DESCRIPTION_CHARS = int(os.getenv("RECOMMENDATION_DESCRIPTION_CHARS", "200"))
+RECOMMENDATION_PICKS_MAX_OUTPUT_TOKENS = int(os.getenv("RECOMMENDATION_PICKS_MAX_OUTPUT_TOKENS", "256"))
+
+# Context caching Gemini untuk system prompt statis (analisis & rekomendasi).
+# Default nonaktif: prompt bawaan jauh di bawah minimum token cached content
+# Gemini (PROMPT_CACHE_MIN_TOKENS), jadi hanya berguna untuk prompt panjang.
+# Prompt di bawah minimum dilewati; jika cache gagal dibuat, prompt dikirim inline.
+PROMPT_CACHE_ENABLED = os.getenv("PROMPT_CACHE_ENABLED", "false").lower() == "true"
+PROMPT_CACHE_TTL = int(os.getenv("PROMPT_CACHE_TTL", "3600"))
+PROMPT_CACHE_MIN_TOKENS = int(os.getenv("PROMPT_CACHE_MIN_TOKENS", "1024"))
+
+# Cache respons /search: tier exact (teks + gambar) dan tier semantik
+# (cosine similarity embedding teks >= RESPONSE_CACHE_SIMILARITY, 0 = nonaktif).
+# Tier semantik default nonaktif: query yang hanya berbeda atribut (harga,
+# warna) memiliki embedding hampir identik, jadi aktifkan dengan hati-hati.
+# RESPONSE_CACHE_MAX_ENTRIES=0 menonaktifkan cache respons.
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0"))
+
+# Gate furniture berbasis embedding sebelum analisis LLM (default nonaktif).
+# Margin = similarity ke prototipe furniture - similarity ke prototipe
+# non-furniture; hanya kasus ambigu yang diteruskan ke Gemini
+FURNITURE_GATE_ENABLED = os.getenv("FURNITURE_GATE_ENABLED", "false").lower() == "true"
+FURNITURE_GATE_ACCEPT_MARGIN = float(os.getenv("FURNITURE_GATE_ACCEPT_MARGIN", "0.05"))
+FURNITURE_GATE_REJECT_MARGIN = float(os.getenv("FURNITURE_GATE_REJECT_MARGIN", "0.05"))
+
+# Normalisasi gambar sebelum dikirim ke LLM & embedding
+IMAGE_NORMALIZATION = os.getenv("IMAGE_NORMALIZATION", "true").lower() == "true"
+IMAGE_MAX_EDGE = int(os.getenv("IMAGE_MAX_EDGE", "1024"))
+IMAGE_OUTPUT_FORMAT = os.getenv("IMAGE_OUTPUT_FORMAT", "JPEG")
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "85"))
+
+# Pengunduh gambar URL/gs:// (connection pool, batas ukuran, cache TTL)
+IMAGE_FETCH_MAX_BYTES = int(os.getenv("IMAGE_FETCH_MAX_BYTES", str(10 * 1024 * 1024)))
+IMAGE_FETCH_TIMEOUT = float(os.getenv("IMAGE_FETCH_TIMEOUT", "10"))
+IMAGE_FETCH_POOL_SIZE = int(os.getenv("IMAGE_FETCH_POOL_SIZE", "32"))
+IMAGE_FETCH_CACHE_TTL = float(os.getenv("IMAGE_FETCH_CACHE_TTL", "300"))
+IMAGE_FETCH_CACHE_MAX_BYTES = int(os.getenv("IMAGE_FETCH_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Warmup saat startup: klien dibuat & koneksi dibuka sebelum /ready melaporkan siap
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+
+
+# =========================
+# Klien berat (dibuat lazy lewat service container)
+# =========================
+def _init_vertexai():
+    import vertexai
+    vertexai.init(project=PROJECT_ID, location=LOCATION)
+    return True
+
+
+def _create_pinecone_index():
+    from pinecone import Pinecone
+    pc = Pinecone(api_key=PINECONE_API_KEY, environment=PINECONE_ENV)
+    return pc.Index(INDEX_NAME)
+
+
+def _create_vector_index():
+    if SEARCH_BACKEND != "local":
+        return services.get("pinecone_index")
+
+    from fastapi_app.services.local_index import LocalVectorIndex
+    if os.path.exists(LOCAL_INDEX_PATH):
+        return LocalVectorIndex.load(LOCAL_INDEX_PATH)
+    # Belum ada snapshot (mis. sebelum indexing pertama)
+    return LocalVectorIndex.empty(EMBEDDING_DIMENSION)
+
+
+services.register("vertexai", _init_vertexai)
+services.register("pinecone_index", _create_pinecone_index)
+services.register("vector_index", _create_vector_index)
+
+
+def init_vertexai() -> None:
+    """Inisialisasi SDK Vertex AI (sekali per proses)."""
+    services.get("vertexai")
+
+
+def get_vector_index():
+    """Index vektor aktif (Pinecone atau index lokal), dibuat saat pertama dipakai."""
+    return services.get("vector_index")
+
+
+def get_pinecone_index():
+    return services.get("pinecone_index")
+
 
-pc = Pinecone(api_key=PINECONE_API_KEY, environment=PINECONE_ENV)
-pinecone_index = pc.Index(INDEX_NAME)
+def __getattr__(name):
+    # Kompatibilitas: `from fastapi_app.config import vector_index` tetap bisa
+    # dipakai skrip CLI, tetapi klien baru dibuat saat atribut ini diakses.
+    if name == "vector_index":
+        return get_vector_index()
+    if name == "pinecone_index":
+        return None if SEARCH_BACKEND == "local" else get_pinecone_index()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,490 @@
+"""
+Indexing katalog produk ke vector index (Pinecone atau index lokal).
+
+Pengganti loop `create_vectors_for_pinecone` + `index_products_to_pinecone`
+di notebook: katalog dibaca secara streaming, embedding dikerjakan oleh
+worker pool terbatas dengan retry/backoff, dan upsert dikirim per batch
+secara paralel.
+
+Indexing bersifat inkremental: manifest lokal menyimpan hash konten per
+produk (nama, harga, kategori, deskripsi, gambar) beserta model/dimensi
+embedding. Hanya produk baru/berubah yang di-embed ulang, dan produk yang
+hilang dari katalog dihapus dari vector index.
+
+Contoh:
+    python -m fastapi_app.indexer data/products.jsonl --workers 8 --batch-size 100
+"""
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from google.api_core import exceptions as google_exceptions
+from urllib3.exceptions import HTTPError as TransportError
+
+
+logger = logging.getLogger(__name__)
+
+# Error kuota / sementara dari Vertex AI yang layak dicoba ulang
+RETRYABLE_EMBEDDING_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.TooManyRequests,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError,
+)
+
+# Status HTTP upsert yang bersifat sementara (rate limit / error server)
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+@dataclass
+class IndexingReport:
+    """Ringkasan hasil indexing."""
+    products_indexed: int = 0
+    products_skipped: int = 0
+    products_deleted: int = 0
+    products_failed: int = 0
+    vectors_upserted: int = 0
+    upsert_batches: int = 0
+    elapsed_seconds: float = 0.0
+    failed_ids: List[str] = field(default_factory=list)
+
+    @property
+    def products_per_second(self) -> float:
+        return self.products_indexed / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    @property
+    def vectors_per_second(self) -> float:
+        return self.vectors_upserted / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+
+# =========================
+# Membaca katalog
+# =========================
+def read_catalog(path: str) -> Iterator[Dict]:
+    """
+    Membaca katalog produk baris per baris (JSONL atau CSV).
+
+    Setiap produk minimal memiliki key: id, name, price, category,
+    description, image_path (opsional: material).
+
+    `id` selalu dinormalisasi menjadi string: key manifest (JSON) dan ID
+    vektor berupa string, sehingga ID numerik di JSONL harus dibandingkan
+    dalam bentuk yang sama (jika tidak, semua produk dianggap berubah dan
+    pass penghapusan membuang seluruh vektor).
+    """
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".csv"):
+            for row in csv.DictReader(f):
+                if row.get("price") not in (None, ""):
+                    row["price"] = float(row["price"])
+                yield row
+        else:
+            for line in f:
+                line = line.strip()
+                if line:
+                    product = json.loads(line)
+                    if "id" in product:
+                        product["id"] = str(product["id"])
+                    yield product
+
+
+# =========================
+# Embedding produk
+# =========================
+def build_context_text(product: Dict) -> str:
+    """Teks konteks produk (format sama dengan notebook)."""
+    return (
+        f"Nama: {product['name']}, Harga:{product['price']} ,"
+        f"Kategori: {product['category']}, Deskripsi: {product['description']}"
+    )
+
+
+def build_product_metadata(product: Dict) -> Dict:
+    metadata = {
+        "product_id": product["id"],
+        "name": product["name"],
+        "price": product["price"],
+        "category": product["category"],
+        "description": product["description"],
+        "image_path": product["image_path"],
+        "source": "multi-modal-product-catalog"
+    }
+    # Material opsional (kolom katalog), disimpan huruf kecil untuk filter $eq
+    if product.get("material"):
+        metadata["material"] = str(product["material"]).strip().lower()
+    return metadata
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """
+    Error upsert yang layak dicoba ulang: gangguan jaringan/timeout atau
+    status HTTP sementara (429, 5xx). Error validasi, autentikasi, dan
+    dimensi vektor yang salah langsung dilempar.
+    """
+    if isinstance(error, (ConnectionError, TimeoutError, TransportError) + RETRYABLE_EMBEDDING_ERRORS):
+        return True
+    # PineconeApiException menyimpan status HTTP di atribut `status`
+    status = getattr(error, "status", None) or getattr(error, "status_code", None)
+    return status in RETRYABLE_STATUS_CODES
+
+
+def retry_with_backoff(
+    fn: Callable,
+    retryable: Tuple[type, ...],
+    max_retries: int = 5,
+    base_delay: float = 1.0,
+    max_delay: float = 30.0,
+    should_retry: Optional[Callable[[BaseException], bool]] = None,
+):
+    """
+    Menjalankan `fn`, mengulang dengan exponential backoff + jitter jika error
+    termasuk `retryable` (dan lolos `should_retry`, jika diberikan).
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return fn()
+        except retryable as e:
+            if attempt == max_retries or (should_retry is not None and not should_retry(e)):
+                raise
+            delay = min(max_delay, base_delay * (2 ** attempt))
+            time.sleep(delay * random.uniform(0.5, 1.0))
+
+
+def create_product_vectors(
+    product: Dict,
+    embeddings_model,
+    max_retries: int = 5,
+) -> List[Dict]:
+    """Menghitung dua vektor (gambar `-IMG` dan teks `-TXT`) untuk satu produk."""
+    image_vector, text_vector = retry_with_backoff(
+        lambda: embeddings_model.embed_image_and_text(
+            product["image_path"],
+            build_context_text(product)
+        ),
+        RETRYABLE_EMBEDDING_ERRORS,
+        max_retries=max_retries,
+    )
+
+    metadata = build_product_metadata(product)
+    return [
+        {
+            "id": f"{product['id']}-IMG",
+            "values": image_vector,
+            "metadata": {**metadata, "vector_type": "image"}
+        },
+        {
+            "id": f"{product['id']}-TXT",
+            "values": text_vector,
+            "metadata": {**metadata, "vector_type": "text"}
+        },
+    ]
+
+
+# =========================
+# Manifest (indexing inkremental)
+# =========================
+PRODUCT_HASH_FIELDS = ("name", "price", "category", "description", "image_path")
+# Field opsional hanya ikut di-hash jika ada, agar hash produk lama tidak berubah
+OPTIONAL_HASH_FIELDS = ("material",)
+
+
+def image_version(image_path: str, fetcher) -> str:
+    """
+    Versi konten gambar produk: ETag/MD5 jika tersedia, jika tidak
+    sha256 dari byte gambar (byte tersebut tetap tersimpan di cache
+    fetcher sehingga tidak diunduh ulang saat embedding).
+    """
+    if image_path.startswith(("http://", "https://", "gs://")):
+        etag = fetcher.etag(image_path)
+        if etag:
+            return f"etag:{etag}"
+        return "sha256:" + hashlib.sha256(fetcher.fetch(image_path)).hexdigest()
+
+    with open(image_path, "rb") as f:
+        return "sha256:" + hashlib.sha256(f.read()).hexdigest()
+
+
+def product_hash(product: Dict, image_hash: str) -> str:
+    payload = {key: product.get(key) for key in PRODUCT_HASH_FIELDS}
+    payload.update({key: product[key] for key in OPTIONAL_HASH_FIELDS if product.get(key)})
+    payload["image"] = image_hash
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class IndexManifest:
+    """
+    Manifest lokal berisi hash konten per produk yang sudah ter-index.
+
+    Format file (JSON):
+    {
+      "model": str,
+      "dimension": int,
+      "products": {product_id: content_hash}
+    }
+
+    Jika model/dimensi embedding berbeda dari manifest (atau `force`),
+    seluruh produk dianggap berubah (re-index penuh).
+    """
+
+    def __init__(self, path: str, model_name: str, dimension: int, force: bool = False):
+        self.path = path
+        self.model_name = model_name
+        self.dimension = dimension
+        self.force = force
+        self.products: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("model") == model_name and data.get("dimension") == dimension:
+                self.products = dict(data.get("products", {}))
+            else:
+                logger.warning("Model/dimensi embedding berubah, seluruh produk akan di-index ulang")
+
+    def is_unchanged(self, product_id: str, content_hash: str) -> bool:
+        with self._lock:
+            return not self.force and self.products.get(product_id) == content_hash
+
+    def update(self, product_id: str, content_hash: str) -> None:
+        with self._lock:
+            self.products[product_id] = content_hash
+
+    def remove(self, product_ids: Iterable[str]) -> None:
+        with self._lock:
+            for product_id in product_ids:
+                self.products.pop(product_id, None)
+
+    def save(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with self._lock, open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "model": self.model_name,
+                "dimension": self.dimension,
+                "products": self.products,
+            }, f, ensure_ascii=False, indent=2, sort_keys=True)
+        # Replace atomik agar manifest tidak rusak jika proses terhenti
+        os.replace(tmp_path, self.path)
+
+
+def delete_products(index, product_ids: List[str], batch_size: int = 500) -> None:
+    """Menghapus vektor `-IMG` dan `-TXT` milik produk dari vector index."""
+    vector_ids = [f"{pid}-{suffix}" for pid in product_ids for suffix in ("IMG", "TXT")]
+    for start in range(0, len(vector_ids), batch_size):
+        index.delete(ids=vector_ids[start:start + batch_size])
+
+
+# =========================
+# Pipeline indexing
+# =========================
+def index_catalog(
+    products: Iterable[Dict],
+    embeddings_model,
+    index,
+    workers: int = 8,
+    batch_size: int = 100,
+    upsert_workers: int = 4,
+    max_retries: int = 5,
+    progress_every: int = 50,
+    manifest: Optional[IndexManifest] = None,
+    delete_missing: bool = True,
+) -> IndexingReport:
+    """
+    Meng-embed dan meng-upsert produk ke vector index.
+
+    Jika `manifest` diberikan, produk yang hash kontennya tidak berubah
+    dilewati, dan (jika `delete_missing`) produk di manifest yang tidak ada
+    lagi di katalog dihapus dari index. Manifest hanya disimpan jika semua
+    upsert berhasil; produk yang gagal akan dicoba lagi di run berikutnya.
+
+    - Embedding dijalankan oleh `workers` thread; jumlah produk yang sedang
+      diproses dibatasi sehingga katalog tidak perlu dimuat seluruhnya.
+    - Vektor dikumpulkan lalu di-upsert per `batch_size` secara paralel
+      oleh `upsert_workers` thread.
+    - Produk yang gagal di-embed dicatat dan dilewati.
+
+    Returns:
+        IndexingReport: jumlah produk/vektor dan throughput.
+    """
+    report = IndexingReport()
+    report_lock = threading.Lock()
+    started = time.perf_counter()
+
+    pending_vectors: List[Dict] = []
+    upsert_futures = []
+    indexed_hashes: Dict[str, str] = {}
+    seen_ids = set()
+
+    def process_product(product: Dict):
+        """Returns (hash konten | None, vektor); vektor kosong = tidak berubah."""
+        content_hash = None
+        if manifest is not None:
+            content_hash = product_hash(
+                product,
+                image_version(product["image_path"], embeddings_model.fetcher)
+            )
+            if manifest.is_unchanged(product["id"], content_hash):
+                return content_hash, []
+        return content_hash, create_product_vectors(product, embeddings_model, max_retries)
+
+    def upsert_batch(batch: List[Dict]) -> None:
+        retry_with_backoff(
+            lambda: index.upsert(vectors=batch),
+            (Exception,),
+            max_retries=max_retries,
+            should_retry=is_transient_error,
+        )
+        with report_lock:
+            report.vectors_upserted += len(batch)
+            report.upsert_batches += 1
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="embed") as embed_pool, \
+            ThreadPoolExecutor(max_workers=upsert_workers, thread_name_prefix="upsert") as upsert_pool:
+
+        in_flight = {}
+
+        def drain(done) -> None:
+            for future in done:
+                product_id = in_flight.pop(future)
+                try:
+                    content_hash, vectors = future.result()
+                    if vectors:
+                        pending_vectors.extend(vectors)
+                        report.products_indexed += 1
+                    else:
+                        report.products_skipped += 1
+                    if content_hash is not None:
+                        indexed_hashes[product_id] = content_hash
+                except Exception as e:
+                    logger.warning("Gagal memproses produk %s: %s", product_id, e)
+                    report.products_failed += 1
+                    report.failed_ids.append(product_id)
+
+                processed = report.products_indexed + report.products_skipped + report.products_failed
+                if progress_every and processed % progress_every == 0:
+                    elapsed = time.perf_counter() - started
+                    logger.info("%d produk diproses (%.1f produk/detik)", processed, processed / elapsed)
+
+            while len(pending_vectors) >= batch_size:
+                batch = pending_vectors[:batch_size]
+                del pending_vectors[:batch_size]
+                upsert_futures.append(upsert_pool.submit(upsert_batch, batch))
+
+        for product in products:
+            # Batasi jumlah produk in-flight agar pembacaan katalog tetap streaming
+            if len(in_flight) >= workers * 2:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                drain(done)
+            # ID dibandingkan sebagai string (lihat read_catalog)
+            if not isinstance(product["id"], str):
+                product = {**product, "id": str(product["id"])}
+            seen_ids.add(product["id"])
+            future = embed_pool.submit(process_product, product)
+            in_flight[future] = product["id"]
+
+        drain(wait(in_flight).done)
+
+        if pending_vectors:
+            upsert_futures.append(upsert_pool.submit(upsert_batch, list(pending_vectors)))
+            pending_vectors.clear()
+
+        # Error upsert (setelah retry habis) dilempar ke pemanggil
+        for future in upsert_futures:
+            future.result()
+
+    if manifest is not None:
+        for product_id, content_hash in indexed_hashes.items():
+            manifest.update(product_id, content_hash)
+
+        if delete_missing:
+            deleted = sorted(set(manifest.products) - seen_ids)
+            if deleted:
+                delete_products(index, deleted)
+                manifest.remove(deleted)
+                report.products_deleted = len(deleted)
+
+        manifest.save()
+
+    report.elapsed_seconds = time.perf_counter() - started
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Indexing katalog produk ke vector index")
+    parser.add_argument("catalog", help="Path katalog produk (.jsonl atau .csv)")
+    parser.add_argument("--workers", type=int, default=8, help="Jumlah worker embedding paralel")
+    parser.add_argument("--batch-size", type=int, default=100, help="Jumlah vektor per upsert")
+    parser.add_argument("--upsert-workers", type=int, default=4, help="Jumlah upsert paralel")
+    parser.add_argument("--max-retries", type=int, default=5, help="Retry maksimum per panggilan")
+    parser.add_argument("--manifest", default=None, help="Path manifest (default: INDEX_MANIFEST_PATH)")
+    parser.add_argument("--full", action="store_true", help="Abaikan manifest dan index ulang semua produk")
+    parser.add_argument("--no-delete", action="store_true", help="Jangan hapus produk yang hilang dari katalog")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    from fastapi_app.config import (
+        get_vector_index, SEARCH_BACKEND, LOCAL_INDEX_PATH, INDEX_MANIFEST_PATH,
+        EMBEDDING_MODEL_NAME, EMBEDDING_DIMENSION
+    )
+    from fastapi_app.services.providers import create_embeddings
+
+    vector_index = get_vector_index()
+    embeddings_model = create_embeddings(
+        model_name=EMBEDDING_MODEL_NAME,
+        dimension=EMBEDDING_DIMENSION
+    )
+
+    manifest = IndexManifest(
+        args.manifest or INDEX_MANIFEST_PATH,
+        EMBEDDING_MODEL_NAME,
+        EMBEDDING_DIMENSION,
+        force=args.full
+    )
+
+    print("--- MEMULAI INDEXING PRODUK ---")
+    report = index_catalog(
+        read_catalog(args.catalog),
+        embeddings_model,
+        vector_index,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        upsert_workers=args.upsert_workers,
+        max_retries=args.max_retries,
+        manifest=manifest,
+        delete_missing=not args.no_delete,
+    )
+
+    if SEARCH_BACKEND == "local":
+        vector_index.save(LOCAL_INDEX_PATH)
+        print(f"Snapshot index lokal disimpan ke {LOCAL_INDEX_PATH}")
+
+    print("\n✅ Proses Indexing Selesai!")
+    print(f"Produk berhasil : {report.products_indexed}")
+    print(f"Tidak berubah   : {report.products_skipped}")
+    print(f"Produk dihapus  : {report.products_deleted}")
+    print(f"Produk gagal    : {report.products_failed}")
+    print(f"Vectors upserted: {report.vectors_upserted} ({report.upsert_batches} batch)")
+    print(
+        f"Durasi          : {report.elapsed_seconds:.1f} detik "
+        f"({report.products_per_second:.1f} produk/detik, "
+        f"{report.vectors_per_second:.1f} vektor/detik)"
+    )
+
+
+if __name__ == "__main__":
+    main()
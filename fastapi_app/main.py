@@ -1,18 +1,211 @@
+import asyncio
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
 from fastapi import FastAPI, HTTPException, UploadFile, File, Form
-from fastapi_app.schemas import SearchRequest, SearchResponse
-from fastapi_app.services.llm import analyze_image_and_text, recommend_products
-from fastapi_app.services.embeddings import VertexAIMultiModalEmbeddings
-from fastapi_app.services.search import search_multimodal
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import ValidationError
+from fastapi_app.schemas import (
+    SearchRequest, SearchFilters, SearchResponse, RecommendationResult, RecommendationPick,
+    BatchSearchRequest, BatchSearchResult
+)
+from fastapi_app.services.llm import (
+    aanalyze_image_and_text, arecommend_products, astream_recommendations,
+    arecommend_product_picks, astream_recommendation_picks, warmup_llm
+)
+from fastapi_app.services.embeddings import decode_base64_image
+from fastapi_app.services.providers import create_embeddings
+from fastapi_app.services.image_processing import normalize_image, detect_mime_type
+from fastapi_app.services.image_fetcher import image_fetcher, ImageFetchError
+from fastapi_app.services.search import (
+    asearch_multimodal, query_modality, get_lexical_index, index_manifest_version, TOP_K
+)
+from fastapi_app.services.batch import arun_batch, query_key
+from fastapi_app.services.embedding_cache import EmbeddingCache
+from fastapi_app.services.response_cache import ResponseCache
+from fastapi_app.services.furniture_gate import FurnitureGate, ACCEPT, REJECT, mentions_price
+from fastapi_app.services.container import services
+from fastapi_app.services.metrics import metrics
+from fastapi_app.config import (
+    EMBEDDING_MODEL_NAME, EMBEDDING_DIMENSION,
+    EMBEDDING_CACHE_MAX_BYTES, EMBEDDING_CACHE_DB, SPECULATIVE_SEARCH,
+    BATCH_MAX_QUERIES, BATCH_CONCURRENCY, RECOMMENDATION_CONTEXT_MODE,
+    IMAGE_NORMALIZATION, IMAGE_MAX_EDGE, IMAGE_OUTPUT_FORMAT, IMAGE_QUALITY,
+    RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL, RESPONSE_CACHE_SIMILARITY,
+    LEXICAL_SEARCH, WARMUP_ENABLED,
+    FURNITURE_GATE_ENABLED, FURNITURE_GATE_ACCEPT_MARGIN, FURNITURE_GATE_REJECT_MARGIN
+)
+
 
-from functools import lru_cache
+logger = logging.getLogger(__name__)
 
+# Provider embedding sesuai EMBEDDING_PROVIDER (Vertex AI atau stand-in lokal)
+embeddings = create_embeddings(
+    model_name=EMBEDDING_MODEL_NAME,
+    dimension=EMBEDDING_DIMENSION
+)
+embedding_cache = EmbeddingCache(
+    max_bytes=EMBEDDING_CACHE_MAX_BYTES,
+    db_path=EMBEDDING_CACHE_DB or None
+)
 
-app = FastAPI(title="Multimodal Furniture Search API")
+def index_version():
+    """
+    Versi isi index: berubah saat index lokal diperbarui atau saat indexer
+    menulis ulang manifest, sehingga cache respons otomatis dikosongkan.
+    """
+    # Index belum dibuat (sebelum warmup/request pertama) -> versi None
+    return getattr(services.loaded("vector_index"), "version", None), index_manifest_version()
+
+response_cache = ResponseCache(
+    max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+    ttl=RESPONSE_CACHE_TTL,
+    similarity_threshold=RESPONSE_CACHE_SIMILARITY,
+    version_fn=index_version
+)
 
-embeddings = VertexAIMultiModalEmbeddings()
-@lru_cache(maxsize=2048)
 def cached_image_and_text_embedding(image_url: str, text: str, embedder):
-    return embedder.embed_image_and_text(image_url, text)
+    # Key berbasis hash isi gambar + teks + model/dimensi (bukan string base64 mentah)
+    key = embedding_cache.make_key(image_url, text, embedder.model_name, embedder.dimension)
+    cached = embedding_cache.get(key)
+    if cached is not None:
+        return cached
+
+    img_vec, txt_vec = embedder.embed_image_and_text(image_url, text)
+    embedding_cache.set(key, (img_vec, txt_vec))
+    return img_vec, txt_vec
+
+# Prototipe gate di-embed lewat cache embedding (tersimpan di tier disk jika aktif)
+furniture_gate = FurnitureGate(
+    embed_fn=lambda label: cached_image_and_text_embedding(None, label, embeddings)[1],
+    accept_margin=FURNITURE_GATE_ACCEPT_MARGIN,
+    reject_margin=FURNITURE_GATE_REJECT_MARGIN
+) if FURNITURE_GATE_ENABLED else None
+
+NOT_FURNITURE_DESCRIPTION = "Input tidak berkaitan dengan produk furniture."
+
+# =========================
+# Lifecycle: warmup saat startup + probe /ready
+# =========================
+def warmup_vector_index():
+    # Membuka koneksi index dengan satu query dummy
+    query_modality([1.0] * EMBEDDING_DIMENSION, "text", top_k=1)
+
+def warmup_embeddings():
+    # Memuat model Vertex AI dan satu embedding dummy
+    cached_image_and_text_embedding(None, "kursi", embeddings)
+
+services.add_warmup("vector_index", warmup_vector_index)
+services.add_warmup("embeddings", warmup_embeddings)
+services.add_warmup("llm", warmup_llm)
+if LEXICAL_SEARCH:
+    # Opsional: tanpa index BM25 pencarian tetap berjalan (skor vektor saja)
+    services.add_warmup("lexical_index", get_lexical_index, required=False)
+if furniture_gate is not None:
+    services.add_warmup("furniture_gate", furniture_gate.prototypes)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warmup berjalan di thread agar server langsung menerima request
+    # (/ready mengembalikan 503 sampai warmup selesai)
+    warmup_task = asyncio.create_task(asyncio.to_thread(services.warmup)) if WARMUP_ENABLED else None
+    yield
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+    await image_fetcher.aclose()
+
+app = FastAPI(title="Multimodal Furniture Search API", lifespan=lifespan)
+
+async def acached_image_and_text_embedding(image_url: str, text: str, embedder):
+    key = embedding_cache.make_key(image_url, text, embedder.model_name, embedder.dimension)
+    cached = await embedding_cache.aget(key)
+    if cached is not None:
+        return cached
+
+    img_vec, txt_vec = await embedder.aembed_image_and_text(image_url, text)
+    await embedding_cache.aset(key, (img_vec, txt_vec))
+    return img_vec, txt_vec
+
+async def aembed_and_search(image_input, query_text: str, **search_kwargs):
+    img_vec, txt_vec = await acached_image_and_text_embedding(
+        image_url=image_input,
+        text=query_text,
+        embedder=embeddings
+    )
+    return await asearch_multimodal(
+        query_vector_text=txt_vec,
+        query_vector_image=img_vec,
+        query_text=query_text,
+        **search_kwargs
+    )
+
+async def prepare_image_bytes(image_bytes: bytes, image_mime_type: str):
+    """
+    Normalisasi byte gambar (resize, buang EXIF, encode ulang) agar analisis
+    LLM, embedding, dan cache memakai byte yang sama.
+
+    Returns:
+        Tuple[bytes, str]: (byte gambar hasil normalisasi, MIME type)
+    """
+    if not IMAGE_NORMALIZATION:
+        return image_bytes, detect_mime_type(image_bytes) or image_mime_type
+
+    try:
+        # Proses CPU-bound (PIL) dijalankan di thread agar event loop tidak terblokir
+        normalized = await asyncio.to_thread(
+            normalize_image,
+            image_bytes,
+            max_edge=IMAGE_MAX_EDGE,
+            output_format=IMAGE_OUTPUT_FORMAT,
+            quality=IMAGE_QUALITY
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return normalized.data, normalized.mime_type
+
+async def resolve_image_input(request: SearchRequest):
+    """
+    Menentukan image input dari request (prioritas: base64 -> bytes -> URL).
+
+    Gambar inline di-decode tepat satu kali menjadi bytes, gambar URL/gs://
+    diunduh lewat pengunduh bersama; bytes tersebut dipakai apa adanya oleh
+    analisis, embedding, dan cache.
+
+    Returns:
+        Tuple[bytes | str | None, str | None]: (image input, MIME type)
+    """
+    image_bytes = None
+    if request.image_base64:
+        try:
+            image_bytes = decode_base64_image(request.image_base64)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    elif request.image_bytes:
+        image_bytes = request.image_bytes
+    elif request.image_url:
+        try:
+            image_bytes = await image_fetcher.afetch(request.image_url)
+        except ImageFetchError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    else:
+        return None, request.image_mime_type
+
+    return await prepare_image_bytes(image_bytes, request.image_mime_type)
+
+def discard_retrieval(task: asyncio.Task, speculative: bool, started: float):
+    """Membatalkan embedding/pencarian yang hasilnya tidak terpakai."""
+    if speculative:
+        metrics.incr("speculative_wasted")
+        metrics.incr("speculative_wasted_seconds", time.perf_counter() - started)
+        # Task sudah selesai -> panggilan embedding & pencarian terbuang penuh
+        if task.done():
+            metrics.incr("speculative_wasted_completed")
+    task.cancel()
 
 @app.get("/")
 def welcome():
@@ -25,50 +218,248 @@ def welcome():
         },
         "note": "Gunakan endpoint /search dengan upload image + query text"
     }
-    
-@app.post("/search", response_model=SearchResponse)
-def search(request: SearchRequest):
-    
+
+@app.get("/ready")
+def ready():
+    """Readiness probe: 200 setelah warmup selesai tanpa error, selain itu 503."""
+    status = services.status()
+    if not WARMUP_ENABLED:
+        status["ready"] = True
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+@app.get("/metrics")
+def get_metrics():
+    return {
+        "embedding_cache": embedding_cache.stats(),
+        "image_fetcher": image_fetcher.stats(),
+        "response_cache": response_cache.stats(),
+        "counters": metrics.snapshot()
+    }
+
+@app.post("/cache/invalidate")
+def invalidate_cache():
+    """Mengosongkan cache respons (mis. setelah index Pinecone dibangun ulang)."""
+    response_cache.invalidate()
+    return {"status": "ok"}
+
+def request_image_ref(request: SearchRequest):
+    """Input gambar mentah dari request (sebelum di-decode/diunduh)."""
+    return request.image_base64 or request.image_bytes or request.image_url
+
+def request_filters(request: SearchRequest) -> dict:
+    """Filter eksplisit dari request (field kosong dibuang)."""
+    return request.filters.model_dump(exclude_none=True) if request.filters else {}
+
+def merge_filters(filters: dict, analysis: dict) -> dict:
+    """Filter request dilengkapi batas harga hasil ekstraksi analisis (request diutamakan)."""
+    extracted = analysis.get("filters") or {}
+    merged = dict(filters)
+    for key in ("min_price", "max_price"):
+        if key not in merged and extracted.get(key) is not None:
+            merged[key] = extracted[key]
+    return merged
+
+async def prepare_search(request: SearchRequest):
+    """
+    Validasi request, cek tier exact cache respons (sebelum gambar
+    diproses), lalu resolve gambar. Tier semantik dicek kemudian di
+    `analyze_and_retrieve`, setelah embedding & analisis selesai.
+
+    Returns:
+        Tuple[dict | None, dict | None]: respons dari cache (None jika miss)
+        dan state untuk melanjutkan pipeline (cache_key, image_input,
+        image_mime_type, filters, search_filters, text_vector, cached).
+    """
     # cek apakah ada input teks, jika tidak ada maka berikan peringatan 
     if not request.query_text:
         raise HTTPException(status_code=400, detail="query_text is required")
-    
+
+    filters = request_filters(request)
+    cache_key = response_cache.make_key(request_image_ref(request), request.query_text, filters)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached, None
+
     # =========================
     # Tentukan image input
     # =========================
-    image_input = None
-    if request.image_base64:
-        image_input = request.image_base64   # PRIORITAS
-    elif request.image_url:
-        image_input = request.image_url
-        
-    # Validasi apakah furniture atau tidak
-    analysis = analyze_image_and_text(
-        image_input=image_input,
-        query_text=request.query_text,
-        image_mime_type=request.image_mime_type
+    image_input, image_mime_type = await resolve_image_input(request)
+    state = {
+        "cache_key": cache_key,
+        "image_input": image_input,
+        "image_mime_type": image_mime_type,
+        "filters": filters,
+        # Filter final (request + hasil analisis) dan hasil tier semantik
+        "search_filters": filters,
+        "text_vector": None,
+        "cached": None
+    }
+    return None, state
+
+def cache_response(state: dict, response: dict) -> None:
+    response_cache.set(
+        state["cache_key"],
+        response,
+        text_vector=state["text_vector"],
+        image_input=state["image_input"],
+        filters=state["search_filters"]
     )
+    
+async def furniture_gate_analysis(embed_task: asyncio.Task, image_input, query_text: str):
+    """
+    Fast path gate furniture berbasis embedding (memakai task embedding
+    bersama dengan tahap pencarian).
+
+    Returns:
+        dict | None: hasil analisis jika keputusan sudah pasti, atau None
+        jika request perlu dianalisis Gemini.
+    """
+    if furniture_gate is None:
+        return None
+
+    # shield: membatalkan gate tidak ikut membatalkan embedding-nya
+    img_vec, txt_vec = await asyncio.shield(embed_task)
+    # Prototipe di-embed saat pertama dipakai -> jalankan di thread
+    decision = await asyncio.to_thread(furniture_gate.classify, img_vec, txt_vec)
+    metrics.incr(f"furniture_gate_{decision}")
+
+    if decision == REJECT:
+        return {"is_furniture": False, "description": NOT_FURNITURE_DESCRIPTION}
+    # Prompt rekomendasi hanya menerima deskripsi teks, jadi query bergambar
+    # tetap dianalisis Gemini agar warna/material dari gambar tidak hilang.
+    # Begitu juga query yang menyebut harga: batas harganya diekstrak analisis.
+    if decision == ACCEPT and image_input is None and not mentions_price(query_text):
+        return {"is_furniture": True, "description": query_text}
+    return None
+
+async def asearch_after_embedding(embed_task: asyncio.Task, query_text: str, **search_kwargs):
+    """Pencarian spekulatif yang memakai hasil task embedding bersama."""
+    # shield: membatalkan pencarian tidak ikut membatalkan embedding-nya
+    img_vec, txt_vec = await asyncio.shield(embed_task)
+    return await asearch_multimodal(
+        query_vector_text=txt_vec,
+        query_vector_image=img_vec,
+        query_text=query_text,
+        **search_kwargs
+    )
+
+async def analyze_and_retrieve(request: SearchRequest, state: dict):
+    """
+    Tahap pipeline sebelum rekomendasi: validasi furniture + pencarian.
+
+    Jika tier semantik cache respons hit, respons tersimpan diletakkan di
+    `state["cached"]` dan tahap rekomendasi dilewati oleh pemanggil.
+
+    Returns:
+        Tuple[dict, List[dict]]: hasil analisis LLM dan hasil pencarian
+        (list kosong jika input bukan furniture).
+    """
+    image_input = state["image_input"]
+    image_mime_type = state["image_mime_type"]
+
+    # Embedding tidak bergantung pada hasil analisis, jadi dijalankan
+    # bersamaan dengan validasi furniture (Gemini). Gate furniture memakai
+    # embedding yang sama; analisis dibatalkan jika gate sudah memutuskan.
+    started = time.perf_counter()
+    embed_task = asyncio.create_task(
+        acached_image_and_text_embedding(
+            image_url=image_input,
+            text=request.query_text,
+            embedder=embeddings
+        )
+    )
+    analysis_task = asyncio.create_task(
+        aanalyze_image_and_text(
+            image_input=image_input,
+            query_text=request.query_text,
+            image_mime_type=image_mime_type
+        )
+    )
+
+    try:
+        gate_analysis = await furniture_gate_analysis(embed_task, image_input, request.query_text)
+    except BaseException:
+        analysis_task.cancel()
+        embed_task.cancel()
+        raise
+    if gate_analysis is not None:
+        analysis_task.cancel()
+        if not gate_analysis["is_furniture"]:
+            return gate_analysis, []
+
+    # Pada mode spekulatif, pencarian langsung dijalankan begitu embedding
+    # tersedia (mayoritas trafik adalah furniture).
+    speculative = SPECULATIVE_SEARCH
+    retrieval_task = None
+    if speculative:
+        metrics.incr("speculative_started")
+        retrieval_task = asyncio.create_task(
+            asearch_after_embedding(embed_task, request.query_text, filters=state["filters"])
+        )
+
+    # Validasi apakah furniture atau tidak
+    try:
+        analysis = gate_analysis or await analysis_task
+    except BaseException:
+        analysis_task.cancel()
+        embed_task.cancel()
+        if retrieval_task is not None:
+            retrieval_task.cancel()
+        raise
     # print(analysis)
     # STOP jika bukan furniture
     if not analysis.get("is_furniture", False):
-        return {
-            "is_furniture": False,
-            "description": analysis.get("description", ""),
-            "results": [],
-            "recommendations": []
-        }
+        if retrieval_task is not None:
+            discard_retrieval(retrieval_task, speculative, started)
+        embed_task.cancel()
+        return analysis, []
     
     
-    img_vec, txt_vec = cached_image_and_text_embedding(
-        image_url=image_input,
-        text=request.query_text,
-        embedder=embeddings
-    )
+    # Batas harga dari query (mis. "di bawah 1 juta") ikut difilter di vector index
+    filters = merge_filters(state["filters"], analysis)
+    state["search_filters"] = filters
+
+    try:
+        img_vec, txt_vec = await embed_task
+    except BaseException:
+        if retrieval_task is not None:
+            retrieval_task.cancel()
+        raise
+    state["text_vector"] = txt_vec
+
+    # Tier semantik: hanya query dengan gambar & filter final (termasuk
+    # batas harga hasil analisis) yang sama yang bisa memakai ulang respons
+    cached = response_cache.get_similar(txt_vec, image_input, filters)
+    if cached is not None:
+        if retrieval_task is not None:
+            discard_retrieval(retrieval_task, speculative, started)
+        state["cached"] = cached
+        return analysis, cached["results"]
 
-    # lakaukan pencarian top K products yang cocok
-    results = search_multimodal(query_vector_text=txt_vec, query_vector_image=img_vec) 
+    if speculative and filters != state["filters"]:
+        # Pencarian spekulatif belum memakai filter hasil analisis -> ulangi
+        # (embedding sudah tersedia, jadi hanya query index yang diulang)
+        discard_retrieval(retrieval_task, speculative, started)
+        results = None
+    elif speculative:
+        results = await retrieval_task
+        metrics.incr("speculative_used")
+    else:
+        results = None
+
+    if results is None:
+        # lakaukan pencarian top K products yang cocok
+        results = await asearch_multimodal(
+            query_vector_text=txt_vec,
+            query_vector_image=img_vec,
+            query_text=request.query_text,
+            filters=filters
+        )
+    return analysis, results
+
+def build_context(results):
     # Ambil beberapa key di metadata agar tidak terlalu besar
-    context_str = [
+    return [
         {
             # "id": r["id"],
             "name": r["metadata"].get("name", "Unknown Product"),
@@ -78,16 +469,263 @@ def search(request: SearchRequest):
         }
         for r in results
     ]
-    products = recommend_products(
+
+def rehydrate_pick(pick: dict, context: list, seen: set):
+    """
+    Mode konteks compact: melengkapi pilihan LLM ({"id", "reason"})
+    menjadi RecommendationResult dari metadata hasil pencarian.
+
+    Returns:
+        dict | None: produk lengkap, atau None jika nomor tidak valid
+        atau produk sudah direkomendasikan.
+    """
+    try:
+        pick = RecommendationPick.model_validate(pick)
+    except ValidationError:
+        metrics.incr("llm_malformed_recommendations")
+        return None
+    if not 1 <= pick.id <= len(context) or pick.id in seen:
+        return None
+    seen.add(pick.id)
+    try:
+        product = RecommendationResult(**context[pick.id - 1], reason=pick.reason)
+    except ValidationError:
+        return None
+    return product.model_dump()
+
+async def arecommend(query_text: str, description: str, results: list) -> list:
+    """Rekomendasi LLM sesuai RECOMMENDATION_CONTEXT_MODE."""
+    context = build_context(results)
+    if RECOMMENDATION_CONTEXT_MODE != "compact":
+        return await arecommend_products(
+            query_text=query_text,
+            description=description,
+            context_str=context
+        )
+
+    picks = await arecommend_product_picks(
+        query_text=query_text,
+        description=description,
+        context_str=context
+    )
+    seen = set()
+    products = [rehydrate_pick(pick, context, seen) for pick in picks]
+    return [product for product in products if product is not None]
+
+async def astream_recommend(query_text: str, description: str, results: list):
+    """Versi streaming `arecommend`: yield satu produk valid per rekomendasi."""
+    context = build_context(results)
+    if RECOMMENDATION_CONTEXT_MODE == "compact":
+        seen = set()
+        async for pick in astream_recommendation_picks(
+            query_text=query_text,
+            description=description,
+            context_str=context
+        ):
+            product = rehydrate_pick(pick, context, seen)
+            if product is not None:
+                yield product
+        return
+
+    async for product in astream_recommendations(
+        query_text=query_text,
+        description=description,
+        context_str=context
+    ):
+        try:
+            product = RecommendationResult.model_validate(product)
+        except ValidationError:
+            metrics.incr("llm_malformed_recommendations")
+            continue
+        yield product.model_dump()
+
+async def run_search_pipeline(request: SearchRequest):
+    cached, state = await prepare_search(request)
+    if cached is not None:
+        return cached
+
+    analysis, results = await analyze_and_retrieve(request, state)
+    if state["cached"] is not None:
+        return state["cached"]
+    if not analysis.get("is_furniture", False):
+        response = {
+            "is_furniture": False,
+            "description": analysis.get("description", ""),
+            "results": [],
+            "recommendations": []
+        }
+        cache_response(state, response)
+        return response
+
+    products = await arecommend(
         query_text=request.query_text,
         description=analysis["description"],
-        context_str=context_str
+        results=results
     )
     
     # print(products)
-    return {
+    response = {
         "is_furniture": analysis["is_furniture"],
         "description": analysis["description"],
         "results": results,
         'recommendations': products
     }
+    cache_response(state, response)
+    return response
+
+@app.post("/search", response_model=SearchResponse)
+async def search(request: SearchRequest):
+    return await run_search_pipeline(request)
+
+@app.post("/search/upload", response_model=SearchResponse)
+async def search_upload(
+    query_text: str = Form(...),
+    image: Optional[UploadFile] = File(None),
+    image_url: Optional[str] = Form(None),
+    min_price: Optional[float] = Form(None),
+    max_price: Optional[float] = Form(None),
+    category: Optional[str] = Form(None),
+    material: Optional[str] = Form(None)
+):
+    """
+    Versi multipart dari /search: gambar dikirim sebagai file sehingga
+    tidak ada inflasi ~33% dari base64 maupun parsing JSON berukuran besar.
+    """
+    request = SearchRequest(
+        query_text=query_text,
+        image_bytes=await image.read() if image else None,
+        image_mime_type=image.content_type if image else None,
+        image_url=image_url,
+        filters=SearchFilters(
+            min_price=min_price,
+            max_price=max_price,
+            category=category,
+            material=material
+        )
+    )
+    return await run_search_pipeline(request)
+
+def sse_event(event: str, data) -> str:
+    """Format satu event Server-Sent Events."""
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+@app.post("/search/stream")
+async def search_stream(request: SearchRequest):
+    """
+    Versi streaming dari /search (Server-Sent Events).
+
+    Urutan event:
+    - `results`: hasil analisis + hasil pencarian (dikirim segera)
+    - `recommendation`: satu event per produk, segera setelah object
+      JSON-nya lengkap di-stream oleh LLM
+    - `error`: jika LLM gagal di tengah stream
+    - `done`: akhir stream
+    """
+    # Error validasi/analisis masih dikembalikan sebagai HTTP error biasa
+    cached, state = await prepare_search(request)
+    if cached is None:
+        analysis, results = await analyze_and_retrieve(request, state)
+        cached = state["cached"]
+
+    if cached is not None:
+        async def stream():
+            yield sse_event("results", {
+                "is_furniture": cached["is_furniture"],
+                "description": cached["description"],
+                "results": cached["results"]
+            })
+            for product in cached["recommendations"]:
+                yield sse_event("recommendation", product)
+            yield sse_event("done", {})
+    else:
+        is_furniture = analysis.get("is_furniture", False)
+        description = analysis.get("description", "")
+
+        async def stream():
+            yield sse_event("results", {
+                "is_furniture": is_furniture,
+                "description": description,
+                "results": results
+            })
+            products = []
+            if is_furniture:
+                try:
+                    async for product in astream_recommend(
+                        query_text=request.query_text,
+                        description=description,
+                        results=results
+                    ):
+                        products.append(product)
+                        yield sse_event("recommendation", product)
+                except Exception as e:
+                    logger.exception("Streaming rekomendasi gagal")
+                    yield sse_event("error", {"detail": str(e)})
+                    products = None
+            # Respons hanya di-cache jika stream selesai tanpa error
+            if products is not None:
+                cache_response(state, {
+                    "is_furniture": is_furniture,
+                    "description": description,
+                    "results": results if is_furniture else [],
+                    "recommendations": products
+                })
+            yield sse_event("done", {})
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/search/batch")
+async def search_batch(request: BatchSearchRequest):
+    """
+    Pencarian untuk banyak query sekaligus (job bulk/offline).
+
+    Query identik di-dedupe, embedding dan query vector index dijalankan
+    paralel (BATCH_CONCURRENCY), dan hasil dikirim sebagai NDJSON: satu
+    baris `BatchSearchResult` per query segera setelah query tersebut
+    selesai (urutan tidak dijamin, gunakan field `index`).
+
+    Dengan `include_recommendations`, setiap query menjalankan pipeline
+    /search apa adanya (TOP_K hasil, cache respons yang sama), sehingga
+    `top_k` diabaikan. Hasilnya dikirim di field `response` (hasil
+    pencarian di `response.results`), dan `results` dibiarkan kosong.
+    """
+    if len(request.queries) > BATCH_MAX_QUERIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Maksimum {BATCH_MAX_QUERIES} query per batch"
+        )
+
+    top_k = request.top_k or TOP_K
+
+    async def worker(query: SearchRequest):
+        if request.include_recommendations:
+            return await run_search_pipeline(query)
+        if not query.query_text:
+            raise HTTPException(status_code=400, detail="query_text is required")
+        image_input, _ = await resolve_image_input(query)
+        return await aembed_and_search(
+            image_input, query.query_text, top_k=top_k, filters=request_filters(query)
+        )
+
+    def key_fn(query: SearchRequest):
+        filters = query.filters.model_dump_json() if query.filters else ""
+        return query_key(request_image_ref(query), query.query_text), filters
+
+    async def stream():
+        async for index, outcome in arun_batch(
+            request.queries, worker, key_fn, BATCH_CONCURRENCY
+        ):
+            if isinstance(outcome, HTTPException):
+                line = BatchSearchResult(index=index, error=str(outcome.detail))
+            elif isinstance(outcome, Exception):
+                line = BatchSearchResult(index=index, error=str(outcome))
+            elif request.include_recommendations:
+                line = BatchSearchResult(index=index, response=outcome)
+            else:
+                line = BatchSearchResult(index=index, results=outcome)
+            yield line.model_dump_json() + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
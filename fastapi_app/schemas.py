@@ -1,7 +1,18 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, Dict, Any, List
 
+class SearchFilters(BaseModel):
+    """Filter metadata produk yang diterapkan langsung pada query vector index."""
+    min_price: Optional[float] = Field(None, description="Harga minimum (Rp)")
+    max_price: Optional[float] = Field(None, description="Harga maksimum (Rp)")
+    category: Optional[str] = Field(None, description="Kategori produk (sama persis)")
+    material: Optional[str] = Field(None, description="Material utama, mis. kayu, besi")
+
+
 class SearchRequest(BaseModel):
+    # image_bytes pada request JSON dikirim sebagai string base64
+    model_config = ConfigDict(val_json_bytes="base64")
+
     query_text: str
     image_mime_type: Optional[str] = Field(
         None,
@@ -19,6 +30,10 @@ class SearchRequest(BaseModel):
         None,
         description="URL gambar (http/https atau gs://)"
     )
+    filters: Optional[SearchFilters] = Field(
+        None,
+        description="Filter harga/kategori/material (dilengkapi dari analisis query)"
+    )
 
 class SearchResult(BaseModel):
     id: str
@@ -30,6 +45,47 @@ class RecommendationResult(BaseModel):
     price: float
     description: str
     image_path: str
+    reason: Optional[str] = Field(
+        None,
+        description="Alasan singkat rekomendasi (mode konteks compact)"
+    )
+
+
+class PriceFilter(BaseModel):
+    """Batas harga yang disebutkan pengguna (hasil ekstraksi analisis)."""
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+
+
+class ProductAnalysis(BaseModel):
+    """Schema output terstruktur untuk analisis furniture oleh LLM."""
+    is_furniture: bool
+    description: str
+    filters: Optional[PriceFilter] = None
+
+
+class RecommendationList(BaseModel):
+    """Schema output terstruktur untuk rekomendasi produk oleh LLM."""
+    recommendations: List[RecommendationResult] = Field(
+        ...,
+        max_length=3,
+        description="1-3 produk paling relevan, kosong jika tidak ada"
+    )
+
+
+class RecommendationPick(BaseModel):
+    """Produk pilihan LLM pada mode konteks compact."""
+    id: int = Field(..., description="Nomor produk pada tabel kandidat")
+    reason: str = Field(..., description="Alasan singkat (<150 karakter)")
+
+
+class RecommendationPickList(BaseModel):
+    """Schema output terstruktur untuk mode konteks compact."""
+    recommendations: List[RecommendationPick] = Field(
+        ...,
+        max_length=3,
+        description="1-3 nomor produk paling relevan, kosong jika tidak ada"
+    )
 
 
 class SearchResponse(BaseModel):
@@ -37,3 +93,32 @@ class SearchResponse(BaseModel):
     description: str
     results: List[SearchResult]
     recommendations: List[RecommendationResult]
+
+
+class BatchSearchRequest(BaseModel):
+    queries: List[SearchRequest] = Field(
+        ...,
+        description="Daftar query; query identik hanya diproses sekali"
+    )
+    top_k: Optional[int] = Field(
+        None,
+        ge=1,
+        le=100,
+        description=(
+            "Jumlah hasil per query (default: TOP_K). Hanya berlaku tanpa "
+            "include_recommendations; pipeline lengkap selalu memakai TOP_K "
+            "seperti /search"
+        )
+    )
+    include_recommendations: bool = Field(
+        False,
+        description="Jalankan pipeline lengkap (analisis + rekomendasi LLM) per query"
+    )
+
+
+class BatchSearchResult(BaseModel):
+    index: int
+    # Kosong jika `response` diisi (hasil pencarian ada di response.results)
+    results: List[SearchResult] = []
+    response: Optional[SearchResponse] = None
+    error: Optional[str] = None
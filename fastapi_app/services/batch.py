@@ -0,0 +1,102 @@
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Hashable, List, Sequence, Tuple
+
+from fastapi_app.services.embedding_cache import raw_fingerprint, normalize_text
+from fastapi_app.services.search import asearch_multimodal
+
+
+def query_key(image_input, query_text: str) -> str:
+    """Key deduplikasi: sidik jari input gambar mentah + teks yang dinormalisasi."""
+    return f"{raw_fingerprint(image_input)}|{normalize_text(query_text)}"
+
+
+async def arun_batch(
+    items: Sequence[Any],
+    worker: Callable[[Any], Awaitable[Any]],
+    key_fn: Callable[[Any], Hashable],
+    concurrency: int = 8,
+) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Menjalankan `worker` untuk banyak item dengan konkurensi terbatas.
+
+    Item dengan key yang sama hanya dikerjakan sekali dan hasilnya dipakai
+    bersama. Hasil di-yield segera setelah selesai (tidak berurutan)
+    sebagai pasangan (index item, hasil | Exception).
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    groups = {}  # key -> [index item]
+    for index, item in enumerate(items):
+        groups.setdefault(key_fn(item), []).append(index)
+
+    async def run(indexes: List[int]):
+        async with semaphore:
+            try:
+                return indexes, await worker(items[indexes[0]])
+            except Exception as e:
+                return indexes, e
+
+    tasks = [asyncio.create_task(run(indexes)) for indexes in groups.values()]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            indexes, outcome = await next_done
+            for index in indexes:
+                yield index, outcome
+    finally:
+        # Klien memutus stream -> batalkan pekerjaan yang tersisa
+        for task in tasks:
+            task.cancel()
+
+
+async def asearch_batch(
+    queries: Sequence[Tuple[Any, str]],
+    embed_fn: Callable[[Any, str], Awaitable[Tuple[list, list]]],
+    concurrency: int = 8,
+    **search_kwargs,
+) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Pencarian multimodal untuk banyak query (image_input, query_text).
+
+    Query identik di-dedupe, embedding dijalankan paralel lewat `embed_fn`
+    (mis. embedding yang sudah melewati cache), dan query ke vector index
+    dikirim bersamaan melalui `asearch_multimodal`.
+
+    Yields:
+        Tuple[int, List[dict] | Exception]: index query dan hasil pencariannya.
+    """
+    async def worker(query):
+        image_input, query_text = query
+        img_vec, txt_vec = await embed_fn(image_input, query_text)
+        return await asearch_multimodal(
+            query_vector_text=txt_vec,
+            query_vector_image=img_vec,
+            query_text=query_text,
+            **search_kwargs
+        )
+
+    async for index, outcome in arun_batch(
+        queries, worker, lambda query: query_key(*query), concurrency
+    ):
+        yield index, outcome
+
+
+def search_batch(
+    queries: Sequence[Tuple[Any, str]],
+    embed_fn: Callable[[Any, str], Awaitable[Tuple[list, list]]],
+    concurrency: int = 8,
+    **search_kwargs,
+) -> List[Any]:
+    """
+    Versi sync `asearch_batch` untuk job offline (skrip/notebook).
+
+    Returns:
+        List: hasil per query sesuai urutan input (List[dict] atau Exception).
+    """
+    async def collect():
+        results = [None] * len(queries)
+        async for index, outcome in asearch_batch(
+            queries, embed_fn, concurrency, **search_kwargs
+        ):
+            results[index] = outcome
+        return results
+
+    return asyncio.run(collect())
@@ -0,0 +1,105 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceContainer:
+    """
+    Wadah klien berat (Vertex AI, Pinecone, LLM, model embedding).
+
+    Setiap service didaftarkan sebagai factory dan baru dibuat saat pertama
+    kali dipakai (thread-safe), sehingga import modul tetap ringan dan bisa
+    dilakukan tanpa kredensial/jaringan. Instance dipakai bersama oleh semua
+    request dalam satu proses worker.
+
+    Saat startup, `warmup` membuat service yang terdaftar lebih dulu dan
+    menjalankan langkah pemanasan (mis. satu embedding/query dummy) agar
+    request pertama tidak menanggung cold start; hasilnya dilaporkan lewat
+    `status()` untuk probe /ready.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+        self._warmups = []  # [(nama langkah, fungsi, wajib)]
+        self._warmup_status: Dict[str, dict] = {}
+        self._warmup_started = False
+        self._warmup_finished = False
+
+    def register(self, name: str, factory: Callable[[], Any]) -> None:
+        """Mendaftarkan factory service (dipanggil paling banyak sekali)."""
+        with self._lock:
+            self._factories[name] = factory
+
+    def get(self, name: str) -> Any:
+        """Instance service; dibuat saat pertama kali diminta."""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._lock:
+            if name not in self._instances:
+                started = time.perf_counter()
+                self._instances[name] = self._factories[name]()
+                logger.info(
+                    "Service %s dibuat dalam %.2f detik", name, time.perf_counter() - started
+                )
+            return self._instances[name]
+
+    def loaded(self, name: str) -> Optional[Any]:
+        """Instance service jika sudah dibuat, tanpa memicu pembuatan."""
+        return self._instances.get(name)
+
+    def add_warmup(self, name: str, fn: Callable[[], Any], required: bool = True) -> None:
+        """
+        Menambahkan langkah pemanasan (dijalankan berurutan oleh `warmup`).
+        Kegagalan langkah opsional (`required=False`, mis. fitur yang bisa
+        dilewati saat request) dicatat tetapi tidak membuat /ready gagal.
+        """
+        self._warmups.append((name, fn, required))
+
+    def warmup(self) -> bool:
+        """
+        Menjalankan seluruh langkah pemanasan (blocking).
+
+        Kegagalan satu langkah dicatat dan tidak menghentikan langkah lain.
+
+        Returns:
+            bool: True jika semua langkah wajib berhasil.
+        """
+        self._warmup_started = True
+        for name, fn, required in self._warmups:
+            started = time.perf_counter()
+            try:
+                fn()
+                status = {"ok": True}
+            except Exception as e:
+                logger.exception("Warmup %s gagal", name)
+                status = {"ok": False, "error": str(e)}
+            status["required"] = required
+            status["seconds"] = round(time.perf_counter() - started, 3)
+            self._warmup_status[name] = status
+        self._warmup_finished = True
+        return self.ready
+
+    @property
+    def ready(self) -> bool:
+        return self._warmup_finished and all(
+            status["ok"] for status in self._warmup_status.values() if status["required"]
+        )
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready,
+            "warmup_started": self._warmup_started,
+            "warmup_finished": self._warmup_finished,
+            "steps": dict(self._warmup_status),
+            "services": sorted(self._instances),
+        }
+
+
+# Instance global yang dipakai bersama oleh semua modul
+services = ServiceContainer()
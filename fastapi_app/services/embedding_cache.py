@@ -0,0 +1,234 @@
+import asyncio
+import base64
+import binascii
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+
+
+EmbeddingPair = Tuple[Optional[List[float]], Optional[List[float]]]
+
+# Perkiraan overhead per entri (key, tuple, header array) di luar data vektor
+_ENTRY_OVERHEAD_BYTES = 256
+
+
+def normalize_text(text: str) -> str:
+    """Normalisasi teks untuk key cache: spasi dirapikan dan huruf kecil."""
+    return " ".join((text or "").split()).casefold()
+
+
+def image_fingerprint(image_input: Union[str, bytes, None]) -> str:
+    """
+    Sidik jari gambar untuk key cache.
+
+    - bytes / base64  -> sha256 dari byte gambar hasil decode
+    - URL / gs:// / path -> sha256 dari string referensinya
+    - None / ""       -> string kosong (query tanpa gambar)
+    """
+    if not image_input:
+        return ""
+    if isinstance(image_input, (bytes, bytearray, memoryview)):
+        return "sha256:" + hashlib.sha256(image_input).hexdigest()
+    if not image_input.startswith(("http://", "https://", "gs://")):
+        try:
+            image_bytes = base64.b64decode(image_input, validate=True)
+            return "sha256:" + hashlib.sha256(image_bytes).hexdigest()
+        except (binascii.Error, ValueError):
+            pass
+    return "ref:" + hashlib.sha256(image_input.encode("utf-8")).hexdigest()
+
+
+def raw_fingerprint(image_input: Union[str, bytes, None]) -> str:
+    """
+    Sidik jari input gambar mentah dari request, tanpa decode base64:
+    sha256 langsung dari string (base64/URL) atau byte-nya. Untuk key yang
+    dihitung sebelum gambar diproses (tier exact cache respons, deduplikasi
+    batch), agar gambar tetap di-decode tepat sekali oleh pipeline.
+    """
+    if not image_input:
+        return ""
+    if isinstance(image_input, str):
+        image_input = image_input.encode("utf-8")
+    return "raw:" + hashlib.sha256(image_input).hexdigest()
+
+
+def _to_blob(vector) -> Optional[bytes]:
+    if vector is None:
+        return None
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+
+def _from_blob(blob) -> Optional[List[float]]:
+    if blob is None:
+        return None
+    return np.frombuffer(blob, dtype=np.float32).tolist()
+
+
+class EmbeddingCache:
+    """
+    Cache embedding (image, text) yang dialamatkan berdasarkan konten.
+
+    Key berupa hash dari sidik jari gambar (hash byte gambar), teks yang
+    dinormalisasi, serta nama model dan dimensi embedding, sehingga cache
+    tidak menyimpan string base64 berukuran besar.
+
+    Terdiri dari dua tier:
+    - Memori: LRU dengan batas total ukuran (byte), vektor disimpan float32.
+    - Disk (opsional): SQLite yang dapat dipakai bersama oleh semua worker
+      uvicorn. Hit di disk dipromosikan ke tier memori.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, db_path: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.db_path = db_path
+
+        self._memory = OrderedDict()  # key -> (image_blob, text_blob)
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.db_path:
+            with self._connection() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings ("
+                    " key TEXT PRIMARY KEY,"
+                    " image BLOB,"
+                    " text BLOB)"
+                )
+
+    @staticmethod
+    def make_key(
+        image_input: Union[str, bytes, None],
+        text: str,
+        model_name: str,
+        dimension: int,
+    ) -> str:
+        raw = "\x1f".join([
+            model_name,
+            str(dimension),
+            image_fingerprint(image_input),
+            normalize_text(text),
+        ])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    # =========================
+    # Tier disk (SQLite)
+    # =========================
+    def _connection(self) -> sqlite3.Connection:
+        # Satu koneksi per thread; WAL agar aman dibaca/ditulis banyak proses
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _disk_get(self, key: str):
+        row = self._connection().execute(
+            "SELECT image, text FROM embeddings WHERE key = ?", (key,)
+        ).fetchone()
+        return tuple(row) if row else None
+
+    def _disk_set(self, key: str, blobs) -> None:
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO embeddings (key, image, text) VALUES (?, ?, ?)",
+                (key, *blobs),
+            )
+
+    # =========================
+    # Tier memori (LRU)
+    # =========================
+    @staticmethod
+    def _entry_size(key: str, blobs) -> int:
+        return len(key) + _ENTRY_OVERHEAD_BYTES + sum(len(b) for b in blobs if b)
+
+    def _memory_set(self, key: str, blobs) -> None:
+        with self._lock:
+            if key in self._memory:
+                self._memory_bytes -= self._entry_size(key, self._memory.pop(key))
+            self._memory[key] = blobs
+            self._memory_bytes += self._entry_size(key, blobs)
+
+            while self._memory_bytes > self.max_bytes and self._memory:
+                old_key, old_blobs = self._memory.popitem(last=False)
+                self._memory_bytes -= self._entry_size(old_key, old_blobs)
+                self.evictions += 1
+
+    # =========================
+    # API publik
+    # =========================
+    def _memory_get(self, key: str):
+        with self._lock:
+            blobs = self._memory.get(key)
+            if blobs is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+        return blobs
+
+    def _disk_lookup(self, key: str):
+        """Lookup tier disk; hit dipromosikan ke tier memori."""
+        blobs = self._disk_get(key)
+        if blobs is not None:
+            with self._lock:
+                self.disk_hits += 1
+            self._memory_set(key, blobs)
+        return blobs
+
+    def _result(self, blobs) -> Optional[EmbeddingPair]:
+        if blobs is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        return _from_blob(blobs[0]), _from_blob(blobs[1])
+
+    def get(self, key: str) -> Optional[EmbeddingPair]:
+        blobs = self._memory_get(key)
+        if blobs is None and self.db_path:
+            blobs = self._disk_lookup(key)
+        return self._result(blobs)
+
+    def set(self, key: str, value: EmbeddingPair) -> None:
+        blobs = (_to_blob(value[0]), _to_blob(value[1]))
+        self._memory_set(key, blobs)
+        if self.db_path:
+            self._disk_set(key, blobs)
+
+    async def aget(self, key: str) -> Optional[EmbeddingPair]:
+        """Versi async `get`: query SQLite dijalankan di thread agar event loop tidak terblokir."""
+        blobs = self._memory_get(key)
+        if blobs is None and self.db_path:
+            blobs = await asyncio.to_thread(self._disk_lookup, key)
+        return self._result(blobs)
+
+    async def aset(self, key: str, value: EmbeddingPair) -> None:
+        """Versi async `set`: penulisan SQLite dijalankan di thread."""
+        blobs = (_to_blob(value[0]), _to_blob(value[1]))
+        self._memory_set(key, blobs)
+        if self.db_path:
+            await asyncio.to_thread(self._disk_set, key, blobs)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "max_bytes": self.max_bytes,
+                "disk_enabled": bool(self.db_path),
+            }
@@ -1,22 +1,81 @@
-from typing import Tuple, List
-from vertexai.vision_models import MultiModalEmbeddingModel, Image
-import requests
+from typing import Tuple, List, Union
+from fastapi_app.services.image_fetcher import ImageFetcher, image_fetcher
+import asyncio
+import threading
 from io import BytesIO
 import base64
+import os
 # from PIL import Image
 
+# Tipe input gambar yang diterima: byte mentah, URL/gs://, base64, atau path lokal
+ImageInput = Union[bytes, bytearray, memoryview, str, None]
+
 def decode_base64_image(b64: str) -> bytes:
     try:
         return base64.b64decode(b64, validate=True)
     except Exception:
         raise ValueError("Invalid base64 image string")
 
+
 class VertexAIMultiModalEmbeddings:
-    def __init__(self, model_name="multimodalembedding@001", dimension=128):
+    def __init__(
+        self,
+        model_name="multimodalembedding@001",
+        dimension=128,
+        fetcher: ImageFetcher = None
+    ):
         
-        self.model = MultiModalEmbeddingModel.from_pretrained(model_name)
+        self.model_name = model_name
         self.dimension = dimension
+        # Pengunduh gambar bersama (connection pool + cache)
+        self.fetcher = fetcher or image_fetcher
+        # Model Vertex AI dimuat saat pertama dipakai (atau saat warmup)
+        self._model = None
+        self._model_lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    from fastapi_app.config import init_vertexai
+                    from vertexai.vision_models import MultiModalEmbeddingModel
+                    init_vertexai()
+                    self._model = MultiModalEmbeddingModel.from_pretrained(self.model_name)
+        return self._model
+
+    def load_image(self, image_input: ImageInput):
+        """
+        Mengubah image_input menjadi objek `Image` Vertex AI.
+
+        Urutan pengecekan: kosong -> bytes -> URL http(s) -> gs:// ->
+        base64 -> path file lokal. Base64 hanya di-decode satu kali.
+        """
+        if image_input is None or len(image_input) == 0:
+            return None
+
+        from vertexai.vision_models import Image
+
+        # Jika image_input upload (bytes) -> dipakai langsung tanpa decode/copy
+        if isinstance(image_input, (bytes, bytearray, memoryview)):
+            return Image(image_bytes=bytes(image_input))
 
+        # Penanganan jika image_input adalah URL (http/https) atau GCS (gs://)
+        if image_input.startswith(("http://", "https://", "gs://")):
+            # Load image dari bytes (Memory Buffer)
+            return Image(image_bytes=self.fetcher.fetch(image_input))
+
+        # Penaganan jika image_input BASE64
+        try:
+            return Image(image_bytes=decode_base64_image(image_input))
+        except ValueError:
+            pass
+
+        # Penanganan jika image_input adalah Local File
+        if os.path.isfile(image_input):
+            return Image.load_from_file(image_input)
+
+        raise ValueError("Format image_input tidak didukung")
 
     def embed_text(
         self,
@@ -31,29 +90,15 @@ class VertexAIMultiModalEmbeddings:
     
     def embed_image(
         self,
-        image_input: str
+        image_input: ImageInput
     ) -> List[float]:
     
         if not image_input:
             raise ValueError("image_input is required for embed_image")
 
-        # URL
-        if image_input.startswith(("http://", "https://")):
-            response = requests.get(image_input, timeout=10)
-            response.raise_for_status()
-            image = Image(image_bytes=response.content)
-        
-         # Penanganan jika image_input adalah GCS (gs://)
-        elif image_input.startswith("gs://"):
-            image = Image.load_from_file(image_input)
-
-        # Penanganan jika image_input adalah Local File
-        else:
-            image = Image.load_from_file(image_input)
-
         # Eksekusi embedding
         result = self.model.get_embeddings(
-            image=image,
+            image=self.load_image(image_input),
             dimension=self.dimension,
         )
         
@@ -63,45 +108,34 @@ class VertexAIMultiModalEmbeddings:
     
     def embed_image_and_text(
         self,
-        image_input: str,
+        image_input: ImageInput,
         contextual_text: str
     ) -> Tuple[List[float], List[float]]:
         
-        if image_input in [None, ""]:
-            image = None
-    
-        # Penaganan jika image_input BASE64
-        elif decode_base64_image(image_input):
-            image_bytes = decode_base64_image(image_input)
-            image = Image(image_bytes=image_bytes)
-        
-        # Penanganan jika image_input adalah URL (http/https)
-        elif image_input.startswith(("http://", "https://")):
-            try:
-                response = requests.get(image_input, timeout=10)
-                response.raise_for_status() # Pastikan download berhasil
-                
-                # Load image dari bytes (Memory Buffer)
-                image = Image(image_bytes=response.content)
-            except Exception as e:
-                raise Exception(f"Gagal mengunduh gambar dari URL: {str(e)}")
-       
-        # Penanganan jika image_input adalah GCS (gs://)
-        elif image_input.startswith("gs://"):
-            image = Image.load_from_file(image_input)
-        
-        # Jika image_input upload (bytes)
-        elif isinstance(image_input, bytes):
-            image = Image(image_bytes=image_input)
-
-        else:
-            raise ValueError("Format image_input tidak didukung")
         # Eksekusi embedding
         result = self.model.get_embeddings(
-            image=image,
+            image=self.load_image(image_input),
             contextual_text=contextual_text,
             dimension=self.dimension,
         )
         
         return result.image_embedding, result.text_embedding
-    
+
+    async def aembed_image_and_text(
+        self,
+        image_input: ImageInput,
+        contextual_text: str
+    ) -> Tuple[List[float], List[float]]:
+        """
+        Versi async `embed_image_and_text`.
+
+        Gambar dari URL http(s)/gs:// diunduh secara async, sedangkan
+        panggilan Vertex AI (SDK sync) dijalankan di thread terpisah agar
+        event loop tidak terblokir.
+        """
+        if isinstance(image_input, str) and image_input.startswith(("http://", "https://", "gs://")):
+            image_input = await self.fetcher.afetch(image_input)
+
+        return await asyncio.to_thread(
+            self.embed_image_and_text, image_input, contextual_text
+        )
@@ -0,0 +1,127 @@
+import re
+import threading
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+
+
+ACCEPT = "accept"
+REJECT = "reject"
+AMBIGUOUS = "ambiguous"
+
+# Prototipe label; embedding teks & gambar berada di ruang vektor yang sama
+# (multimodalembedding), jadi prototipe teks dipakai untuk kedua modalitas
+FURNITURE_PROTOTYPES = (
+    "furniture", "perabot rumah", "mebel",
+    "kursi", "kursi kantor", "kursi gaming", "sofa",
+    "meja", "meja kerja", "meja makan", "meja rias",
+    "lemari pakaian", "rak buku", "kabinet", "nakas",
+    "tempat tidur", "kasur", "bangku", "lampu meja", "lampu lantai",
+)
+NON_FURNITURE_PROTOTYPES = (
+    "makanan", "minuman", "pakaian", "sepatu", "tas",
+    "mobil", "motor", "handphone", "laptop", "elektronik",
+    "hewan", "manusia", "pemandangan alam", "gedung",
+    "cuaca", "olahraga", "film", "musik", "politik", "resep masakan",
+)
+
+
+# Penanda batas harga/anggaran pada query ("di bawah 1 juta", "budget 500rb",
+# "maks 2jt"). Query seperti ini tetap dianalisis Gemini walaupun gate ACCEPT,
+# karena batas harganya diekstrak oleh analisis (filter min/max_price).
+PRICE_HINT_PATTERN = re.compile(
+    r"\d|\b(rp|harga|budget|bujet|anggaran|murah|mahal|ribu|rb|juta|jt|"
+    r"maks|max|maksimal|min|minimal|bawah|dibawah|atas|diatas|kurang|lebih)\b",
+    re.IGNORECASE,
+)
+
+
+def mentions_price(text: Optional[str]) -> bool:
+    """True jika query kemungkinan menyebut batas harga (cek regex, tanpa LLM)."""
+    return bool(text) and PRICE_HINT_PATTERN.search(text) is not None
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class FurnitureGate:
+    """
+    Pre-classifier furniture sebelum analisis LLM.
+
+    Embedding query (teks dan/atau gambar) dibandingkan dengan vektor
+    prototipe furniture dan non-furniture. Margin = similarity tertinggi
+    ke prototipe furniture dikurangi similarity tertinggi ke prototipe
+    non-furniture, dihitung per modalitas yang tersedia:
+    - ACCEPT    : semua modalitas margin >= accept_margin
+    - REJECT    : semua modalitas margin <= -reject_margin
+    - AMBIGUOUS : selain itu (diteruskan ke Gemini)
+
+    Vektor prototipe dihitung sekali (lazy) lewat `embed_fn`.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[str], List[float]],
+        accept_margin: float = 0.05,
+        reject_margin: float = 0.05,
+        furniture_labels: Sequence[str] = FURNITURE_PROTOTYPES,
+        non_furniture_labels: Sequence[str] = NON_FURNITURE_PROTOTYPES,
+    ):
+        self.embed_fn = embed_fn
+        self.accept_margin = accept_margin
+        self.reject_margin = reject_margin
+        self.furniture_labels = tuple(furniture_labels)
+        self.non_furniture_labels = tuple(non_furniture_labels)
+
+        self._prototypes = None
+        self._lock = threading.Lock()
+
+    def prototypes(self):
+        """Matriks prototipe (furniture, non-furniture), dihitung sekali."""
+        if self._prototypes is None:
+            with self._lock:
+                if self._prototypes is None:
+                    self._prototypes = tuple(
+                        _normalize_rows(np.asarray(
+                            [self.embed_fn(label) for label in labels],
+                            dtype=np.float32
+                        ))
+                        for labels in (self.furniture_labels, self.non_furniture_labels)
+                    )
+        return self._prototypes
+
+    def margin(self, vector) -> float:
+        furniture, non_furniture = self.prototypes()
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return 0.0
+        query = query / norm
+        return float(np.max(furniture @ query) - np.max(non_furniture @ query))
+
+    def classify(self, image_vector=None, text_vector=None) -> str:
+        """
+        Args:
+            image_vector (List[float] | None):
+                Embedding gambar query (None jika tanpa gambar).
+            text_vector (List[float] | None):
+                Embedding teks query.
+
+        Returns:
+            str: ACCEPT, REJECT, atau AMBIGUOUS.
+        """
+        margins = [
+            self.margin(vector)
+            for vector in (image_vector, text_vector)
+            if vector is not None
+        ]
+        if not margins:
+            return AMBIGUOUS
+        if all(m >= self.accept_margin for m in margins):
+            return ACCEPT
+        if all(m <= -self.reject_margin for m in margins):
+            return REJECT
+        return AMBIGUOUS
@@ -0,0 +1,243 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from fastapi_app.config import (
+    IMAGE_FETCH_MAX_BYTES, IMAGE_FETCH_TIMEOUT, IMAGE_FETCH_POOL_SIZE,
+    IMAGE_FETCH_CACHE_TTL, IMAGE_FETCH_CACHE_MAX_BYTES
+)
+
+
+class ImageFetchError(Exception):
+    """Gagal mengunduh gambar (HTTP error, timeout, atau melebihi batas ukuran)."""
+
+
+class ImageFetcher:
+    """
+    Pengunduh gambar bersama untuk URL http(s) dan gs://.
+
+    - Koneksi HTTP di-pool dan keep-alive (requests.Session untuk sync,
+      httpx.AsyncClient untuk async), client GCS dibuat sekali.
+    - Unduhan di-stream dan dihentikan lebih awal jika melebihi max_bytes.
+    - Hasil unduhan disimpan di cache kecil (TTL + batas total byte),
+      karena gambar katalog sering diunduh berulang kali.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 10 * 1024 * 1024,
+        timeout: float = 10.0,
+        pool_size: int = 32,
+        cache_ttl: float = 300.0,
+        cache_max_bytes: int = 64 * 1024 * 1024,
+    ):
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.cache_ttl = cache_ttl
+        self.cache_max_bytes = cache_max_bytes
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+        self._async_client = None
+        self._gcs_client = None
+
+        self._cache = OrderedDict()  # url -> (expires_at, bytes)
+        self._cache_bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    # =========================
+    # Cache (TTL + LRU berbasis byte)
+    # =========================
+    def _cache_get(self, url: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._cache.get(url)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, data = entry
+            if expires_at < time.monotonic():
+                del self._cache[url]
+                self._cache_bytes -= len(data)
+                self.misses += 1
+                return None
+            self._cache.move_to_end(url)
+            self.hits += 1
+            return data
+
+    def _cache_set(self, url: str, data: bytes) -> None:
+        if self.cache_ttl <= 0 or len(data) > self.cache_max_bytes:
+            return
+        with self._lock:
+            if url in self._cache:
+                self._cache_bytes -= len(self._cache.pop(url)[1])
+            self._cache[url] = (time.monotonic() + self.cache_ttl, data)
+            self._cache_bytes += len(data)
+            while self._cache_bytes > self.cache_max_bytes:
+                _, (_, old) = self._cache.popitem(last=False)
+                self._cache_bytes -= len(old)
+
+    def _check_size(self, url: str, size: int) -> None:
+        if size > self.max_bytes:
+            raise ImageFetchError(
+                f"Gambar {url} melebihi batas ukuran {self.max_bytes} byte"
+            )
+
+    # =========================
+    # GCS (gs://bucket/path)
+    # =========================
+    def _gcs(self):
+        if self._gcs_client is None:
+            from google.cloud import storage
+            self._gcs_client = storage.Client()
+        return self._gcs_client
+
+    @staticmethod
+    def _split_gcs_path(url: str):
+        bucket_name, _, blob_name = url[len("gs://"):].partition("/")
+        if not bucket_name or not blob_name:
+            raise ImageFetchError(f"Path GCS tidak valid: {url}")
+        return bucket_name, blob_name
+
+    def _fetch_gcs(self, url: str) -> bytes:
+        bucket_name, blob_name = self._split_gcs_path(url)
+        try:
+            blob = self._gcs().bucket(bucket_name).blob(blob_name)
+            # Range request: unduh paling banyak max_bytes + 1 byte
+            data = blob.download_as_bytes(start=0, end=self.max_bytes, timeout=self.timeout)
+        except Exception as e:
+            raise ImageFetchError(f"Gagal mengunduh gambar dari GCS: {e}")
+        self._check_size(url, len(data))
+        return data
+
+    # =========================
+    # API publik
+    # =========================
+    def fetch(self, url: str) -> bytes:
+        """Mengunduh gambar dari URL http(s) atau gs:// (sync)."""
+        cached = self._cache_get(url)
+        if cached is not None:
+            return cached
+
+        if url.startswith("gs://"):
+            data = self._fetch_gcs(url)
+        else:
+            try:
+                with self._session.get(url, timeout=self.timeout, stream=True) as response:
+                    response.raise_for_status()
+                    self._check_size(url, int(response.headers.get("Content-Length") or 0))
+                    chunks, total = [], 0
+                    for chunk in response.iter_content(chunk_size=64 * 1024):
+                        total += len(chunk)
+                        self._check_size(url, total)
+                        chunks.append(chunk)
+            except ImageFetchError:
+                raise
+            except Exception as e:
+                raise ImageFetchError(f"Gagal mengunduh gambar dari URL: {e}")
+            data = b"".join(chunks)
+
+        self._cache_set(url, data)
+        return data
+
+    async def afetch(self, url: str) -> bytes:
+        """Mengunduh gambar dari URL http(s) atau gs:// (async)."""
+        cached = self._cache_get(url)
+        if cached is not None:
+            return cached
+
+        if url.startswith("gs://"):
+            # SDK GCS bersifat sync -> dijalankan di thread
+            data = await asyncio.to_thread(self._fetch_gcs, url)
+        else:
+            if self._async_client is None:
+                self._async_client = httpx.AsyncClient(
+                    timeout=self.timeout,
+                    follow_redirects=True,
+                    limits=httpx.Limits(
+                        max_connections=self.pool_size,
+                        max_keepalive_connections=self.pool_size,
+                    ),
+                )
+            try:
+                async with self._async_client.stream("GET", url) as response:
+                    response.raise_for_status()
+                    self._check_size(url, int(response.headers.get("Content-Length") or 0))
+                    chunks, total = [], 0
+                    async for chunk in response.aiter_bytes(chunk_size=64 * 1024):
+                        total += len(chunk)
+                        self._check_size(url, total)
+                        chunks.append(chunk)
+            except ImageFetchError:
+                raise
+            except Exception as e:
+                raise ImageFetchError(f"Gagal mengunduh gambar dari URL: {e}")
+            data = b"".join(chunks)
+
+        self._cache_set(url, data)
+        return data
+
+    def etag(self, url: str) -> Optional[str]:
+        """
+        Versi konten gambar tanpa mengunduh isinya (ETag / MD5 GCS,
+        ETag atau Last-Modified HTTP). None jika server tidak menyediakan.
+        """
+        try:
+            if url.startswith("gs://"):
+                bucket_name, blob_name = self._split_gcs_path(url)
+                blob = self._gcs().bucket(bucket_name).get_blob(blob_name, timeout=self.timeout)
+                if blob is None:
+                    raise ImageFetchError(f"Gambar tidak ditemukan: {url}")
+                return blob.md5_hash or blob.etag
+
+            response = self._session.head(url, timeout=self.timeout, allow_redirects=True)
+            response.raise_for_status()
+        except ImageFetchError:
+            raise
+        except Exception as e:
+            raise ImageFetchError(f"Gagal membaca metadata gambar {url}: {e}")
+
+        etag = response.headers.get("ETag")
+        if etag:
+            return etag
+        last_modified = response.headers.get("Last-Modified")
+        if last_modified:
+            return f"{last_modified}|{response.headers.get('Content-Length', '')}"
+        return None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._cache),
+                "cache_bytes": self._cache_bytes,
+            }
+
+    async def aclose(self) -> None:
+        self._session.close()
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+
+# Instance bersama yang dipakai oleh embedding service dan API
+image_fetcher = ImageFetcher(
+    max_bytes=IMAGE_FETCH_MAX_BYTES,
+    timeout=IMAGE_FETCH_TIMEOUT,
+    pool_size=IMAGE_FETCH_POOL_SIZE,
+    cache_ttl=IMAGE_FETCH_CACHE_TTL,
+    cache_max_bytes=IMAGE_FETCH_CACHE_MAX_BYTES,
+)
@@ -0,0 +1,114 @@
+import base64
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Optional
+
+from PIL import Image as PILImage, ImageOps
+
+
+# Signature (magic bytes) format gambar yang umum
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+)
+
+_FORMAT_MIME_TYPES = {
+    "JPEG": "image/jpeg",
+    "WEBP": "image/webp",
+    "PNG": "image/png",
+}
+
+
+def detect_mime_type(data: bytes) -> Optional[str]:
+    """Mendeteksi MIME type gambar dari magic bytes (bukan dari input klien)."""
+    head = bytes(data[:16])
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:12] in (b"ftypheic", b"ftypheix", b"ftypmif1"):
+        return "image/heic"
+    for signature, mime_type in _SIGNATURES:
+        if head.startswith(signature):
+            return mime_type
+    return None
+
+
+@dataclass
+class NormalizedImage:
+    """Gambar hasil normalisasi yang dipakai bersama oleh LLM dan embedding."""
+    data: bytes
+    mime_type: str
+    width: int
+    height: int
+
+    @property
+    def base64(self) -> str:
+        return base64.b64encode(self.data).decode("utf-8")
+
+
+def normalize_image(
+    data: bytes,
+    max_edge: int = 1024,
+    output_format: str = "JPEG",
+    quality: int = 85,
+) -> NormalizedImage:
+    """
+    Menormalisasi gambar sebelum dikirim ke Gemini dan Vertex AI.
+
+    Langkah:
+    1. Decode gambar (JPEG di-decode langsung pada skala yang lebih kecil)
+    2. Terapkan orientasi EXIF lalu buang seluruh metadata EXIF
+    3. Perkecil agar sisi terpanjang <= max_edge (aspect ratio dipertahankan)
+    4. Encode ulang ke format ringkas (JPEG/WebP)
+
+    Args:
+        data (bytes):
+            Byte gambar asli.
+        max_edge (int):
+            Panjang maksimum sisi terpanjang (pixel).
+        output_format (str):
+            Format output: "JPEG", "WEBP", atau "PNG".
+        quality (int):
+            Kualitas kompresi (JPEG/WebP).
+
+    Returns:
+        NormalizedImage: byte gambar baru beserta MIME type dan ukurannya.
+
+    Raises:
+        ValueError: jika data bukan gambar yang valid.
+    """
+    output_format = output_format.upper()
+    if output_format not in _FORMAT_MIME_TYPES:
+        raise ValueError(f"Format output tidak didukung: {output_format}")
+
+    try:
+        image = PILImage.open(BytesIO(data))
+        # Decoder JPEG dapat langsung menghasilkan skala 1/2, 1/4, 1/8
+        image.draft("RGB", (max_edge, max_edge))
+        image = ImageOps.exif_transpose(image)
+    except Exception as e:
+        raise ValueError(f"Gambar tidak valid: {e}")
+
+    # JPEG tidak mendukung transparansi -> tempel di atas latar putih
+    if output_format == "JPEG" and image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        background = PILImage.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+    elif image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGB")
+
+    image.thumbnail((max_edge, max_edge), PILImage.Resampling.LANCZOS)
+
+    # Metadata (EXIF, ICC, dll) tidak ikut disimpan karena tidak diteruskan
+    buffered = BytesIO()
+    image.save(buffered, format=output_format, quality=quality, optimize=True)
+
+    return NormalizedImage(
+        data=buffered.getvalue(),
+        mime_type=_FORMAT_MIME_TYPES[output_format],
+        width=image.width,
+        height=image.height,
+    )
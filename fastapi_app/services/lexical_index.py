@@ -0,0 +1,161 @@
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from fastapi_app.services.local_index import match_filter
+
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+# Kata umum pada query/deskripsi yang tidak membantu pencocokan produk
+STOPWORDS = frozenset({
+    "yang", "dan", "di", "ke", "dari", "untuk", "dengan", "ini", "itu",
+    "atau", "pada", "juga", "dalam", "sangat", "bisa", "dapat", "ada",
+    "saya", "aku", "kamu", "anda", "berikan", "carikan", "rekomendasi",
+    "tolong", "mau", "ingin", "cari", "yg", "the", "and", "for", "with",
+})
+
+# Nama produk dihitung lebih dari sekali agar kecocokan nama lebih berbobot
+NAME_BOOST = 2
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokenisasi sederhana: huruf kecil, kata alfanumerik, tanpa stopword."""
+    return [
+        token for token in _TOKEN_PATTERN.findall((text or "").casefold())
+        if token not in STOPWORDS
+    ]
+
+
+def product_text(metadata: Dict[str, Any]) -> str:
+    """Teks yang diindeks: nama (diboost), kategori, material, dan deskripsi."""
+    name = str(metadata.get("name", ""))
+    return " ".join(
+        [name] * NAME_BOOST + [
+            str(metadata.get("category", "")),
+            str(metadata.get("material", "")),
+            str(metadata.get("description", "")),
+        ]
+    )
+
+
+class BM25Index:
+    """
+    Inverted index BM25 in-memory untuk pencarian leksikal produk.
+
+    Posting disimpan dalam array ringkas (format CSR): `offsets[t]` ..
+    `offsets[t + 1]` menunjuk ke `doc_ids` (int32) dan `weights`
+    (float32) milik term t. Bobot BM25 (termasuk IDF) dihitung saat build,
+    sehingga query cukup berupa penjumlahan bobot posting per term.
+    """
+
+    def __init__(
+        self,
+        product_ids: List[str],
+        metadata: List[Dict[str, Any]],
+        vocabulary: Dict[str, int],
+        offsets: np.ndarray,
+        doc_ids: np.ndarray,
+        weights: np.ndarray,
+    ):
+        self.product_ids = product_ids
+        self.metadata = metadata
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.weights = weights
+
+    def __len__(self):
+        return len(self.product_ids)
+
+    @classmethod
+    def build(
+        cls,
+        documents: Iterable[Tuple[str, Dict[str, Any]]],
+        k1: float = 1.2,
+        b: float = 0.75,
+    ) -> "BM25Index":
+        """
+        Args:
+            documents (Iterable[Tuple[str, dict]]):
+                Pasangan (product_id, metadata produk). Product ID yang
+                sama hanya diindeks sekali.
+            k1 (float), b (float):
+                Parameter BM25 (saturasi term frequency & normalisasi panjang).
+        """
+        product_ids, metadata, term_counts = [], [], []
+        seen = set()
+        for product_id, meta in documents:
+            if product_id in seen:
+                continue
+            seen.add(product_id)
+            product_ids.append(product_id)
+            metadata.append(meta)
+            term_counts.append(Counter(tokenize(product_text(meta))))
+
+        # Posting per term: [(doc, tf), ...]
+        vocabulary, postings = {}, []
+        doc_lengths = np.zeros(len(product_ids), dtype=np.float32)
+        for doc, counts in enumerate(term_counts):
+            doc_lengths[doc] = sum(counts.values())
+            for term, tf in counts.items():
+                term_id = vocabulary.setdefault(term, len(vocabulary))
+                if term_id == len(postings):
+                    postings.append([])
+                postings[term_id].append((doc, tf))
+
+        offsets = np.zeros(len(postings) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(p) for p in postings])
+        doc_ids = np.fromiter(
+            (doc for p in postings for doc, _ in p), dtype=np.int32, count=int(offsets[-1])
+        )
+        tfs = np.fromiter(
+            (tf for p in postings for _, tf in p), dtype=np.float32, count=int(offsets[-1])
+        )
+
+        n_docs = len(product_ids)
+        avg_length = float(doc_lengths.mean()) if n_docs else 0.0
+        df = np.diff(offsets).astype(np.float32)
+        idf = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+        term_of_posting = np.repeat(np.arange(len(postings)), np.diff(offsets))
+        norm = k1 * (1.0 - b + b * doc_lengths[doc_ids] / (avg_length or 1.0))
+        weights = (idf[term_of_posting] * tfs * (k1 + 1.0) / (tfs + norm)).astype(np.float32)
+
+        return cls(product_ids, metadata, vocabulary, offsets, doc_ids, weights)
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 10,
+        filter: Optional[dict] = None,
+    ) -> List[Tuple[str, float, Dict[str, Any]]]:
+        """
+        Returns:
+            List[Tuple[str, float, dict]]: (product_id, skor BM25, metadata)
+            terurut dari skor tertinggi; hanya produk dengan skor > 0.
+        """
+        term_ids = {
+            self.vocabulary[token] for token in tokenize(query) if token in self.vocabulary
+        }
+        if not term_ids or top_k <= 0:
+            return []
+
+        scores = np.zeros(len(self.product_ids), dtype=np.float32)
+        for term_id in term_ids:
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            # doc_ids unik per term, jadi penjumlahan fancy-index aman
+            scores[self.doc_ids[start:end]] += self.weights[start:end]
+
+        candidates = np.flatnonzero(scores)
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+        hits = []
+        for doc in candidates:
+            if filter and not match_filter(self.metadata[doc], filter):
+                continue
+            hits.append((self.product_ids[doc], float(scores[doc]), self.metadata[doc]))
+            if len(hits) == top_k:
+                break
+        return hits
@@ -1,43 +1,220 @@
 import json
+import logging
 
 import base64
-from typing import Union
-from google.oauth2 import service_account
-from langchain_google_genai import ChatGoogleGenerativeAI
+import mimetypes
+from typing import AsyncIterator, List, Union
 from langchain_core.messages import SystemMessage, HumanMessage
-from fastapi_app.config import PROJECT_ID, GOOGLE_APPLICATION_CREDENTIALS
-
-credentials = service_account.Credentials.from_service_account_file(
-    GOOGLE_APPLICATION_CREDENTIALS,
-    scopes=["https://www.googleapis.com/auth/cloud-platform"],
+from pydantic import ValidationError
+from fastapi_app.config import (
+    ANALYSIS_MAX_OUTPUT_TOKENS, RECOMMENDATION_MAX_OUTPUT_TOKENS,
+    RECOMMENDATION_PICKS_MAX_OUTPUT_TOKENS, RECOMMENDATION_DESCRIPTION_CHARS,
+    PROMPT_CACHE_ENABLED, PROMPT_CACHE_TTL, PROMPT_CACHE_MIN_TOKENS, LLM_PROVIDER
 )
+from fastapi_app.schemas import ProductAnalysis, RecommendationList, RecommendationPickList
+from fastapi_app.services.container import services
+from fastapi_app.services.metrics import metrics
+from fastapi_app.services.prompt_cache import PromptCache, is_cache_error
+from fastapi_app.services.providers import create_chat_model
+
+logger = logging.getLogger(__name__)
+
+LLM_MODEL = "gemini-2.5-flash-lite"
+
+
+def _create_llm():
+    return create_chat_model(LLM_MODEL, temperature=0.4)
 
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash-lite",
-    credentials=credentials,
-    project=PROJECT_ID,
-    temperature=0.4,
-    vertexai=True,
+
+def _bind_json_output(schema_model, max_output_tokens: int):
+    # Output dibatasi response schema (JSON mode) sehingga selalu berupa JSON
+    # yang sesuai model pydantic; max_output_tokens disesuaikan ukuran schema
+    return lambda: get_llm().bind(
+        response_mime_type="application/json",
+        response_json_schema=schema_model.model_json_schema(),
+        max_output_tokens=max_output_tokens,
+    )
+
+
+services.register("llm", _create_llm)
+services.register(
+    "analysis_llm", _bind_json_output(ProductAnalysis, ANALYSIS_MAX_OUTPUT_TOKENS)
+)
+services.register(
+    "recommendation_llm", _bind_json_output(RecommendationList, RECOMMENDATION_MAX_OUTPUT_TOKENS)
 )
+# Mode konteks compact: LLM hanya mengembalikan nomor produk + alasan
+services.register(
+    "recommendation_picks_llm",
+    _bind_json_output(RecommendationPickList, RECOMMENDATION_PICKS_MAX_OUTPUT_TOKENS)
+)
+
+
+def get_llm():
+    """Client LLM bersama sesuai LLM_PROVIDER (dibuat saat pertama dipakai atau saat warmup)."""
+    return services.get("llm")
+
+
+def get_llm_client():
+    """Client google-genai milik LLM (dipakai untuk context caching)."""
+    return get_llm().client
+
 
 SYSTEM_PROMPT = (
     "Anda adalah sistem analisis produk furniture. "
     "Output harus JSON valid dengan keys: is_furniture (boolean) dan description (string). "
     "is_furniture bernilai True jika Input berkaitan dengan furniture walaupun tidak ada input gambar (meja, kursi, sofa, lemari, dll). "
-    "description (<1000 karakter) harus berisi : ringkasan input user, jelaskan kegunaan produk, material produk dan warnanya jika ada."
+    "description (<1000 karakter) harus berisi : ringkasan input user, jelaskan kegunaan produk, material produk dan warnanya jika ada. "
+    "filters berisi min_price dan/atau max_price (Rupiah, angka) HANYA jika pengguna menyebut batas harga "
+    "(mis. 'di bawah 1 juta' -> max_price 1000000), selain itu null."
 )
 
-def analyze_image_and_text(
-    image_input: Union[str, bytes, None], 
+RECOMMENDATION_SYSTEM_PROMPT = """
+Anda adalah asisten rekomendasi produk furniture yang profesional dan akurat.
+ATURAN WAJIB:
+1. Rekomendasikan 1-3 produk PALING relevan dan Produk HARUS sesuai kebutuhan pengguna.
+2. HANYA gunakan produk yang ADA di hasil pencarian.
+3. Jika tidak ada produk relevan, kembalikan array kosong [].
+4. Masukkan produk ke key "recommendations" (array of object).
+5. Setiap object memiliki key: name, price, description, image_path.
+"""
+
+COMPACT_RECOMMENDATION_SYSTEM_PROMPT = """
+Anda adalah asisten rekomendasi produk furniture yang profesional dan akurat.
+ATURAN WAJIB:
+1. Pilih 1-3 produk PALING relevan dan Produk HARUS sesuai kebutuhan pengguna.
+2. HANYA gunakan nomor produk yang ADA di tabel kandidat.
+3. Jika tidak ada produk relevan, kembalikan "recommendations" kosong [].
+4. Setiap object berisi "id" (nomor produk) dan "reason" (alasan singkat, <150 karakter).
+"""
+
+# System prompt statis didaftarkan sebagai cached content Gemini
+# (dibuat ulang otomatis saat kedaluwarsa, fallback ke prompt inline).
+# LLM lokal tidak mendukung context caching.
+PROMPT_CACHE_ACTIVE = PROMPT_CACHE_ENABLED and LLM_PROVIDER != "local"
+analysis_prompt_cache = PromptCache(
+    get_llm_client, LLM_MODEL, SYSTEM_PROMPT,
+    ttl=PROMPT_CACHE_TTL, min_tokens=PROMPT_CACHE_MIN_TOKENS,
+    enabled=PROMPT_CACHE_ACTIVE,
+)
+recommendation_prompt_cache = PromptCache(
+    get_llm_client, LLM_MODEL, RECOMMENDATION_SYSTEM_PROMPT,
+    ttl=PROMPT_CACHE_TTL, min_tokens=PROMPT_CACHE_MIN_TOKENS,
+    enabled=PROMPT_CACHE_ACTIVE,
+)
+compact_recommendation_prompt_cache = PromptCache(
+    get_llm_client, LLM_MODEL, COMPACT_RECOMMENDATION_SYSTEM_PROMPT,
+    ttl=PROMPT_CACHE_TTL, min_tokens=PROMPT_CACHE_MIN_TOKENS,
+    enabled=PROMPT_CACHE_ACTIVE,
+)
+
+
+def warmup_llm() -> None:
+    """Membuat client LLM + binding JSON dan memulai pembuatan cached content."""
+    for name in ("analysis_llm", "recommendation_llm", "recommendation_picks_llm"):
+        services.get(name)
+    for prompt_cache in (
+        analysis_prompt_cache, recommendation_prompt_cache, compact_recommendation_prompt_cache
+    ):
+        prompt_cache.name()
+
+
+def build_messages(prompt_cache: PromptCache, content, cache_name=None) -> list:
+    """System prompt hanya dikirim inline jika cached content tidak dipakai."""
+    messages = [HumanMessage(content=content)]
+    if cache_name is None:
+        messages.insert(0, SystemMessage(content=prompt_cache.system_instruction))
+    return messages
+
+
+def invoke_cached(model, prompt_cache: PromptCache, content):
+    """`model.invoke` dengan cached content, fallback ke prompt inline."""
+    cache_name = prompt_cache.name()
+    if cache_name is not None:
+        try:
+            return model.invoke(
+                build_messages(prompt_cache, content, cache_name),
+                cached_content=cache_name,
+            )
+        except Exception as e:
+            if not is_cache_error(e):
+                raise
+            logger.warning("Cached content %s ditolak, fallback inline: %s", cache_name, e)
+            prompt_cache.invalidate(cache_name)
+    return model.invoke(build_messages(prompt_cache, content))
+
+
+async def ainvoke_cached(model, prompt_cache: PromptCache, content):
+    """Versi async `invoke_cached`."""
+    cache_name = prompt_cache.name()
+    if cache_name is not None:
+        try:
+            return await model.ainvoke(
+                build_messages(prompt_cache, content, cache_name),
+                cached_content=cache_name,
+            )
+        except Exception as e:
+            if not is_cache_error(e):
+                raise
+            logger.warning("Cached content %s ditolak, fallback inline: %s", cache_name, e)
+            prompt_cache.invalidate(cache_name)
+    return await model.ainvoke(build_messages(prompt_cache, content))
+
+
+async def astream_cached(model, prompt_cache: PromptCache, content) -> AsyncIterator:
+    """
+    Versi streaming `invoke_cached`. Fallback ke prompt inline hanya
+    dilakukan jika belum ada chunk yang diterima.
+    """
+    cache_name = prompt_cache.name()
+    if cache_name is not None:
+        started = False
+        try:
+            async for chunk in model.astream(
+                build_messages(prompt_cache, content, cache_name),
+                cached_content=cache_name,
+            ):
+                started = True
+                yield chunk
+            return
+        except Exception as e:
+            if started or not is_cache_error(e):
+                raise
+            logger.warning("Cached content %s ditolak, fallback inline: %s", cache_name, e)
+            prompt_cache.invalidate(cache_name)
+    async for chunk in model.astream(build_messages(prompt_cache, content)):
+        yield chunk
+
+
+def build_analysis_content(
+    image_input: Union[str, bytes, None],
     image_mime_type: str,
-    query_text: str) -> dict:
+    query_text: str) -> list:
     
     content = []
 
     # =====================
     # IMAGE HANDLING
     # =====================
-    if image_input:
+    if isinstance(image_input, (bytes, bytearray, memoryview)):
+        # Byte gambar dikirim langsung tanpa encode base64 ulang
+        content.append({
+            "type": "media",
+            "data": bytes(image_input),
+            "mime_type": image_mime_type or "image/jpeg",
+        })
+    elif image_input and image_input.startswith(("http://", "https://")):
+        content.append({
+            "type": "image",
+            "url": image_input,
+        })
+    elif image_input and image_input.startswith("gs://"):
+        content.append({
+            "type": "media",
+            "file_uri": image_input,
+            "mime_type": image_mime_type or mimetypes.guess_type(image_input)[0] or "image/jpeg",
+        })
+    elif image_input:
         content.append({
             "type": "image",
             "base64": image_input,
@@ -52,47 +229,49 @@ def analyze_image_and_text(
             "text": query_text
         })
         
-    messages = [
-        SystemMessage(content=SYSTEM_PROMPT),
-        HumanMessage(content=content)
-    ]
+    return content
 
-    response = llm.invoke(messages)
 
-    raw = response.text.replace("```json", "").replace("```", "").strip()
-    
+def parse_analysis(raw_text: str) -> dict:
     try:
-        result = json.loads(raw)
-    except json.JSONDecodeError:
+        return ProductAnalysis.model_validate_json(raw_text).model_dump()
+    except ValidationError:
+        # Mis. output terpotong karena max_output_tokens
+        metrics.incr("llm_malformed_analysis")
         return {
             "is_furniture": False,
             "description": ""
         }
-        
-    if not isinstance(result.get("is_furniture"), bool):
-        result["is_furniture"] = False
 
-    if not isinstance(result.get("description"), str):
-        result["description"] = ""
 
-    return result
+def analyze_image_and_text(
+    image_input: Union[str, bytes, None], 
+    image_mime_type: str,
+    query_text: str) -> dict:
+    
+    content = build_analysis_content(image_input, image_mime_type, query_text)
+    response = invoke_cached(services.get("analysis_llm"), analysis_prompt_cache, content)
+    return parse_analysis(response.text)
 
 
-def recommend_products(
+async def aanalyze_image_and_text(
+    image_input: Union[str, bytes, None], 
+    image_mime_type: str,
+    query_text: str) -> dict:
+    """Versi async `analyze_image_and_text` (tidak memblokir event loop)."""
+    content = build_analysis_content(image_input, image_mime_type, query_text)
+    response = await ainvoke_cached(services.get("analysis_llm"), analysis_prompt_cache, content)
+    return parse_analysis(response.text)
+
+
+def build_recommendation_prompt(
     query_text,
     description,
     context_str
-):
-
-    final_prompt_template = f"""
-Anda adalah asisten rekomendasi produk furniture yang profesional dan akurat.
-ATURAN WAJIB:
-1. Rekomendasikan 1-3 produk PALING relevan dan Produk HARUS sesuai kebutuhan pengguna.
-2. HANYA gunakan produk yang ADA di hasil pencarian.
-3. Jika tidak ada produk relevan, kembalikan array kosong [].
-4. Output HARUS JSON valid berupa ARRAY of object.
-5. Setiap object memiliki key: name, price, description, image_path.
+) -> str:
 
+    # Aturan statis ada di RECOMMENDATION_SYSTEM_PROMPT (cached content)
+    return f"""
 PERTANYAAN PENGGUNA:
 {query_text}
 
@@ -103,11 +282,220 @@ HASIL PENCARIAN PRODUK:
 {context_str}
 """
 
-    response=llm.invoke(final_prompt_template)
-    raw = response.content.replace("```json", "").replace("```", "").strip()
+
+def build_candidate_table(
+    context_str,
+    max_description_chars: int = RECOMMENDATION_DESCRIPTION_CHARS
+) -> str:
+    """
+    Menyusun kandidat produk sebagai tabel bernomor yang ringkas.
+
+    Nomor baris (mulai dari 1) dipakai LLM sebagai ID produk; deskripsi
+    dipotong dan image_path tidak disertakan karena tidak dibutuhkan
+    untuk memilih produk.
+    """
+    lines = ["no | nama | harga | deskripsi"]
+    for no, product in enumerate(context_str, start=1):
+        description = " ".join(str(product.get("description", "")).split())
+        if len(description) > max_description_chars:
+            description = description[:max_description_chars].rstrip() + "..."
+        lines.append(f"{no} | {product.get('name', '')} | {product.get('price', '')} | {description}")
+    return "\n".join(lines)
+
+
+def build_compact_recommendation_prompt(
+    query_text,
+    description,
+    candidate_table
+) -> str:
+
+    # Aturan statis ada di COMPACT_RECOMMENDATION_SYSTEM_PROMPT (cached content)
+    return f"""
+PERTANYAAN PENGGUNA:
+{query_text}
+
+DESKRIPSI GAMBAR INPUT PENGGUNA (HASIL ANALISIS GAMBAR):
+{description}
+
+KANDIDAT PRODUK:
+{candidate_table}
+"""
+
+
+def parse_recommendation_picks(raw_text: str) -> list:
     try:
-        result = json.loads(raw)
-    except json.JSONDecodeError:
+        result = RecommendationPickList.model_validate_json(raw_text)
+    except ValidationError:
+        metrics.incr("llm_malformed_recommendations")
         return []
 
-    return result
\ No newline at end of file
+    return [pick.model_dump() for pick in result.recommendations]
+
+
+def parse_recommendations(raw_text: str) -> list:
+    try:
+        result = RecommendationList.model_validate_json(raw_text)
+    except ValidationError:
+        metrics.incr("llm_malformed_recommendations")
+        return []
+
+    return [product.model_dump() for product in result.recommendations]
+
+
+class JsonArrayStreamParser:
+    """
+    Parser JSON inkremental untuk output LLM berupa ARRAY of object
+    (array pertama pada output, mis. key "recommendations").
+
+    Potongan teks dari stream dimasukkan lewat `feed`; setiap object
+    level teratas di dalam array dikembalikan segera setelah kurung
+    tutupnya diterima, tanpa menunggu seluruh respons selesai.
+    Teks di luar array (mis. code fence ```json) diabaikan.
+    """
+
+    def __init__(self):
+        self._buffer = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._started = False
+        self._finished = False
+
+    def feed(self, chunk: str) -> List[dict]:
+        objects = []
+        for char in chunk:
+            if self._finished:
+                break
+            if not self._started:
+                self._started = char == "["
+                continue
+            if self._depth == 0:
+                # Di antara object: hanya "{" (object baru) dan "]" (akhir array)
+                if char == "{":
+                    self._depth = 1
+                    self._buffer = [char]
+                elif char == "]":
+                    self._finished = True
+                continue
+
+            self._buffer.append(char)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        obj = json.loads("".join(self._buffer))
+                    except json.JSONDecodeError:
+                        obj = None
+                    if isinstance(obj, dict):
+                        objects.append(obj)
+                    self._buffer = []
+        return objects
+
+
+def recommend_products(
+    query_text,
+    description,
+    context_str
+):
+
+    final_prompt_template = build_recommendation_prompt(query_text, description, context_str)
+    response = invoke_cached(
+        services.get("recommendation_llm"), recommendation_prompt_cache, final_prompt_template
+    )
+    return parse_recommendations(response.text)
+
+
+async def arecommend_products(
+    query_text,
+    description,
+    context_str
+):
+    """Versi async `recommend_products` (tidak memblokir event loop)."""
+    final_prompt_template = build_recommendation_prompt(query_text, description, context_str)
+    response = await ainvoke_cached(
+        services.get("recommendation_llm"), recommendation_prompt_cache, final_prompt_template
+    )
+    return parse_recommendations(response.text)
+
+
+async def astream_array_objects(model, prompt_cache: PromptCache, prompt) -> AsyncIterator[dict]:
+    """Stream `model` dan yield setiap object dari array output-nya."""
+    parser = JsonArrayStreamParser()
+    async for chunk in astream_cached(model, prompt_cache, prompt):
+        for obj in parser.feed(chunk.text):
+            yield obj
+
+
+async def astream_recommendations(
+    query_text,
+    description,
+    context_str
+) -> AsyncIterator[dict]:
+    """
+    Versi streaming `recommend_products`: setiap produk rekomendasi
+    di-yield segera setelah object JSON-nya lengkap diterima dari Gemini.
+    """
+    final_prompt_template = build_recommendation_prompt(query_text, description, context_str)
+    async for product in astream_array_objects(
+        services.get("recommendation_llm"), recommendation_prompt_cache, final_prompt_template
+    ):
+        yield product
+
+
+def recommend_product_picks(
+    query_text,
+    description,
+    context_str
+):
+    """
+    Mode konteks compact: kandidat dikirim sebagai tabel bernomor dan
+    LLM hanya mengembalikan [{"id": nomor, "reason": ...}].
+    """
+    final_prompt_template = build_compact_recommendation_prompt(
+        query_text, description, build_candidate_table(context_str)
+    )
+    response = invoke_cached(
+        services.get("recommendation_picks_llm"), compact_recommendation_prompt_cache, final_prompt_template
+    )
+    return parse_recommendation_picks(response.text)
+
+
+async def arecommend_product_picks(
+    query_text,
+    description,
+    context_str
+):
+    """Versi async `recommend_product_picks`."""
+    final_prompt_template = build_compact_recommendation_prompt(
+        query_text, description, build_candidate_table(context_str)
+    )
+    response = await ainvoke_cached(
+        services.get("recommendation_picks_llm"), compact_recommendation_prompt_cache, final_prompt_template
+    )
+    return parse_recommendation_picks(response.text)
+
+
+async def astream_recommendation_picks(
+    query_text,
+    description,
+    context_str
+) -> AsyncIterator[dict]:
+    """Versi streaming `recommend_product_picks`."""
+    final_prompt_template = build_compact_recommendation_prompt(
+        query_text, description, build_candidate_table(context_str)
+    )
+    async for pick in astream_array_objects(
+        services.get("recommendation_picks_llm"), compact_recommendation_prompt_cache, final_prompt_template
+    ):
+        yield pick
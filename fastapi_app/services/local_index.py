@@ -0,0 +1,501 @@
+import json
+import os
+import argparse
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+@dataclass
+class LocalMatch:
+    """Satu hasil query, meniru atribut `ScoredVector` milik Pinecone."""
+    id: str
+    score: float
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class LocalQueryResult:
+    """Hasil query, meniru `QueryResponse` milik Pinecone (atribut `matches`)."""
+    matches: List[LocalMatch]
+
+
+@dataclass
+class LocalVector:
+    """Satu vektor hasil fetch, meniru `Vector` milik Pinecone."""
+    id: str
+    values: List[float]
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class LocalFetchResult:
+    """Hasil fetch, meniru `FetchResponse` milik Pinecone (atribut `vectors`)."""
+    vectors: Dict[str, LocalVector]
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(matrix / norms, dtype=np.float32)
+
+
+def _compare(value, operator: str, operand) -> bool:
+    if operator == "$eq":
+        return value == operand
+    if operator == "$ne":
+        return value != operand
+    if operator == "$in":
+        return value in operand
+    if operator == "$nin":
+        return value not in operand
+    if operator == "$exists":
+        return (value is not None) == bool(operand)
+    # Perbandingan numerik: nilai yang tidak ada / bukan angka tidak lolos
+    if not isinstance(value, (int, float)) or isinstance(value, bool):
+        return False
+    if operator == "$gt":
+        return value > operand
+    if operator == "$gte":
+        return value >= operand
+    if operator == "$lt":
+        return value < operand
+    if operator == "$lte":
+        return value <= operand
+    raise ValueError(f"Operator filter tidak didukung: {operator}")
+
+
+def match_filter(metadata: Dict[str, Any], filter: Dict[str, Any]) -> bool:
+    """
+    Mengevaluasi filter metadata gaya Pinecone terhadap satu metadata.
+
+    Mendukung kesamaan langsung ({"key": value}), operator $eq, $ne,
+    $gt, $gte, $lt, $lte, $in, $nin, $exists, serta $and / $or.
+    """
+    for key, condition in filter.items():
+        if key == "$and":
+            if not all(match_filter(metadata, sub) for sub in condition):
+                return False
+        elif key == "$or":
+            if not any(match_filter(metadata, sub) for sub in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            if not all(_compare(value, op, operand) for op, operand in condition.items()):
+                return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+# Field metadata yang disimpan sebagai kolom NumPy agar filter tidak dievaluasi per baris
+FILTER_COLUMNS = ("price", "category", "material")
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class _NumericColumn:
+    """Kolom angka (mis. price); baris tanpa nilai ditandai `present=False`."""
+
+    def __init__(self, values: list):
+        self.present = np.array([value is not None for value in values], dtype=bool)
+        self.populated = bool(self.present.any())
+        self.values = np.array(
+            [value if value is not None else np.nan for value in values], dtype=np.float64
+        )
+
+    def mask(self, rows: np.ndarray, operator: str, operand) -> Optional[np.ndarray]:
+        """Mask operator untuk `rows`, atau None jika harus dievaluasi per baris."""
+        present, values = self.present[rows], self.values[rows]
+        if operator == "$exists":
+            return present == bool(operand)
+        if operator in ("$in", "$nin"):
+            if not all(_is_number(item) for item in operand):
+                return None
+            found = present & np.isin(values, list(operand))
+            return found if operator == "$in" else ~found
+        if not _is_number(operand):
+            return None
+        if operator == "$eq":
+            return present & (values == operand)
+        if operator == "$ne":
+            return ~(present & (values == operand))
+        comparisons = {"$gt": np.greater, "$gte": np.greater_equal, "$lt": np.less, "$lte": np.less_equal}
+        if operator in comparisons:
+            # NaN (baris tanpa nilai) selalu bernilai False pada perbandingan
+            return comparisons[operator](values, operand)
+        return None
+
+
+class _CategoricalColumn:
+    """Kolom string (mis. category) sebagai kode integer; -1 = tidak ada nilai."""
+
+    def __init__(self, values: list):
+        self.vocabulary = {}
+        self.codes = np.array(
+            [-1 if value is None else self.vocabulary.setdefault(value, len(self.vocabulary))
+             for value in values],
+            dtype=np.int32,
+        )
+        self.populated = bool(self.vocabulary)
+
+    def _code(self, operand):
+        if operand is None:
+            return -1
+        # Nilai yang tidak ada di kolom -> kode yang tidak pernah cocok
+        return self.vocabulary.get(operand, -2) if isinstance(operand, str) else -2
+
+    def mask(self, rows: np.ndarray, operator: str, operand) -> Optional[np.ndarray]:
+        """Mask operator untuk `rows`, atau None jika harus dievaluasi per baris."""
+        codes = self.codes[rows]
+        if operator == "$eq":
+            return codes == self._code(operand)
+        if operator == "$ne":
+            return codes != self._code(operand)
+        if operator in ("$in", "$nin"):
+            found = np.isin(codes, [self._code(item) for item in operand])
+            return found if operator == "$in" else ~found
+        if operator == "$exists":
+            return (codes != -1) == bool(operand)
+        if operator in ("$gt", "$gte", "$lt", "$lte"):
+            # Perbandingan numerik pada string / nilai kosong tidak pernah lolos
+            return np.zeros(len(codes), dtype=bool)
+        return None
+
+
+def _build_column(values: list):
+    """Kolom NumPy untuk satu field, atau None jika tipe nilainya campuran."""
+    if all(value is None or _is_number(value) for value in values):
+        return _NumericColumn(values)
+    if all(value is None or isinstance(value, str) for value in values):
+        return _CategoricalColumn(values)
+    return None
+
+
+def filter_mask(
+    metadata: List[Dict[str, Any]],
+    columns: Dict[str, Any],
+    rows: np.ndarray,
+    filter: Dict[str, Any]
+) -> np.ndarray:
+    """
+    Versi vektorisasi `match_filter` untuk banyak baris sekaligus.
+
+    Field yang punya kolom NumPy (FILTER_COLUMNS) dievaluasi dengan operasi
+    array; field lain atau operand yang tidak didukung kolomnya dievaluasi
+    per baris dengan semantik yang sama seperti `match_filter`.
+    """
+    mask = np.ones(len(rows), dtype=bool)
+    for key, condition in filter.items():
+        if key == "$and":
+            for sub in condition:
+                mask &= filter_mask(metadata, columns, rows, sub)
+        elif key == "$or":
+            matched = np.zeros(len(rows), dtype=bool)
+            for sub in condition:
+                matched |= filter_mask(metadata, columns, rows, sub)
+            mask &= matched
+        else:
+            column = columns.get(key)
+            operators = condition if isinstance(condition, dict) else {"$eq": condition}
+            for operator, operand in operators.items():
+                sub_mask = column.mask(rows, operator, operand) if column is not None else None
+                if sub_mask is None:
+                    sub_mask = np.fromiter(
+                        (_compare(metadata[row].get(key), operator, operand) for row in rows),
+                        dtype=bool,
+                        count=len(rows),
+                    )
+                mask &= sub_mask
+    return mask
+
+
+class LocalVectorIndex:
+    """
+    Index vektor in-memory berbasis NumPy sebagai alternatif Pinecone.
+
+    Seluruh vektor disimpan sebagai matriks float32 contiguous yang sudah
+    dinormalisasi (L2), dipartisi per `vector_type` ("text" / "image"),
+    sehingga query cosine top-k cukup berupa satu perkalian matriks-vektor.
+
+    Method `query` kompatibel dengan subset `pinecone.Index.query` yang
+    dipakai di `search_multimodal`, jadi keduanya bisa saling menggantikan.
+    """
+
+    def __init__(
+        self,
+        ids: List[str],
+        vectors,
+        metadata: List[Dict[str, Any]],
+    ):
+        self._lock = threading.Lock()
+        # Bertambah setiap kali isi index berubah (dipakai untuk invalidasi cache)
+        self.version = 0
+        self._build(list(ids), vectors, list(metadata))
+
+    @classmethod
+    def empty(cls, dimension: int) -> "LocalVectorIndex":
+        """Index kosong (mis. sebelum indexing pertama)."""
+        return cls([], np.zeros((0, dimension), dtype=np.float32), [])
+
+    def _build(self, ids, vectors, metadata) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or len(ids) != vectors.shape[0] or len(ids) != len(metadata):
+            raise ValueError("ids, vectors, dan metadata harus memiliki jumlah baris yang sama")
+        vectors = _normalize_rows(vectors)
+
+        # Partisi per vector_type: {vector_type: (row_indices, matrix)}
+        partitions = {}
+        types = np.array([m.get("vector_type", "") for m in metadata], dtype=object)
+        for vector_type in set(types.tolist()):
+            rows = np.flatnonzero(types == vector_type)
+            partitions[vector_type] = (
+                rows,
+                np.ascontiguousarray(vectors[rows]),
+            )
+
+        # Posisi baris per ID (fetch & upsert tanpa scan seluruh ID)
+        positions = {vector_id: row for row, vector_id in enumerate(ids)}
+
+        # Kolom filter metadata (price, category, material)
+        columns = {}
+        for key in FILTER_COLUMNS:
+            column = _build_column([m.get(key) for m in metadata])
+            if column is not None:
+                columns[key] = column
+
+        # State diganti sekaligus agar query yang berjalan bersamaan tetap konsisten
+        self._state = (ids, metadata, vectors, partitions, positions, columns)
+        self.version += 1
+
+    @property
+    def ids(self) -> List[str]:
+        return self._state[0]
+
+    @property
+    def metadata(self) -> List[Dict[str, Any]]:
+        return self._state[1]
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._state[2]
+
+    @property
+    def dimension(self) -> int:
+        return self._state[2].shape[1]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def has_field(self, key: str) -> bool:
+        """True jika minimal satu vektor memiliki metadata `key`."""
+        column = self._state[5].get(key)
+        if column is not None:
+            return column.populated
+        return any(key in metadata for metadata in self.metadata)
+
+    # =========================
+    # Upsert / Delete / Fetch (subset API Pinecone)
+    # =========================
+    def upsert(self, vectors: List[Dict[str, Any]], **kwargs) -> dict:
+        """
+        Menambah atau mengganti vektor, format sama dengan `pinecone.Index.upsert`:
+        [{"id": str, "values": List[float], "metadata": dict}, ...]
+        """
+        with self._lock:
+            ids, metadata, matrix, _, positions, _ = self._state
+            position = dict(positions)
+            ids, metadata = list(ids), list(metadata)
+            rows = [matrix]
+            new_values = []
+            for vector in vectors:
+                row = position.get(vector["id"])
+                if row is None:
+                    position[vector["id"]] = len(ids)
+                    ids.append(vector["id"])
+                    metadata.append(dict(vector.get("metadata") or {}))
+                    new_values.append(vector["values"])
+                else:
+                    metadata[row] = dict(vector.get("metadata") or {})
+                    if rows[0] is matrix:
+                        rows[0] = matrix.copy()
+                    rows[0][row] = vector["values"]
+            if new_values:
+                rows.append(np.asarray(new_values, dtype=np.float32))
+            self._build(ids, np.vstack(rows), metadata)
+        return {"upserted_count": len(vectors)}
+
+    def delete(self, ids: List[str], **kwargs) -> dict:
+        with self._lock:
+            removed = set(ids)
+            current_ids, metadata, matrix, _, _, _ = self._state
+            keep = [row for row, vector_id in enumerate(current_ids) if vector_id not in removed]
+            self._build(
+                [current_ids[row] for row in keep],
+                matrix[keep],
+                [metadata[row] for row in keep],
+            )
+        return {}
+
+    def fetch(self, ids: List[str], **kwargs) -> LocalFetchResult:
+        """Mengambil vektor berdasarkan ID; ID yang tidak ada dilewati."""
+        _, metadata, vectors, _, positions, _ = self._state
+        found = {vector_id: positions[vector_id] for vector_id in ids if vector_id in positions}
+        # Satu gather NumPy untuk semua baris yang diminta
+        values = vectors[list(found.values())].tolist() if found else []
+        return LocalFetchResult(vectors={
+            vector_id: LocalVector(
+                id=vector_id,
+                values=row_values,
+                metadata=metadata[row],
+            )
+            for (vector_id, row), row_values in zip(found.items(), values)
+        })
+
+    # =========================
+    # Snapshot
+    # =========================
+    @classmethod
+    def load(cls, path: str) -> "LocalVectorIndex":
+        """Memuat index dari file snapshot `.npz` (lihat `save`)."""
+        with np.load(path, allow_pickle=False) as data:
+            ids = data["ids"].tolist()
+            vectors = data["vectors"]
+            metadata = json.loads(str(data["metadata"]))
+        return cls(ids, vectors, metadata)
+
+    def save(self, path: str) -> None:
+        """
+        Menyimpan index ke file snapshot `.npz`.
+
+        Isi snapshot: `ids` (array string), `vectors` (float32 N x dim),
+        dan `metadata` (satu string JSON berisi list metadata per baris).
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        ids, metadata, vectors, _, _, _ = self._state
+        np.savez(
+            path,
+            ids=np.array(ids, dtype=str),
+            vectors=vectors,
+            metadata=np.array(json.dumps(metadata)),
+        )
+
+    # =========================
+    # Query
+    # =========================
+    @staticmethod
+    def _candidate_rows(state, filter: Optional[dict]):
+        """Menentukan baris kandidat dan matriksnya berdasarkan filter."""
+        ids, metadata, vectors, partitions, _, columns = state
+        filter = dict(filter or {})
+        vector_type = filter.get("vector_type")
+        if isinstance(vector_type, dict):
+            # Hanya {"$eq": ...} yang memakai partisi, operator lain dievaluasi per baris
+            vector_type = vector_type.get("$eq") if list(vector_type) == ["$eq"] else None
+
+        if vector_type is not None:
+            filter.pop("vector_type")
+            rows, matrix = partitions.get(
+                vector_type, (np.empty(0, dtype=np.int64), vectors[:0])
+            )
+        else:
+            rows, matrix = np.arange(len(ids)), vectors
+
+        # Filter metadata lainnya (operator gaya Pinecone, vektorisasi per kolom)
+        if filter and len(rows):
+            mask = filter_mask(metadata, columns, rows, filter)
+            rows, matrix = rows[mask], matrix[mask]
+
+        return rows, matrix
+
+    def query(
+        self,
+        vector,
+        top_k: int = 10,
+        include_metadata: bool = True,
+        filter: Optional[dict] = None,
+        **kwargs,
+    ) -> LocalQueryResult:
+        """
+        Mencari top-k vektor paling mirip (cosine similarity).
+
+        Args:
+            vector:
+                Vektor query dengan dimensi yang sama dengan index.
+            top_k (int):
+                Jumlah hasil maksimum.
+            include_metadata (bool):
+                Sertakan metadata pada setiap hasil.
+            filter (dict | None):
+                Filter metadata gaya Pinecone, mis.
+                {"vector_type": "text", "price": {"$lte": 1000000}}.
+
+        Returns:
+            LocalQueryResult: objek dengan atribut `matches` (id, score, metadata).
+        """
+        state = self._state
+        ids, metadata = state[0], state[1]
+        rows, matrix = self._candidate_rows(state, filter)
+        if len(rows) == 0 or top_k <= 0:
+            return LocalQueryResult(matches=[])
+
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        scores = matrix @ query
+
+        # argpartition O(n) lalu urutkan hanya k teratas
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        return LocalQueryResult(matches=[
+            LocalMatch(
+                id=ids[rows[i]],
+                score=float(scores[i]),
+                metadata=metadata[rows[i]] if include_metadata else {},
+            )
+            for i in top
+        ])
+
+
+def export_pinecone_snapshot(index, path: str, batch_size: int = 100) -> int:
+    """
+    Mengekspor seluruh vektor dari index Pinecone ke file snapshot lokal.
+
+    Returns:
+        int: jumlah vektor yang diekspor.
+    """
+    ids, vectors, metadata = [], [], []
+    for id_batch in index.list():
+        for start in range(0, len(id_batch), batch_size):
+            fetched = index.fetch(ids=id_batch[start:start + batch_size])
+            for vector_id, vector in fetched.vectors.items():
+                ids.append(vector_id)
+                vectors.append(vector.values)
+                metadata.append(dict(vector.metadata or {}))
+
+    LocalVectorIndex(ids, vectors, metadata).save(path)
+    return len(ids)
+
+
+if __name__ == "__main__":
+    # Contoh: python -m fastapi_app.services.local_index data/vector_index.npz
+    parser = argparse.ArgumentParser(
+        description="Ekspor index Pinecone ke snapshot lokal (.npz)"
+    )
+    parser.add_argument("output", help="Path file snapshot tujuan")
+    args = parser.parse_args()
+
+    from fastapi_app.config import pinecone_index
+
+    total = export_pinecone_snapshot(pinecone_index, args.output)
+    print(f"✅ {total} vektor diekspor ke {args.output}")
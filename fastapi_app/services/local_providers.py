@@ -0,0 +1,224 @@
+import ast
+import asyncio
+import base64
+import binascii
+import hashlib
+import json
+import re
+import time
+from typing import AsyncIterator, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from fastapi_app.services.image_fetcher import ImageFetcher, image_fetcher
+from fastapi_app.services.lexical_index import tokenize
+
+
+# =========================
+# Embedding lokal (feature hashing)
+# =========================
+class HashingEmbeddings:
+    """
+    Stand-in `VertexAIMultiModalEmbeddings` yang deterministik dan tanpa jaringan.
+
+    - Teks: token (lihat `lexical_index.tokenize`) di-hash ke `dimension`
+      bucket bertanda (feature hashing), sehingga teks dengan kata yang sama
+      menghasilkan vektor yang mirip.
+    - Gambar: vektor acak yang di-seed dari hash byte gambar (atau string
+      referensinya jika berupa URL/path), sehingga gambar identik selalu
+      menghasilkan vektor identik.
+
+    `latency` (detik) disuntikkan ke setiap panggilan untuk mensimulasikan
+    waktu respons model embedding sungguhan.
+    """
+
+    def __init__(
+        self,
+        dimension: int = 128,
+        latency: float = 0.0,
+        model_name: str = "local-hashing",
+        fetcher: ImageFetcher = None
+    ):
+        self.model_name = model_name
+        self.dimension = dimension
+        self.latency = latency
+        # Dipakai indexer untuk versi gambar (ETag); embedding sendiri tidak mengunduh
+        self.fetcher = fetcher or image_fetcher
+
+    @staticmethod
+    def _normalize(vector: np.ndarray) -> List[float]:
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector = vector / norm
+        return vector.tolist()
+
+    def _hash(self, token: str) -> Tuple[int, float]:
+        digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        return value % self.dimension, 1.0 if (value >> 63) else -1.0
+
+    def _image_bytes(self, image_input) -> bytes:
+        if isinstance(image_input, (bytes, bytearray, memoryview)):
+            return bytes(image_input)
+        if not image_input.startswith(("http://", "https://", "gs://")):
+            try:
+                return base64.b64decode(image_input, validate=True)
+            except (binascii.Error, ValueError):
+                pass
+        # URL / path lokal: referensinya sendiri dipakai sebagai identitas gambar
+        return image_input.encode("utf-8")
+
+    def _text_vector(self, contextual_text: str) -> List[float]:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for token in tokenize(contextual_text or ""):
+            bucket, sign = self._hash(token)
+            vector[bucket] += sign
+        return self._normalize(vector)
+
+    def _image_vector(self, image_input) -> List[float]:
+        seed = hashlib.blake2b(self._image_bytes(image_input), digest_size=8).digest()
+        rng = np.random.default_rng(int.from_bytes(seed, "little"))
+        return self._normalize(rng.standard_normal(self.dimension).astype(np.float32))
+
+    def _vectors(self, image_input, contextual_text: str):
+        img_vec = self._image_vector(image_input) if image_input else None
+        txt_vec = self._text_vector(contextual_text) if contextual_text else None
+        return img_vec, txt_vec
+
+    def embed_text(self, contextual_text: str) -> List[float]:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._text_vector(contextual_text)
+
+    def embed_image(self, image_input) -> List[float]:
+        if not image_input:
+            raise ValueError("image_input is required for embed_image")
+        if self.latency:
+            time.sleep(self.latency)
+        return self._image_vector(image_input)
+
+    def embed_image_and_text(
+        self,
+        image_input,
+        contextual_text: str
+    ) -> Tuple[Optional[List[float]], Optional[List[float]]]:
+        # Latensi disuntikkan sekali per panggilan (seperti satu request Vertex AI)
+        if self.latency:
+            time.sleep(self.latency)
+        return self._vectors(image_input, contextual_text)
+
+    async def aembed_image_and_text(
+        self,
+        image_input,
+        contextual_text: str
+    ) -> Tuple[Optional[List[float]], Optional[List[float]]]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._vectors(image_input, contextual_text)
+
+
+# =========================
+# LLM lokal (jawaban kalengan)
+# =========================
+def _message_text(messages) -> str:
+    """Gabungan teks prompt pengguna (string atau list pesan LangChain, tanpa system prompt)."""
+    if isinstance(messages, str):
+        return messages
+    texts = []
+    for message in messages:
+        if getattr(message, "type", None) == "system":
+            continue
+        content = getattr(message, "content", message)
+        if isinstance(content, str):
+            texts.append(content)
+        else:
+            texts.extend(
+                part.get("text", "") for part in content
+                if isinstance(part, dict) and part.get("type") == "text"
+            )
+    return "\n".join(texts)
+
+
+def _search_context(prompt: str) -> list:
+    """List produk dari bagian "HASIL PENCARIAN PRODUK" prompt rekomendasi."""
+    _, _, context = prompt.partition("HASIL PENCARIAN PRODUK:")
+    try:
+        products = ast.literal_eval(context.strip())
+    except (ValueError, SyntaxError):
+        return []
+    return products if isinstance(products, list) else []
+
+
+class CannedChatModel:
+    """
+    Stand-in chat model Gemini yang deterministik dan tanpa jaringan.
+
+    Jawaban dipilih dari schema JSON yang di-`bind` (sama seperti
+    `services/llm.py` memakai model Gemini):
+    - ProductAnalysis: selalu furniture, description = teks input pengguna
+    - RecommendationList: 3 produk teratas dari hasil pencarian di prompt
+    - RecommendationPickList: nomor 1-3 dari tabel kandidat
+
+    `latency` (detik) disuntikkan sebelum token pertama, `chunk_latency`
+    di antara chunk saat streaming.
+    """
+
+    chunk_chars = 32
+    client = None  # tidak mendukung context caching
+
+    def __init__(self, latency: float = 0.0, chunk_latency: float = 0.0, **bound):
+        self.latency = latency
+        self.chunk_latency = chunk_latency
+        self.bound = bound
+
+    def bind(self, **kwargs) -> "CannedChatModel":
+        return CannedChatModel(self.latency, self.chunk_latency, **{**self.bound, **kwargs})
+
+    def reply(self, messages) -> str:
+        schema = self.bound.get("response_json_schema") or {}
+        title = schema.get("title")
+        prompt = _message_text(messages)
+
+        if title == "ProductAnalysis":
+            return json.dumps({
+                "is_furniture": True,
+                "description": prompt.strip()[:1000] or "produk furniture",
+                "filters": None,
+            })
+        if title == "RecommendationPickList":
+            rows = re.findall(r"^(\d+) \|", prompt, flags=re.MULTILINE)
+            return json.dumps({"recommendations": [
+                {"id": int(no), "reason": "Sesuai dengan kebutuhan pengguna."}
+                for no in rows[:3]
+            ]})
+        products = [
+            {
+                "name": str(product.get("name", "")),
+                "price": float(product.get("price") or 0),
+                "description": str(product.get("description", "")),
+                "image_path": str(product.get("image_path", "")),
+            }
+            for product in _search_context(prompt)[:3]
+            if isinstance(product, dict)
+        ]
+        return json.dumps({"recommendations": products}, ensure_ascii=False)
+
+    def invoke(self, messages, **kwargs) -> AIMessage:
+        if self.latency:
+            time.sleep(self.latency)
+        return AIMessage(content=self.reply(messages))
+
+    async def ainvoke(self, messages, **kwargs) -> AIMessage:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return AIMessage(content=self.reply(messages))
+
+    async def astream(self, messages, **kwargs) -> AsyncIterator[AIMessageChunk]:
+        text = self.reply(messages)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        for start in range(0, len(text), self.chunk_chars):
+            if start and self.chunk_latency:
+                await asyncio.sleep(self.chunk_latency)
+            yield AIMessageChunk(content=text[start:start + self.chunk_chars])
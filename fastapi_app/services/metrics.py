@@ -0,0 +1,31 @@
+import threading
+from collections import defaultdict
+
+
+class Metrics:
+    """
+    Registry counter sederhana (thread-safe) untuk metrik aplikasi.
+
+    Nilai counter dapat berupa jumlah kejadian maupun akumulasi durasi
+    (detik). Seluruh counter ditampilkan pada endpoint GET /metrics.
+    """
+
+    def __init__(self):
+        self._counters = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def incr(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] += value
+
+    def get(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0.0)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(sorted(self._counters.items()))
+
+
+# Instance global yang dipakai bersama oleh semua modul
+metrics = Metrics()
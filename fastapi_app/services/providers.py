@@ -0,0 +1,110 @@
+from typing import Any, AsyncIterator, List, Optional, Protocol, Sequence, Tuple, runtime_checkable
+
+from fastapi_app.config import (
+    PROJECT_ID, GOOGLE_APPLICATION_CREDENTIALS, EMBEDDING_PROVIDER, LLM_PROVIDER,
+    EMBEDDING_MODEL_NAME, EMBEDDING_DIMENSION,
+    LOCAL_EMBEDDING_LATENCY_MS, LOCAL_LLM_LATENCY_MS, LOCAL_LLM_CHUNK_LATENCY_MS
+)
+
+
+# =========================
+# Interface provider
+# =========================
+@runtime_checkable
+class EmbeddingProvider(Protocol):
+    """Model embedding multimodal (teks & gambar dalam satu ruang vektor)."""
+    model_name: str
+    dimension: int
+
+    def embed_text(self, contextual_text: str) -> List[float]: ...
+
+    def embed_image(self, image_input) -> List[float]: ...
+
+    def embed_image_and_text(
+        self, image_input, contextual_text: str
+    ) -> Tuple[Optional[List[float]], Optional[List[float]]]: ...
+
+    async def aembed_image_and_text(
+        self, image_input, contextual_text: str
+    ) -> Tuple[Optional[List[float]], Optional[List[float]]]: ...
+
+
+@runtime_checkable
+class ChatModel(Protocol):
+    """
+    Subset interface chat model LangChain yang dipakai `services/llm.py`.
+    Hasil invoke/astream memiliki atribut `.text`.
+    """
+
+    def bind(self, **kwargs) -> "ChatModel": ...
+
+    def invoke(self, messages, **kwargs) -> Any: ...
+
+    async def ainvoke(self, messages, **kwargs) -> Any: ...
+
+    def astream(self, messages, **kwargs) -> AsyncIterator[Any]: ...
+
+
+@runtime_checkable
+class VectorStore(Protocol):
+    """Subset interface index Pinecone (juga dipenuhi `LocalVectorIndex`)."""
+
+    def query(self, vector: Sequence[float], top_k: int, include_metadata: bool = True,
+              filter: Optional[dict] = None) -> Any: ...
+
+    def fetch(self, ids: List[str]) -> Any: ...
+
+    def upsert(self, vectors: list) -> Any: ...
+
+    def delete(self, ids: List[str]) -> Any: ...
+
+
+# =========================
+# Factory berdasarkan konfigurasi
+# =========================
+def create_embeddings(
+    model_name: str = EMBEDDING_MODEL_NAME,
+    dimension: int = EMBEDDING_DIMENSION
+) -> EmbeddingProvider:
+    """
+    Provider embedding sesuai EMBEDDING_PROVIDER: "vertex" (Vertex AI)
+    atau "local" (hashing deterministik, tanpa jaringan).
+    """
+    if EMBEDDING_PROVIDER == "local":
+        from fastapi_app.services.local_providers import HashingEmbeddings
+        return HashingEmbeddings(
+            dimension=dimension,
+            latency=LOCAL_EMBEDDING_LATENCY_MS / 1000,
+        )
+
+    from fastapi_app.services.embeddings import VertexAIMultiModalEmbeddings
+    return VertexAIMultiModalEmbeddings(model_name=model_name, dimension=dimension)
+
+
+def create_chat_model(model_name: str, temperature: float = 0.4) -> ChatModel:
+    """
+    Chat model sesuai LLM_PROVIDER: "gemini" (LangChain + Vertex AI)
+    atau "local" (jawaban kalengan dengan latensi yang dapat diatur).
+    """
+    if LLM_PROVIDER == "local":
+        from fastapi_app.services.local_providers import CannedChatModel
+        return CannedChatModel(
+            latency=LOCAL_LLM_LATENCY_MS / 1000,
+            chunk_latency=LOCAL_LLM_CHUNK_LATENCY_MS / 1000,
+        )
+
+    # SDK LangChain/Gemini diimport saat client pertama kali dibuat
+    from google.oauth2 import service_account
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    credentials = service_account.Credentials.from_service_account_file(
+        GOOGLE_APPLICATION_CREDENTIALS,
+        scopes=["https://www.googleapis.com/auth/cloud-platform"],
+    )
+    return ChatGoogleGenerativeAI(
+        model=model_name,
+        credentials=credentials,
+        project=PROJECT_ID,
+        temperature=temperature,
+        vertexai=True,
+    )
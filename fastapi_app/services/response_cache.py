@@ -0,0 +1,212 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, List, Optional
+
+import numpy as np
+
+from fastapi_app.services.embedding_cache import image_fingerprint, raw_fingerprint, normalize_text
+
+
+class ResponseCache:
+    """
+    Cache respons lengkap pipeline /search (analisis + hasil + rekomendasi).
+
+    Terdiri dari dua tier:
+    - Exact: key berupa teks yang dinormalisasi + sidik jari gambar + filter.
+    - Semantik (opsional, default nonaktif): memakai ulang embedding teks
+      query; respons query lain dengan gambar & filter yang sama dan cosine
+      similarity >= `similarity_threshold` dikembalikan (mis. "kursi gaming
+      hitam" vs "kursi gaming warna hitam"). Filter yang dipakai adalah
+      filter final termasuk batas harga hasil analisis, karena embedding
+      teks hampir identik untuk query yang hanya berbeda atribut
+      ("di bawah 2 juta" vs "5 juta"). Atribut lain (mis. warna) tetap
+      bisa tertukar, jadi threshold harus dipilih dengan hati-hati.
+
+    Entri kedaluwarsa setelah `ttl` detik dan seluruh cache dikosongkan
+    saat `version_fn()` berubah (index dibangun ulang).
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float = 3600.0,
+        similarity_threshold: float = 0.0,
+        version_fn: Optional[Callable[[], Hashable]] = None,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.version_fn = version_fn
+
+        self._entries = OrderedDict()  # key -> (expires_at, response, slot)
+        # Tier semantik: satu baris vektor teks (L2-normalized) per slot
+        self._matrix = None
+        self._slot_keys: List[Optional[str]] = [None] * max_entries
+        self._slot_groups: List[Optional[str]] = [None] * max_entries
+        self._free_slots = list(range(max_entries - 1, -1, -1))
+        self._version = version_fn() if version_fn else None
+        self._lock = threading.Lock()
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @property
+    def semantic_enabled(self) -> bool:
+        return self.enabled and self.similarity_threshold > 0
+
+    @staticmethod
+    def _group(image_input, filters: Optional[dict]) -> str:
+        """Respons hanya bisa dipakai ulang untuk gambar & filter yang sama."""
+        return f"{image_fingerprint(image_input)}|{json.dumps(filters or {}, sort_keys=True)}"
+
+    @staticmethod
+    def make_key(image_input, query_text: str, filters: Optional[dict] = None) -> str:
+        """
+        Key tier exact dari input gambar mentah request (base64/bytes/URL,
+        di-hash tanpa decode) + filter + teks yang dinormalisasi.
+        """
+        return (
+            f"{raw_fingerprint(image_input)}|{json.dumps(filters or {}, sort_keys=True)}"
+            f"|{normalize_text(query_text)}"
+        )
+
+    # =========================
+    # Internal (dipanggil dengan lock)
+    # =========================
+    def _remove(self, key: str) -> None:
+        _, _, slot = self._entries.pop(key)
+        if slot is not None:
+            self._slot_keys[slot] = None
+            self._slot_groups[slot] = None
+            self._free_slots.append(slot)
+
+    def _check_version(self) -> None:
+        if self.version_fn is None:
+            return
+        version = self.version_fn()
+        if version != self._version:
+            self._version = version
+            self._clear()
+            self.invalidations += 1
+
+    def _clear(self) -> None:
+        self._entries.clear()
+        self._slot_keys = [None] * self.max_entries
+        self._slot_groups = [None] * self.max_entries
+        self._free_slots = list(range(self.max_entries - 1, -1, -1))
+
+    def _live(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    # =========================
+    # API publik
+    # =========================
+    def get(self, key: str) -> Optional[Any]:
+        """Tier exact. Miss di sini masih bisa hit di tier semantik (`get_similar`)."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._check_version()
+            response = self._live(key)
+            if response is not None:
+                self.exact_hits += 1
+            else:
+                self.misses += 1
+            return response
+
+    def get_similar(self, text_vector, image_input, filters: Optional[dict] = None) -> Optional[Any]:
+        """Tier semantik: respons query terdekat dengan gambar & filter yang sama."""
+        if not self.semantic_enabled or text_vector is None:
+            return None
+        query = np.asarray(text_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        group = self._group(image_input, filters)
+        with self._lock:
+            self._check_version()
+            if self._matrix is not None and norm > 0:
+                scores = self._matrix @ (query / norm)
+                mask = np.array(
+                    [key is not None and slot_group == group
+                     for key, slot_group in zip(self._slot_keys, self._slot_groups)]
+                )
+                scores[~mask] = -np.inf
+                # Kandidat diperiksa dari skor tertinggi (bisa saja kedaluwarsa)
+                for slot in np.argsort(-scores)[:4]:
+                    if scores[slot] < self.similarity_threshold:
+                        break
+                    response = self._live(self._slot_keys[slot])
+                    if response is not None:
+                        self.semantic_hits += 1
+                        return response
+            return None
+
+    def set(
+        self,
+        key: str,
+        response: Any,
+        text_vector=None,
+        image_input=None,
+        filters: Optional[dict] = None
+    ) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._check_version()
+            if key in self._entries:
+                self._remove(key)
+            while len(self._entries) >= self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+            slot = None
+            if self.semantic_enabled and text_vector is not None:
+                vector = np.asarray(text_vector, dtype=np.float32)
+                norm = np.linalg.norm(vector)
+                if norm > 0:
+                    if self._matrix is None:
+                        self._matrix = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+                    slot = self._free_slots.pop()
+                    self._matrix[slot] = vector / norm
+                    self._slot_keys[slot] = key
+                    self._slot_groups[slot] = self._group(image_input, filters)
+
+            self._entries[key] = (time.monotonic() + self.ttl, response, slot)
+
+    def invalidate(self) -> None:
+        """Mengosongkan cache (mis. setelah index Pinecone dibangun ulang)."""
+        with self._lock:
+            self._clear()
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            # `misses` = miss tier exact; `semantic_hits` adalah bagian darinya
+            hits = self.exact_hits + self.semantic_hits
+            total = self.exact_hits + self.misses
+            return {
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": hits / total if total else 0.0,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "similarity_threshold": self.similarity_threshold,
+            }
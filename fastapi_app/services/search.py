@@ -1,17 +1,241 @@
 from collections import defaultdict
-import operator
-from fastapi_app.config import pinecone_index
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import logging
+import threading
+import time
+from typing import Optional
 
+import numpy as np
+
+from fastapi_app.config import (
+    get_vector_index, SEARCH_TIMEOUT_SECONDS, SEARCH_MAX_WORKERS,
+    SEARCH_OVERFETCH_FACTOR, SEARCH_FUSION, SEARCH_RRF_K,
+    SEARCH_FILL_MISSING, SEARCH_FILL_TOP_K,
+    LEXICAL_SEARCH, LEXICAL_WEIGHT, LEXICAL_CATALOG_PATH, LEXICAL_RETRY_SECONDS,
+    INDEX_MANIFEST_PATH
+)
+from fastapi_app.services.lexical_index import BM25Index
+from fastapi_app.services.metrics import metrics
+
+
+logger = logging.getLogger(__name__)
 
 # Default jumlah hasil yang dikembalikan
 TOP_K = 4
 
+# Skor minimum default (per modalitas dan gabungan)
+MIN_SCORE = 0.5
+
+# Key hasil pencarian leksikal pada dictionary outcome per modalitas
+LEXICAL = "lexical"
+
+# Suffix ID vektor per modalitas (lihat indexer: {product_id}-IMG / -TXT)
+VECTOR_ID_SUFFIX = {"text": "TXT", "image": "IMG"}
+
+# Thread pool bersama agar query text & image dikirim bersamaan
+_query_executor = ThreadPoolExecutor(
+    max_workers=SEARCH_MAX_WORKERS,
+    thread_name_prefix="vector-query"
+)
+
+
+def build_metadata_filter(filters: Optional[dict]) -> dict:
+    """
+    Menyusun filter metadata gaya Pinecone dari SearchFilters
+    (min_price, max_price, category, material).
+    """
+    if not filters:
+        return {}
+    metadata_filter = {}
+    price = {}
+    if filters.get("min_price") is not None:
+        price["$gte"] = filters["min_price"]
+    if filters.get("max_price") is not None:
+        price["$lte"] = filters["max_price"]
+    if price:
+        metadata_filter["price"] = price
+    if filters.get("category"):
+        metadata_filter["category"] = {"$eq": filters["category"]}
+    if filters.get("material"):
+        # Material disimpan huruf kecil oleh indexer
+        metadata_filter["material"] = {"$eq": filters["material"].strip().lower()}
+    return metadata_filter
+
+
+def drop_unindexed_filters(filters: Optional[dict]) -> Optional[dict]:
+    """
+    Membuang filter material jika index belum memiliki metadata `material`
+    (vektor yang di-index sebelum kolom material ada di katalog), agar
+    filter tersebut tidak diam-diam menghasilkan nol produk.
+
+    Hanya index lokal yang bisa dicek; untuk Pinecone katalog dengan kolom
+    material harus di-index ulang (lihat README).
+    """
+    if not filters or not filters.get("material"):
+        return filters
+    has_field = getattr(get_vector_index(), "has_field", None)
+    if has_field is not None and not has_field("material"):
+        logger.warning("Index belum memiliki metadata material, filter material diabaikan")
+        metrics.incr("filter_material_dropped")
+        return {key: value for key, value in filters.items() if key != "material"}
+    return filters
+
+
+def query_modality(query_vector, vector_type: str, top_k: int, metadata_filter: Optional[dict] = None):
+    """Query vector index untuk satu modalitas (filter `vector_type` + filter metadata)."""
+    return get_vector_index().query(
+        vector=query_vector,
+        top_k=top_k,
+        include_metadata=True,
+        filter={"vector_type": vector_type, **(metadata_filter or {})}
+    )
+
+
+# =========================
+# Index leksikal (BM25)
+# =========================
+_lexical_index = None
+_lexical_version = None
+_lexical_lock = threading.Lock()
+# Build yang gagal: jumlah kegagalan berturut-turut, waktu retry berikutnya, error terakhir
+_lexical_failures = 0
+_lexical_retry_at = 0.0
+_lexical_error = None
+
+# Batas atas backoff build ulang index BM25 (detik)
+LEXICAL_MAX_RETRY_SECONDS = 600.0
+
+
+def file_version(path: str):
+    """mtime file (ns), atau None jika file tidak ada."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def index_manifest_version():
+    """Versi manifest indexer: berubah setiap kali indexer selesai menulis ulang index."""
+    return file_version(INDEX_MANIFEST_PATH)
+
+
+def lexical_source_version():
+    """
+    Versi sumber dokumen BM25: versi index lokal, mtime manifest indexer
+    (Pinecone tidak punya versi), dan mtime katalog jika LEXICAL_CATALOG_PATH diisi.
+    """
+    return (
+        getattr(get_vector_index(), "version", None),
+        index_manifest_version(),
+        file_version(LEXICAL_CATALOG_PATH) if LEXICAL_CATALOG_PATH else None,
+    )
+
+
+def load_lexical_documents():
+    """
+    Dokumen (product_id, metadata) untuk index BM25: dari katalog
+    (LEXICAL_CATALOG_PATH) jika diisi, jika tidak dari metadata vector index.
+    """
+    if LEXICAL_CATALOG_PATH:
+        from fastapi_app.indexer import read_catalog, build_product_metadata
+        return (
+            (product["id"], build_product_metadata(product))
+            for product in read_catalog(LEXICAL_CATALOG_PATH)
+        )
+
+    vector_index = get_vector_index()
+    if hasattr(vector_index, "metadata"):
+        # Index lokal: metadata sudah ada di memori
+        return (
+            (vector_id.rsplit("-", 1)[0], metadata)
+            for vector_id, metadata in zip(vector_index.ids, vector_index.metadata)
+        )
+
+    def iter_pinecone(batch_size: int = 100):
+        for id_batch in vector_index.list():
+            for start in range(0, len(id_batch), batch_size):
+                fetched = vector_index.fetch(ids=id_batch[start:start + batch_size])
+                for vector_id, vector in fetched.vectors.items():
+                    yield vector_id.rsplit("-", 1)[0], dict(vector.metadata or {})
+
+    return iter_pinecone()
+
+
+def get_lexical_index() -> BM25Index:
+    """
+    Index BM25 bersama; dibangun sekali dan dibangun ulang saat sumber
+    dokumennya berubah (lihat `lexical_source_version`).
+
+    Build yang gagal tidak diulang di setiap request: percobaan berikutnya
+    menunggu backoff eksponensial (LEXICAL_RETRY_SECONDS, maks.
+    LEXICAL_MAX_RETRY_SECONDS). Selama itu index lama tetap dipakai jika
+    ada; jika belum ada, error terakhir dilempar (query leksikal dilewati).
+    """
+    global _lexical_index, _lexical_version, _lexical_failures, _lexical_retry_at, _lexical_error
+    version = lexical_source_version()
+    if _lexical_index is not None and version == _lexical_version:
+        return _lexical_index
+
+    with _lexical_lock:
+        if _lexical_index is not None and version == _lexical_version:
+            return _lexical_index
+        if _lexical_error is not None and time.monotonic() < _lexical_retry_at:
+            if _lexical_index is not None:
+                return _lexical_index
+            raise _lexical_error
+
+        try:
+            index = BM25Index.build(load_lexical_documents())
+        except Exception as e:
+            _lexical_failures += 1
+            delay = min(LEXICAL_MAX_RETRY_SECONDS, LEXICAL_RETRY_SECONDS * 2 ** (_lexical_failures - 1))
+            _lexical_retry_at = time.monotonic() + delay
+            _lexical_error = e
+            logger.warning("Index BM25 gagal dibangun (dicoba lagi dalam %.0f detik): %r", delay, e)
+            if _lexical_index is not None:
+                return _lexical_index
+            raise
+
+        _lexical_index, _lexical_version = index, version
+        _lexical_failures, _lexical_error = 0, None
+        logger.info("Index BM25 dibangun: %d produk", len(_lexical_index))
+        return _lexical_index
+
+
+def query_lexical(query_text: str, top_k: int, metadata_filter: Optional[dict] = None):
+    """Pencarian BM25 dengan filter metadata yang sama seperti query vektor."""
+    return get_lexical_index().search(query_text, top_k=top_k, filter=metadata_filter)
+
+
+def merge_lexical_outcome(outcome, combined_scores: dict):
+    """
+    Menggabungkan hasil BM25 ke `combined_scores` sebagai `lexical_score`
+    (dinormalisasi terhadap skor tertinggi, 0..1). Kegagalan dilewati.
+    """
+    if isinstance(outcome, BaseException):
+        logger.warning("Query leksikal gagal/timeout, dilewati: %r", outcome)
+        return
+    if not outcome:
+        return
+    top_score = outcome[0][1]
+    for product_id, score, metadata in outcome:
+        combined_scores[product_id]["lexical_score"] = score / top_score
+        if not combined_scores[product_id]["metadata"]:
+            combined_scores[product_id]["metadata"] = metadata
+
+
+def fetch_vectors(vector_ids):
+    """Mengambil vektor berdasarkan ID (`index.fetch`)."""
+    return get_vector_index().fetch(ids=vector_ids)
+
 
 def process_pinecone_results(
     results,
     combined_scores: dict,
     vector_type: str,
-    min_score: float
+    min_score: float = float("-inf")
 ):
     """
     Memproses hasil query Pinecone untuk satu modalitas (text atau image)
@@ -40,7 +264,8 @@ def process_pinecone_results(
             Jenis vektor yang diproses.
             Nilai yang valid: "text" atau "image".
         min_score (float):
-            Skor minimum per modalitas agar hasil dipertimbangkan.
+            Skor minimum per modalitas agar hasil dipertimbangkan
+            (default: semua hasil disimpan, filter dilakukan saat fusion).
     """
     for match in results.matches:
         # Lewati hasil dengan skor rendah
@@ -58,23 +283,359 @@ def process_pinecone_results(
         combined_scores[product_id][f"{vector_type}_score"] = match.score
 
 
+def new_combined_scores() -> dict:
+    """Dictionary agregasi skor text & image per produk (None = belum ada skor)."""
+    return defaultdict(lambda: {
+        "text_score": None,
+        "image_score": None,
+        "lexical_score": None,
+        "metadata": None
+    })
+
+
+def collect_query_vectors(query_vector_text, query_vector_image) -> dict:
+    """Pasangan {vector_type: vektor} untuk modalitas yang tersedia."""
+    query_vectors = {}
+    if query_vector_text:
+        query_vectors["text"] = query_vector_text
+    if query_vector_image:
+        query_vectors["image"] = query_vector_image
+    return query_vectors
+
+
+def merge_modality_outcomes(
+    outcomes: dict,
+    combined_scores: dict
+):
+    """
+    Menggabungkan hasil query per modalitas ke `combined_scores`.
+
+    `outcomes` berisi {vector_type: hasil query | Exception}. Modalitas
+    yang timeout/gagal dilewati agar hasil modalitas lain tetap dipakai;
+    exception hanya diteruskan jika semua modalitas gagal.
+    """
+    errors = []
+    for vector_type, outcome in outcomes.items():
+        if isinstance(outcome, BaseException):
+            logger.warning("Query %s gagal/timeout, dilewati: %r", vector_type, outcome)
+            errors.append(outcome)
+            continue
+
+        process_pinecone_results(outcome, combined_scores, vector_type)
+
+    # Semua modalitas gagal -> tidak ada hasil yang bisa dikembalikan
+    if outcomes and len(errors) == len(outcomes):
+        raise errors[0]
+
+
+def missing_vector_ids(combined_scores: dict, query_vectors: dict) -> dict:
+    """
+    ID vektor yang skornya belum diketahui: produk yang hanya muncul
+    di hasil satu modalitas (atau hanya di hasil leksikal).
+
+    Returns:
+        dict: {vector_type: {vector_id: product_id}}
+    """
+    missing = {}
+    for vector_type in query_vectors:
+        ids = {
+            f"{product_id}-{VECTOR_ID_SUFFIX[vector_type]}": product_id
+            for product_id, data in combined_scores.items()
+            if data[f"{vector_type}_score"] is None
+        }
+        if ids:
+            missing[vector_type] = ids
+    return missing
+
+
+def apply_fetched_scores(
+    combined_scores: dict,
+    vector_type: str,
+    query_vector,
+    fetched,
+    product_ids: dict
+):
+    """Menghitung skor cosine modalitas yang hilang dari vektor hasil fetch."""
+    vectors = [
+        (product_ids[vector_id], vector.values)
+        for vector_id, vector in fetched.vectors.items()
+        if vector_id in product_ids
+    ]
+    if not vectors:
+        return
+    matrix = np.asarray([values for _, values in vectors], dtype=np.float32)
+    query = np.asarray(query_vector, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+    scores = (matrix @ query) / np.where(norms == 0, 1.0, norms)
+    for (product_id, _), score in zip(vectors, scores.tolist()):
+        combined_scores[product_id][f"{vector_type}_score"] = score
+
+
+def merge_fetch_outcomes(
+    outcomes: dict,
+    missing: dict,
+    combined_scores: dict,
+    query_vectors: dict
+):
+    """Menggabungkan hasil fetch per modalitas; fetch yang gagal dilewati."""
+    for vector_type, outcome in outcomes.items():
+        if isinstance(outcome, BaseException):
+            logger.warning("Fetch skor %s gagal/timeout, dilewati: %r", vector_type, outcome)
+            continue
+        apply_fetched_scores(
+            combined_scores, vector_type, query_vectors[vector_type],
+            outcome, missing[vector_type]
+        )
+
+
+def _fuse(scores: np.ndarray, mask: np.ndarray, weights: np.ndarray, fusion: str, rrf_k: int):
+    """Skor gabungan per produk dari modalitas yang lolos `mask` (vektorisasi)."""
+    if fusion == "max":
+        return np.where(mask, scores, -np.inf).max(axis=1)
+
+    if fusion == "rrf":
+        # Rank per modalitas (1 = terbaik) di antara seluruh kandidat
+        ranks = np.empty_like(scores)
+        order = np.argsort(-np.where(np.isnan(scores), -np.inf, scores), axis=0)
+        np.put_along_axis(
+            ranks, order,
+            np.arange(1, scores.shape[0] + 1, dtype=float)[:, None].repeat(scores.shape[1], axis=1),
+            axis=0
+        )
+        return np.where(mask, weights / (rrf_k + ranks), 0.0).sum(axis=1)
+
+    # weighted: rata-rata berbobot dari modalitas yang tersedia
+    w = np.where(mask, weights, 0.0)
+    weight_sum = w.sum(axis=1)
+    score_sum = (np.where(mask, scores, 0.0) * w).sum(axis=1)
+    return np.where(weight_sum > 0, score_sum / np.where(weight_sum > 0, weight_sum, 1.0), -np.inf)
+
+
+def rerank_combined_scores(
+    combined_scores: dict,
+    query_vector_text,
+    query_vector_image,
+    text_weight: float,
+    image_weight: float,
+    min_score: float,
+    top_k: int,
+    fusion: str = SEARCH_FUSION,
+    rrf_k: int = SEARCH_RRF_K,
+    fill_to_top_k: bool = False,
+    lexical_weight: float = LEXICAL_WEIGHT
+):
+    """
+    Menghitung skor gabungan lalu mengambil top-k produk.
+
+    Skor per modalitas di bawah `min_score` tidak dihitung. Fusion:
+    - "weighted": rata-rata berbobot modalitas yang tersedia
+    - "max": skor modalitas tertinggi
+    - "rrf": reciprocal rank fusion, sum(weight / (rrf_k + rank))
+    Untuk "weighted"/"max" skor gabungan juga harus >= `min_score`.
+
+    Skor leksikal (BM25, 0..1) ditambahkan sebagai bonus
+    `lexical_weight * skor` (atau `lexical_weight / (rrf_k + rank)` untuk
+    "rrf") setelah syarat `min_score` dicek pada skor vektor.
+
+    Jika `fill_to_top_k` dan produk yang lolos < top_k, sisa slot diisi
+    kandidat terbaik lainnya (skor dihitung tanpa batas `min_score`).
+    Karena melonggarkan `min_score`, `search_multimodal` hanya mengaktifkan
+    ini untuk skor minimum default, tidak pernah untuk `min_score` eksplisit.
+    """
+    modalities = [
+        vector_type
+        for vector_type, vector in (("text", query_vector_text), ("image", query_vector_image))
+        if vector is not None
+    ]
+    if not combined_scores or not modalities:
+        return []
+
+    product_ids = list(combined_scores)
+    scores = np.array(
+        [
+            [np.nan if data[f"{vt}_score"] is None else data[f"{vt}_score"] for vt in modalities]
+            for data in combined_scores.values()
+        ],
+        dtype=float
+    ).reshape(len(product_ids), len(modalities))
+    weights = np.array([text_weight if vt == "text" else image_weight for vt in modalities])
+
+    present = ~np.isnan(scores)
+    valid = present & (np.nan_to_num(scores, nan=-np.inf) >= min_score)
+
+    fused = _fuse(scores, valid, weights, fusion, rrf_k)
+    passing = valid.any(axis=1)
+    if fusion != "rrf":
+        passing &= fused >= min_score
+
+    # --- Bonus skor leksikal ---
+    lexical = np.array(
+        [data.get("lexical_score") or 0.0 for data in combined_scores.values()],
+        dtype=float
+    )
+    if fusion == "rrf":
+        ranks = np.empty(len(lexical))
+        ranks[np.argsort(-lexical, kind="stable")] = np.arange(1, len(lexical) + 1)
+        bonus = np.where(lexical > 0, lexical_weight / (rrf_k + ranks), 0.0)
+    else:
+        bonus = lexical_weight * lexical
+    fused = fused + bonus
+
+    selected = [i for i in np.argsort(-fused, kind="stable") if passing[i]][:top_k]
+    final_scores = fused
+
+    # --- Jamin top_k hasil (jika kandidat tersedia) ---
+    if fill_to_top_k and len(selected) < top_k:
+        fallback = _fuse(scores, present, weights, fusion, rrf_k) + bonus
+        rest = [
+            i for i in np.argsort(-fallback, kind="stable")
+            if not passing[i] and present[i].any()
+        ][:top_k - len(selected)]
+        final_scores = np.where(passing, fused, fallback)
+        selected += rest
+
+    return [
+        {
+            "id": product_ids[i],
+            "score": float(final_scores[i]),
+            "metadata": combined_scores[product_ids[i]]["metadata"]
+        }
+        for i in selected
+    ]
+
+
+def _wait_all(calls: dict, timeout: float) -> dict:
+    """
+    Menjalankan {vector_type: (fungsi, *args)} di thread pool query bersama
+    dan menunggu semuanya; timeout dihitung sejak dikirim.
+
+    Returns:
+        dict: {vector_type: hasil | Exception}
+    """
+    futures = {
+        vector_type: _query_executor.submit(*call)
+        for vector_type, call in calls.items()
+    }
+    started = time.monotonic()
+    outcomes = {}
+    for vector_type, future in futures.items():
+        remaining = max(0.0, timeout - (time.monotonic() - started))
+        try:
+            outcomes[vector_type] = future.result(timeout=remaining)
+        except FutureTimeoutError:
+            future.cancel()
+            outcomes[vector_type] = TimeoutError(
+                f"Query {vector_type} melebihi timeout {timeout:.2f}s"
+            )
+        except Exception as e:
+            outcomes[vector_type] = e
+    return outcomes
+
+
+async def _gather_all(calls: dict, timeout: float) -> dict:
+    """
+    Versi async `_wait_all`: {vector_type: (fungsi, *args)} dijalankan di
+    thread pool query bersama, masing-masing dengan timeout.
+    """
+    loop = asyncio.get_running_loop()
+    results = await asyncio.gather(
+        *(
+            asyncio.wait_for(loop.run_in_executor(_query_executor, *call), timeout)
+            for call in calls.values()
+        ),
+        return_exceptions=True
+    )
+    return dict(zip(calls, results))
+
+
+def _search_steps(
+    query_vector_text,
+    query_vector_image,
+    text_weight: float,
+    image_weight: float,
+    min_score: float,
+    top_k: int,
+    overfetch: int,
+    fusion: str,
+    fill_missing: bool,
+    fill_to_top_k: bool,
+    filters: Optional[dict],
+    query_text: Optional[str]
+):
+    """
+    Inti pipeline pencarian tanpa I/O, ditulis sebagai generator.
+
+    Setiap `yield` menyerahkan {key: (fungsi, *args)} berisi panggilan ke
+    vector index yang harus dijalankan paralel, lalu menerima kembali
+    {key: hasil | Exception}. Wrapper sync (`_wait_all`) dan async
+    (`_gather_all`) hanya berbeda di cara menjalankan panggilan tersebut;
+    hasil akhir (list produk terurut) dikembalikan lewat StopIteration.
+    """
+    # --- Query text & image (+ leksikal) dikirim paralel ---
+    query_vectors = collect_query_vectors(query_vector_text, query_vector_image)
+
+    fetch_k = top_k * max(1, overfetch)
+    metadata_filter = build_metadata_filter(drop_unindexed_filters(filters))
+    calls = {
+        vector_type: (query_modality, vector, vector_type, fetch_k, metadata_filter)
+        for vector_type, vector in query_vectors.items()
+    }
+    if LEXICAL_SEARCH and query_text:
+        calls[LEXICAL] = (query_lexical, query_text, fetch_k, metadata_filter)
+    outcomes = yield calls
+    lexical_outcome = outcomes.pop(LEXICAL, None)
+
+    combined_scores = new_combined_scores()
+    merge_modality_outcomes(outcomes, combined_scores)
+    merge_lexical_outcome(lexical_outcome, combined_scores)
+
+    # --- Lengkapi skor modalitas yang hilang (satu fetch per modalitas) ---
+    missing = missing_vector_ids(combined_scores, query_vectors) if fill_missing else {}
+    if missing:
+        fetched = yield {
+            vector_type: (fetch_vectors, list(ids))
+            for vector_type, ids in missing.items()
+        }
+        merge_fetch_outcomes(fetched, missing, combined_scores, query_vectors)
+
+    return rerank_combined_scores(
+        combined_scores, query_vector_text, query_vector_image,
+        text_weight, image_weight, min_score, top_k, fusion=fusion,
+        fill_to_top_k=fill_to_top_k
+    )
+
+
 def search_multimodal(
     query_vector_text,
     query_vector_image,
     text_weight: float = 1.0,
     image_weight: float = 1.0,
-    min_score: float = 0.5,
-    top_k: int = TOP_K
+    min_score: Optional[float] = None,
+    top_k: int = TOP_K,
+    timeout: float = SEARCH_TIMEOUT_SECONDS,
+    overfetch: int = SEARCH_OVERFETCH_FACTOR,
+    fusion: str = SEARCH_FUSION,
+    fill_missing: bool = SEARCH_FILL_MISSING,
+    filters: Optional[dict] = None,
+    query_text: Optional[str] = None
 ):
     """
-    Melakukan pencarian multimodal (Text + Image) di Pinecone dan
-    mengembalikan hasil yang sudah di-rerank berdasarkan skor gabungan.
+    Melakukan pencarian multimodal (Text + Image) di vector index
+    (Pinecone atau index lokal, lihat SEARCH_BACKEND) dan mengembalikan
+    hasil yang sudah di-rerank berdasarkan skor gabungan.
 
-    Alur proses:
-    1. Query Pinecone menggunakan embedding teks dan gambar jika ada
-    2. Gabungkan skor kemiripan berdasarkan teks dan gambar
-    3. Hitung skor gabungan berbobot, jika tidak ada query gambar tapi ada teks maka weight_sum = 1, jika ada gambar dan teks maka weight_sum =2
-    4. Filter & urutkan hasil berdasarkan skor akhir
+    Alur proses (lihat `_search_steps`):
+    1. Query vector index menggunakan embedding teks dan gambar jika ada
+       (kedua query dikirim paralel, masing-masing dengan timeout),
+       masing-masing mengambil top_k * overfetch kandidat
+    2. Gabungkan skor kemiripan berdasarkan teks dan gambar per produk,
+       ditambah skor leksikal BM25 dari query_text (dijalankan paralel)
+    3. Produk yang hanya muncul di satu modalitas dilengkapi skornya
+       lewat satu fetch vektor per modalitas (fill_missing)
+    4. Hitung skor gabungan (fusion), jika tidak ada query gambar tapi ada teks maka weight_sum = 1, jika ada gambar dan teks maka weight_sum =2
+    5. Filter & urutkan hasil berdasarkan skor akhir (jika min_score
+       tidak diberikan dan SEARCH_FILL_TOP_K aktif, top_k dijamin terisi
+       jika kandidat tersedia)
 
     Args:
         query_vector_text:
@@ -85,10 +646,26 @@ def search_multimodal(
             Bobot kontribusi skor teks.
         image_weight (float):
             Bobot kontribusi skor gambar.
-        min_score (float):
-            Skor minimum (per modalitas dan gabungan).
+        min_score (float | None):
+            Skor minimum (per modalitas dan gabungan). None = MIN_SCORE;
+            nilai eksplisit selalu dipatuhi (tanpa pengisian top_k).
         top_k (int):
             Jumlah hasil akhir yang dikembalikan.
+        timeout (float):
+            Batas waktu (detik) per modalitas. Jika satu modalitas
+            timeout/gagal, hasil dari modalitas lain tetap dikembalikan.
+        overfetch (int):
+            Kelipatan top_k yang diambil per modalitas sebelum fusion.
+        fusion (str):
+            Metode penggabungan skor: "weighted", "rrf", atau "max".
+        fill_missing (bool):
+            Lengkapi skor modalitas yang hilang dengan fetch vektor.
+        filters (dict | None):
+            Filter produk (min_price, max_price, category, material) yang
+            diterapkan di query vector index, sehingga hanya produk yang
+            memenuhi syarat yang di-scoring.
+        query_text (str | None):
+            Teks query asli untuk pencarian leksikal BM25 (LEXICAL_SEARCH).
 
     Returns:
         List[dict]:
@@ -99,70 +676,48 @@ def search_multimodal(
               "metadata": dict
             }
     """
+    steps = _search_steps(
+        query_vector_text, query_vector_image, text_weight, image_weight,
+        MIN_SCORE if min_score is None else min_score, top_k, overfetch, fusion,
+        fill_missing, SEARCH_FILL_TOP_K and min_score is None, filters, query_text
+    )
+    try:
+        calls = next(steps)
+        while True:
+            calls = steps.send(_wait_all(calls, timeout))
+    except StopIteration as done:
+        return done.value
 
-    # Dictionary agregasi skor text & image per produk
-    combined_scores = defaultdict(lambda: {
-        "text_score": 0.0,
-        "image_score": 0.0,
-        "metadata": None
-    })
 
-    
-    # --- Query berbasis teks ---
-    if query_vector_text:
-        text_results = pinecone_index.query(
-            vector=query_vector_text,
-            top_k=top_k,
-            include_metadata=True,
-            filter={"vector_type": "text"}
-        )
-        process_pinecone_results(
-            text_results, combined_scores, "text", min_score
-        )
-
-    # --- Query berbasis gambar ---
-    if query_vector_image:
-        image_results = pinecone_index.query(
-            vector=query_vector_image,
-            top_k=top_k,
-            include_metadata=True,
-            filter={"vector_type": "image"}
-        )
-        process_pinecone_results(
-            image_results, combined_scores, "image", min_score
-        )
-
-       # --- Reranking (dynamic weight per product) ---
-    results = []
-
-    for product_id, data in combined_scores.items():
-        score_sum = 0.0
-        weight_sum = 0.0
-
-        if query_vector_text is not None and data["text_score"] > 0:
-            score_sum += data["text_score"] * text_weight
-            weight_sum += text_weight # tambah 1 jika ada teks
-
-        if query_vector_image is not None and data["image_score"] > 0:
-            score_sum += data["image_score"] * image_weight
-            weight_sum += image_weight # tambahkan 1 lagi jika ada gambar
-
-        # Tidak ada kontribusi sama sekali
-        if weight_sum == 0:
-            continue
+async def asearch_multimodal(
+    query_vector_text,
+    query_vector_image,
+    text_weight: float = 1.0,
+    image_weight: float = 1.0,
+    min_score: Optional[float] = None,
+    top_k: int = TOP_K,
+    timeout: float = SEARCH_TIMEOUT_SECONDS,
+    overfetch: int = SEARCH_OVERFETCH_FACTOR,
+    fusion: str = SEARCH_FUSION,
+    fill_missing: bool = SEARCH_FILL_MISSING,
+    filters: Optional[dict] = None,
+    query_text: Optional[str] = None
+):
+    """
+    Versi async `search_multimodal` (argumen dan hasil sama).
 
-        combined_score = score_sum / weight_sum
-
-        if combined_score >= min_score:
-            results.append({
-                "id": product_id,
-                "score": combined_score,
-                "metadata": data["metadata"]
-            })
-
-    # --- Sort & Top-K ---
-    return sorted(
-        results,
-        key=operator.itemgetter("score"),
-        reverse=True
-    )[:top_k]
+    Query per modalitas dijalankan di thread pool query bersama dan
+    ditunggu secara async, sehingga event loop dan threadpool FastAPI
+    tidak terblokir selama round-trip ke vector index.
+    """
+    steps = _search_steps(
+        query_vector_text, query_vector_image, text_weight, image_weight,
+        MIN_SCORE if min_score is None else min_score, top_k, overfetch, fusion,
+        fill_missing, SEARCH_FILL_TOP_K and min_score is None, filters, query_text
+    )
+    try:
+        calls = next(steps)
+        while True:
+            calls = steps.send(await _gather_all(calls, timeout))
+    except StopIteration as done:
+        return done.value
@@ -2,6 +2,7 @@ import streamlit as st
 import requests
 from PIL import Image
 import base64
+import json
 
 import streamlit.components.v1 as components
 from PIL import Image as PILImage
@@ -42,6 +43,21 @@ def resize_image_input(image_input: str, size=(512, 512)) -> str:
 
 
 FASTAPI_URL = "http://localhost:8000/search"
+FASTAPI_STREAM_URL = "http://localhost:8000/search/stream"
+
+
+def iter_sse_events(response):
+    """Membaca response Server-Sent Events menjadi pasangan (event, data)."""
+    event, data = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
 
 st.set_page_config(
     page_title="MARS (Multimodal AI-Powered Furniture Recommender System)",
@@ -106,6 +122,33 @@ with st.sidebar:
 
     search_clicked = st.button("🚀 Search", width="stretch", key='search-button')
 
+def render_response(data):
+    st.subheader("🧠 Analysis")
+    # st.write("**Is Furniture:**", data["is_furniture"])
+    st.write("**Deskripsi:**", data["description"])
+
+    st.divider()
+    st.subheader("📦 Search Results")
+
+    for r in data["results"]:
+        with st.expander(r["metadata"].get("name", "Unknown")):
+            st.write("**Score:**", r["score"])
+            st.json(r["metadata"])
+
+    st.divider()
+    st.subheader("⭐ Recommendations")
+
+    cols = st.columns(3, gap="medium")
+    for i, rec in enumerate(data["recommendations"]):
+        with cols[i % 3]:
+            st.markdown(f"### {rec['name']}")
+            st.write(f"💰 Rp {rec['price']:,}")
+            st.write(rec["description"])
+
+            if rec.get("image_path"):
+                img_url = "https://storage.googleapis.com/" + rec["image_path"].replace("gs://", "")
+                st.image(img_url, width="stretch")
+
 # =========================
 # SEARCH ACTION
 # =========================
@@ -133,47 +176,36 @@ if search_clicked:
         "image_mime_type": image_mime_type
     }
 
+    # Hasil pencarian tampil lebih dulu, rekomendasi menyusul satu per satu
+    live_output = st.empty()
+    data = None
     with st.spinner("Searching furniture..."):
-        response = requests.post(FASTAPI_URL, json=payload)
-
-    if response.status_code != 200:
-        st.error(response.text)
-        st.stop()
-
-    st.session_state.response_data = response.json()
+        response = requests.post(FASTAPI_STREAM_URL, json=payload, stream=True)
+
+        if response.status_code != 200:
+            st.error(response.text)
+            st.stop()
+
+        for event, event_data in iter_sse_events(response):
+            if event == "results":
+                data = {**event_data, "recommendations": []}
+            elif event == "recommendation":
+                data["recommendations"].append(event_data)
+            elif event == "error":
+                st.error(event_data.get("detail", "Gagal memuat rekomendasi"))
+            else:
+                continue
+            with live_output.container():
+                render_response(data)
+
+    live_output.empty()
+    st.session_state.response_data = data
 
 # =========================
 # MAIN AREA — OUTPUT
 # =========================
 if st.session_state.response_data:
-
-    data = st.session_state.response_data
-
-    st.subheader("🧠 Analysis")
-    # st.write("**Is Furniture:**", data["is_furniture"])
-    st.write("**Deskripsi:**", data["description"])
-
-    st.divider()
-    st.subheader("📦 Search Results")
-
-    for r in data["results"]:
-        with st.expander(r["metadata"].get("name", "Unknown")):
-            st.write("**Score:**", r["score"])
-            st.json(r["metadata"])
-
-    st.divider()
-    st.subheader("⭐ Recommendations")
-
-    cols = st.columns(3, gap="medium")
-    for i, rec in enumerate(data["recommendations"]):
-        with cols[i % 3]:
-            st.markdown(f"### {rec['name']}")
-            st.write(f"💰 Rp {rec['price']:,}")
-            st.write(rec["description"])
-
-            if rec.get("image_path"):
-                img_url = "https://storage.googleapis.com/" + rec["image_path"].replace("gs://", "")
-                st.image(img_url, width="stretch")
+    render_response(st.session_state.response_data)
 
 def federated_chatbot_component(url, height=600):
     """